@@ -1,13 +1,13 @@
 ﻿import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 import numpy as np
 import os
 import datetime
+import pyarrow.compute as pc
 
 # Importar módulos locais
-from src import data_engine, slotting_engine, simulation_engine
+from src import data_engine, slotting_engine, simulation_engine, sampling_engine, render_engine, inventory_engine, event_log_engine, surrogate_engine, dock_engine, results_engine, relocation_engine
 
 # Configuração da Página
 st.set_page_config(page_title="Gêmeo Digital do Armazém", layout="wide", page_icon="🏭")
@@ -86,6 +86,10 @@ def kpi_card(col, label, value, delta=None, icon="📊", color="#3498db"):
     """
     col.markdown(html, unsafe_allow_html=True)
 
+def lazy_section(label, key, expanded=False):
+    # Expander com estado rastreado: o conteúdo só é construído quando aberto (.open)
+    return st.expander(label, expanded=expanded, key=key, on_change="rerun")
+
 st.title("🏭 Advanced Warehouse Digital Twin - Hub-and-Spoke Simulation")
 st.markdown("**Simulador Didático de Operações Logísticas: Slotting, Roteirização e Capacidade.**")
 
@@ -121,9 +125,13 @@ st.sidebar.header("⚙️ Configurações")
 with st.sidebar.expander("ℹ️ O que significam estes parâmetros?"):
     st.markdown("""
     *   **Número de Pedidos:** Total de cargas (caminhões) a serem processadas no mês.
+    *   **Semente dos Dados:** Mesma semente e mesmos parâmetros geram exatamente os mesmos SKUs e pedidos (igual ao pipeline headless).
     *   **Multiplicador de Demanda:** Aumenta a quantidade de itens dentro de cada pedido (simula sazonalidade/picos).
-    *   **Amostra de Simulação:** Quantos pedidos serão simulados detalhadamente (rota a rota) para gerar os KPIs. *Simular todos seria muito lento.*
+    *   **Amostra de Simulação:** Quantos pedidos serão simulados detalhadamente (rota a rota) para gerar os KPIs. A amostra é estratificada por dia, onda e tamanho do pedido. *Simular todos seria muito lento.*
+    *   **Amostragem Adaptativa:** Aumenta a amostra estratificada até o intervalo de confiança do tempo total ficar dentro do erro alvo.
     *   **Velocidade da Empilhadeira:** Velocidade média de deslocamento em m/s.
+    *   **Modelo de Deslocamento:** Linear usa velocidade constante; Cinemático considera aceleração/frenagem, curvas nos cross aisles e o peso do palete (viagem e elevação mais lentas com carga).
+    *   **Slotting pela Demanda Prevista:** Ordena os SKUs pelo esforço previsto para os próximos dias (suavização exponencial ou Croston para demanda intermitente) em vez do total histórico.
     *   **Turno de Trabalho:** Horário de operação (impacta no cálculo de horas disponíveis da frota).
     *   **Número de Docas:** Quantas docas simultâneas podem operar (impacta filas).
     """)
@@ -131,6 +139,7 @@ with st.sidebar.expander("ℹ️ O que significam estes parâmetros?"):
 # 1. Parâmetros de Geração de Dados (Cenário)
 st.sidebar.subheader("1. Cenário (Dados)")
 num_orders = st.sidebar.slider("Número de Pedidos", 100, 10000, 3000)
+data_seed = int(st.sidebar.number_input("Semente dos Dados", min_value=0, value=42, step=1))
 demand_multiplier = st.sidebar.slider("Sazonalidade (Mult. Demanda)", 0.5, 3.0, 1.0, 0.1)
 btn_generate_data = st.sidebar.button("🔄 Gerar Novo Cenário de Dados")
 
@@ -138,12 +147,22 @@ btn_generate_data = st.sidebar.button("🔄 Gerar Novo Cenário de Dados")
 st.sidebar.subheader("2. Operação & Simulação")
 forklift_speed = st.sidebar.slider("Velocidade Empilhadeira (m/s)", 0.5, 5.0, 1.5, 0.1)
 morning_weight = st.sidebar.slider("Peso Prioridade Manhã", 1.0, 3.0, 1.5, 0.1)
+forecast_slotting = st.sidebar.checkbox("Slotting pela Demanda Prevista (SES/Croston)", value=False)
+forecast_horizon_days = st.sidebar.slider("Horizonte da Previsão (dias)", 1, 30, 7) if forecast_slotting else 7
+score_source = 'forecast' if forecast_slotting else 'history'
+TRAVEL_MODEL_LABELS = {'linear': 'Linear (distância / velocidade)', 'kinematic': 'Cinemático (aceleração, curvas e carga)'}
+travel_model = st.sidebar.selectbox("Modelo de Deslocamento", simulation_engine.TRAVEL_MODELS, format_func=TRAVEL_MODEL_LABELS.get)
 simulate_all = st.sidebar.checkbox("Simular Todos os Pedidos (Lento 🐢)", value=False)
+adaptive_sampling = False
 if simulate_all:
     sim_sample_size = 999999
     st.sidebar.warning("⚠️ Simular todos os pedidos pode levar vários minutos!")
 else:
     sim_sample_size = st.sidebar.slider("Amostra Simulação (TSP)", 10, 500, 50)
+    # Amostra estratificada por dia/onda/tamanho; no modo adaptativo cresce até o erro alvo
+    adaptive_sampling = st.sidebar.checkbox("Amostragem Adaptativa (Erro Alvo)", value=False)
+    if adaptive_sampling:
+        target_error_pct = st.sidebar.slider("Erro Alvo (IC 95%, %)", 0.5, 10.0, 2.0, 0.5)
 
 # 3. Parâmetros de Frota
 st.sidebar.subheader("3. Capacidade & Frota")
@@ -177,10 +196,12 @@ btn_optimize = st.sidebar.button("✨ Otimização Avançada (Hill Climbing)", d
 
 if sim_ready:
     with st.sidebar.expander("⚙️ Parâmetros da Otimização"):
+        opt_method = st.selectbox("Algoritmo", ["Hill Climbing", "Busca Tabu (Melhor Melhoria)", "Surrogate + Confirmação"])
         opt_iterations = st.slider("Iterações (Trocas)", 10, 200, 50)
         opt_sample = st.slider("Amostra de Pedidos", 5, 50, 20)
 else:
     # Valores padrão para evitar erros se não renderizar
+    opt_method = "Hill Climbing"
     opt_iterations = 50
     opt_sample = 20
 
@@ -193,9 +214,11 @@ def check_data_files_exist():
 def generate_and_save_data():
     with st.spinner("Gerando Layout, SKUs e Pedidos..."):
         df_layout = data_engine.generate_layout()
+        # Um gerador por cenário (como no pipeline_engine): mesma semente e parâmetros, mesmos dados
+        rng = np.random.default_rng(data_seed)
         # Quantidade de SKUs reduzida para 500 (Didático)
-        df_skus = data_engine.generate_skus(num_skus=500)
-        df_orders = data_engine.generate_orders(df_skus, num_orders=num_orders, demand_multiplier=demand_multiplier)
+        df_skus = data_engine.generate_skus(num_skus=500, seed=rng)
+        df_orders = data_engine.generate_orders(df_skus, num_orders=num_orders, demand_multiplier=demand_multiplier, seed=rng)
         
         # Salvar em disco
         df_layout.to_csv('data/layout_fisico.csv', index=False)
@@ -205,11 +228,62 @@ def generate_and_save_data():
         st.success("Novos dados gerados e salvos com sucesso!")
         return df_layout, df_skus, df_orders
 
+EVENT_LOG_PATH = 'data/eventos_simulacao.parquet'
+
+def simulate_kpis(df_alloc):
+    # Simulação conforme o modo de amostragem escolhido na barra lateral (grava o log de eventos, exceto na adaptativa)
+    if simulate_all:
+        return simulation_engine.run_simulation(df_orders, df_alloc, df_layout, num_orders_to_sim=sim_sample_size, forklift_speed=forklift_speed, num_active_docks=num_active_docks,
+                                                event_log_path=EVENT_LOG_PATH, num_forklifts=num_forklifts, df_skus=df_skus, travel_model=travel_model), None
+    if adaptive_sampling:
+        return sampling_engine.run_approximate_simulation(df_orders, df_alloc, df_layout, forklift_speed=forklift_speed, rel_error=target_error_pct / 100,
+                                                          travel_model=travel_model, df_skus=df_skus)
+    sample_ids = sampling_engine.stratified_order_sample(df_orders, sim_sample_size)
+    return simulation_engine.run_simulation(df_orders, df_alloc, df_layout, forklift_speed=forklift_speed, num_active_docks=num_active_docks, order_ids=sample_ids,
+                                            event_log_path=EVENT_LOG_PATH, num_forklifts=num_forklifts, df_skus=df_skus, travel_model=travel_model), None
+
+def surrogate_model(df_alloc):
+    # Surrogate treinado uma vez por cenário (pedidos, layout e ordem dos SKUs da alocação) e reaproveitado
+    # nas otimizações seguintes; o treino (~200 simulações) não se repete a cada clique
+    key = render_engine.fingerprint(df_orders, df_layout, df_alloc['sku_id'].drop_duplicates().reset_index(drop=True))
+    # Retorna (modelo, treinado agora?)
+    cached = st.session_state.get('surrogate_model')
+    if cached is not None and cached[0] == key:
+        return cached[1], False
+    model = surrogate_engine.fit_surrogate(df_alloc, df_orders, df_layout, df_skus)
+    st.session_state['surrogate_model'] = (key, model)
+    return model, True
+
+def kpi_mean(df_kpis, column):
+    # Média por pedido; na amostragem adaptativa (coluna 'weight' = N_h / n_h) a média ponderada é a
+    # estimativa estratificada (a amostra tem no mínimo 2 pedidos por estrato, não é proporcional)
+    if 'weight' in df_kpis.columns:
+        return float(np.average(df_kpis[column], weights=df_kpis['weight']))
+    return df_kpis[column].mean()
+
+def store_run(df_alloc, df_kpis, source, opt_method=None):
+    # Grava a execução no banco de resultados (histórico comparável entre execuções)
+    params = {
+        'num_orders': num_orders, 'demand_multiplier': demand_multiplier, 'forklift_speed': forklift_speed,
+        'morning_weight': morning_weight, 'score_source': score_source, 'travel_model': travel_model, 'sim_sample_size': sim_sample_size, 'num_forklifts': num_forklifts,
+        'shift_hours': shift_window_hours, 'num_active_docks': num_active_docks, 'opt_method': opt_method,
+        'opt_iterations': opt_iterations if opt_method else 0, 'num_skus': df_skus['sku_id'].nunique(), 'seed': data_seed,
+    }
+    conn = results_engine.connect(results_engine.DEFAULT_DB_PATH)
+    try:
+        return results_engine.save_scenario(conn, params, df_alloc, df_kpis, source=source)
+    finally:
+        conn.close()
+
+DATA_FILES = ['data/layout_fisico.csv', 'data/mestre_skus.csv', 'data/pedidos_backlog.csv']
+
+@st.cache_data(show_spinner=False)
+def _read_data(mtimes):
+    # Cache entre reruns do Streamlit; mtimes na chave: um novo cenário gerado invalida o cache
+    return tuple(pd.read_csv(path) for path in DATA_FILES)
+
 def load_data():
-    df_layout = pd.read_csv('data/layout_fisico.csv')
-    df_skus = pd.read_csv('data/mestre_skus.csv')
-    df_orders = pd.read_csv('data/pedidos_backlog.csv')
-    return df_layout, df_skus, df_orders
+    return _read_data(tuple(os.path.getmtime(path) for path in DATA_FILES))
 
 # --- Lógica Principal ---
 
@@ -227,18 +301,11 @@ else:
 # --- Análise de Demanda (Backlog Mensal) ---
 st.header("📈 Análise de Demanda (Backlog Mensal)")
 
-# Preparar dados para gráficos
-df_demand_day = df_orders.groupby(['day', 'shipping_wave']).size().reset_index(name='count')
-df_qty_day = df_orders.groupby('day')['quantity'].sum().reset_index(name='total_qty')
-
 # Merge com SKUs para pegar categoria
 if 'category' not in df_skus.columns:
     # Fallback para dados antigos
     df_skus['category'] = df_skus['description']
 
-df_orders_cat = df_orders.merge(df_skus[['sku_id', 'category']], on='sku_id', how='left')
-df_cat_demand = df_orders_cat.groupby('category')['quantity'].sum().reset_index().sort_values('quantity', ascending=False)
-
 # Layout de Colunas para Gráficos
 
 # 1. KPIs de Resumo (Topo)
@@ -256,31 +323,23 @@ kpi_card(k3, "Estoque Médio", f"{total_inventory_est:,.0f}", icon="🏭", color
 kpi_card(k4, "Giro de Estoque", f"{turnover:.2f}x", icon="🔄", color="#2ecc71")
 kpi_card(k5, "Cobertura", f"{days_on_hand:.1f} dias", icon="📅", color="#f1c40f")
 
-# 2. Gráfico de Volume Total (Full Width)
-st.subheader("Volume Total de Itens por Dia")
-fig_qty = px.line(df_qty_day, x='day', y='total_qty', markers=True,
-                  title="Total de Peças Movimentadas por Dia",
-                  labels={'day': 'Dia', 'total_qty': 'Qtd Peças'})
-fig_qty.update_traces(line_color='green')
-st.plotly_chart(fig_qty, use_container_width=True)
-
-# 3. Gráficos Detalhados (Colunas)
-col1, col2 = st.columns(2)
-
-with col1:
-    st.subheader("Pedidos por Dia (Turno)")
-    fig_orders = px.bar(df_demand_day, x='day', y='count', color='shipping_wave', 
-                        title="Volume de Pedidos Diário",
-                        labels={'day': 'Dia', 'count': 'Qtd Pedidos', 'shipping_wave': 'Turno'})
-    st.plotly_chart(fig_orders, use_container_width=True)
-
-with col2:
-    st.subheader("Demanda por Categoria")
-    fig_cat = px.bar(df_cat_demand, x='quantity', y='category', orientation='h',
-                     title="Top Categorias (Qtd Itens)",
-                     labels={'quantity': 'Total Itens', 'category': 'Categoria'})
-    fig_cat.update_layout(yaxis={'categoryorder':'total ascending'})
-    st.plotly_chart(fig_cat, use_container_width=True)
+# 2. Gráficos de Demanda (construídos apenas quando a seção está aberta)
+demand_section = lazy_section("📊 Gráficos de Demanda", key="sec_demand", expanded=True)
+if demand_section.open:
+    with demand_section:
+        st.subheader("Volume Total de Itens por Dia")
+        st.plotly_chart(render_engine.get_or_build('qty_day', render_engine.build_qty_day_figure, df_orders), use_container_width=True)
+
+        # 3. Gráficos Detalhados (Colunas)
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("Pedidos por Dia (Turno)")
+            st.plotly_chart(render_engine.get_or_build('orders_day', render_engine.build_orders_day_figure, df_orders), use_container_width=True)
+
+        with col2:
+            st.subheader("Demanda por Categoria")
+            st.plotly_chart(render_engine.get_or_build('cat_demand', render_engine.build_category_demand_figure, df_orders, df_skus), use_container_width=True)
 
 # --- Simulação ---
 if btn_run_sim:
@@ -289,19 +348,24 @@ if btn_run_sim:
     st.header("🧠 Executando Slotting Inteligente...")
     
     with st.spinner("Calculando melhores posições para cada SKU..."):
-        df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout)
+        df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout, wave_weight_morning=morning_weight,
+                                                         score_source=score_source, forecast_horizon_days=forecast_horizon_days)
         st.success(f"Slotting Concluído! {len(df_alloc)} SKUs alocados.")
         
     # 2. Simulação de Movimentação
     st.header("👷🏻‍♀️ Simulando Operação (Hub-and-Spoke)...")
     
     with st.spinner(f"Simulando Rotas para {sim_sample_size} pedidos..."):
-        df_kpis = simulation_engine.run_simulation(df_orders, df_alloc, df_layout, num_orders_to_sim=sim_sample_size, forklift_speed=forklift_speed, num_active_docks=num_active_docks)
+        df_kpis, sim_estimates = simulate_kpis(df_alloc)
         df_kpis.to_csv('data/kpis_simulacao.csv', index=False)
+        scenario_id = store_run(df_alloc, df_kpis, source='app')
         
     st.session_state['sim_results'] = {
         'alloc': df_alloc,
-        'kpis': df_kpis
+        'kpis': df_kpis,
+        'estimates': sim_estimates,
+        'event_log': None if adaptive_sampling else EVENT_LOG_PATH,
+        'scenario_id': scenario_id
     }
     st.success("Simulação Concluída!")
 
@@ -327,35 +391,56 @@ if 'sim_results' in st.session_state:
         3.  **Avaliação:** Se o tempo total de operação diminuiu, a troca é **aceita** (o layout evoluiu). Se piorou, a troca é desfeita.
         4.  **Repetição:** Esse processo se repete por várias iterações, "escalando" a eficiência do armazém degrau por degrau.
         
+        **Busca Tabu (Melhor Melhoria):** em vez de sortear uma troca por vez, avalia **todas** as trocas possíveis (inclusive com posições vazias) de uma só vez, aplica as melhores que respeitam o limite de peso de cada nível e proíbe temporariamente (lista tabu) desfazer movimentos recentes. Converge em poucas passadas.
+        
         > *Utilize o botão **"✨ Otimização Avançada"** na barra lateral para iniciar este processo.*
         """)
     
     if btn_optimize:
         with st.spinner(f"Otimizando Layout... Testando {opt_iterations} cenários..."):
-            df_alloc_optimized, history = slotting_engine.optimize_slotting_hill_climbing(
-                df_alloc, df_orders, df_layout, iterations=opt_iterations, sample_size=opt_sample
-            )
+            if opt_method == "Hill Climbing":
+                df_alloc_optimized, history = slotting_engine.optimize_slotting_hill_climbing(
+                    df_alloc, df_orders, df_layout, iterations=opt_iterations, sample_size=opt_sample
+                )
+            elif opt_method == "Surrogate + Confirmação":
+                # Triagem de milhares de candidatos pelo modelo; só os melhores de cada rodada vão ao simulador
+                model, fitted_now = surrogate_model(df_alloc)
+                df_alloc_optimized, history, surrogate_report = surrogate_engine.optimize_slotting_surrogate(
+                    df_alloc, df_orders, df_layout, df_skus, model=model, rounds=opt_iterations
+                )
+                surrogate_report['fitted_now'] = fitted_now
+                st.session_state['surrogate_report'] = surrogate_report
+            else:
+                # Avalia a vizinhança inteira por passada (trocas vetorizadas); iterações = máx. de passadas
+                df_alloc_optimized, history = slotting_engine.optimize_slotting_tabu(
+                    df_alloc, df_orders, df_layout, df_skus, max_passes=opt_iterations
+                )
             
+            # Plano físico para sair da alocação atual e chegar na otimizada
+            df_moves, relocation = relocation_engine.plan_relocation(df_alloc, df_alloc_optimized, df_layout, df_skus, forklift_speed=forklift_speed)
+
             st.session_state['sim_results']['alloc'] = df_alloc_optimized
             st.session_state['optimization_history'] = history
             
-            df_kpis_new = simulation_engine.run_simulation(
-                df_orders, df_alloc_optimized, df_layout, 
-                num_orders_to_sim=sim_sample_size, 
-                forklift_speed=forklift_speed, 
-                num_active_docks=num_active_docks
-            )
+            df_kpis_new, sim_estimates = simulate_kpis(df_alloc_optimized)
+            st.session_state['sim_results']['estimates'] = sim_estimates
+            st.session_state['sim_results']['event_log'] = None if adaptive_sampling else EVENT_LOG_PATH
+            st.session_state['sim_results']['scenario_id'] = store_run(df_alloc_optimized, df_kpis_new, source='app-otimizado', opt_method=opt_method)
             
             # Atualizar KPIs para exibir os novos resultados
-            avg_dist_old = df_kpis['dist_opt_m'].mean()
-            avg_dist_new = df_kpis_new['dist_opt_m'].mean()
+            avg_dist_old = kpi_mean(df_kpis, 'dist_opt_m')
+            avg_dist_new = kpi_mean(df_kpis_new, 'dist_opt_m')
             avg_reduction_dist = ((avg_dist_old - avg_dist_new) / avg_dist_old) * 100 if avg_dist_old > 0 else 0
             
-            avg_time_old = df_kpis['time_opt_s'].mean()
-            avg_time_new = df_kpis_new['time_opt_s'].mean()
+            avg_time_old = kpi_mean(df_kpis, 'time_opt_s')
+            avg_time_new = kpi_mean(df_kpis_new, 'time_opt_s')
             avg_reduction_time = ((avg_time_old - avg_time_new) / avg_time_old) * 100 if avg_time_old > 0 else 0
             
             avg_time_per_order = avg_time_new
+
+            orders_per_day = df_orders['order_id'].nunique() / max(df_orders['day'].nunique(), 1)
+            relocation.update(relocation_engine.payback_days(relocation, (avg_time_old - avg_time_new) * orders_per_day, num_forklifts))
+            st.session_state['relocation'] = {'moves': df_moves, 'summary': relocation}
             
             # Persistir resultados otimizados
             st.session_state['sim_results']['kpis'] = df_kpis_new
@@ -363,12 +448,12 @@ if 'sim_results' in st.session_state:
             
     else:
         # Se não houve otimização agora, usar os dados atuais vs baseline (Random)
-        avg_dist_rnd = df_kpis['dist_rnd_m'].mean()
-        avg_dist_opt = df_kpis['dist_opt_m'].mean()
+        avg_dist_rnd = kpi_mean(df_kpis, 'dist_rnd_m')
+        avg_dist_opt = kpi_mean(df_kpis, 'dist_opt_m')
         avg_reduction_dist = ((avg_dist_rnd - avg_dist_opt) / avg_dist_rnd) * 100 if avg_dist_rnd > 0 else 0
         
-        avg_time_rnd = df_kpis['time_rnd_s'].mean()
-        avg_time_opt = df_kpis['time_opt_s'].mean()
+        avg_time_rnd = kpi_mean(df_kpis, 'time_rnd_s')
+        avg_time_opt = kpi_mean(df_kpis, 'time_opt_s')
         avg_reduction_time = ((avg_time_rnd - avg_time_opt) / avg_time_rnd) * 100 if avg_time_rnd > 0 else 0
         
         avg_time_per_order = avg_time_opt
@@ -389,24 +474,47 @@ if 'sim_results' in st.session_state:
     kpi_card(col2, "Redução Tempo", f"{avg_reduction_time:.2f}%", icon="⏱️", color="#2ecc71")
     kpi_card(col3, "Tempo Médio/Pedido", f"{avg_time_per_order:.1f} s", icon="📦", color="#3498db")
 
+    sim_estimates = st.session_state['sim_results'].get('estimates')
+    if sim_estimates:
+        ci_low, ci_high = sim_estimates['avg_time_opt_s_ci']
+        st.caption(
+            f"Estimativa estratificada: {sim_estimates['orders_sampled']:,} de {sim_estimates['orders_total']:,} pedidos "
+            f"({sim_estimates['sample_fraction']:.1%}). Tempo médio/pedido {sim_estimates['avg_time_opt_s']:.1f} s "
+            f"(IC {sim_estimates['confidence']:.0%}: {ci_low:.1f} – {ci_high:.1f} s, erro ±{sim_estimates['rel_error']:.1%})."
+        )
+
+    relocation_plan = st.session_state.get('relocation')
+    if btn_optimize and relocation_plan:
+        reloc = relocation_plan['summary']
+        payback = f"{reloc['payback_days']:.1f} dias" if np.isfinite(reloc['payback_days']) else "não se paga"
+        st.caption(
+            f"Realocação: {reloc['positions_changed']:,} posições, {reloc['moves']:,} movimentos ({reloc['chains']} cadeias, {reloc['cycles']} ciclos via buffer), "
+            f"{reloc['forklift_hours']:.1f} h de empilhadeira ({reloc['relocation_shift_hours']:.1f} h com {num_forklifts} empilhadeiras). "
+            f"Ganho de {reloc['saved_hours_per_day']:.1f} h/dia: payback em {payback}."
+        )
+        with st.expander("🚚 Plano de Movimentos"):
+            st.dataframe(relocation_plan['moves'], use_container_width=True, hide_index=True)
+
+    surrogate_report = st.session_state.get('surrogate_report')
+    if btn_optimize and opt_method == "Surrogate + Confirmação" and surrogate_report:
+        st.caption(
+            f"Surrogate: {surrogate_report['candidates_screened']:,} candidatos triados, {surrogate_report['candidates_simulated']} confirmados no simulador. "
+            f"R² validação {surrogate_report['r2_holdout']:.3f}, erro médio nos confirmados {surrogate_report['mape_confirmed_pct']:.2f}%, "
+            f"{surrogate_report['surrogate_us_per_candidate']:.0f} µs vs {surrogate_report['simulation_ms_per_candidate']:.0f} ms por candidato (speedup {surrogate_report['speedup']:.0f}x). "
+            f"Treino do modelo: {surrogate_report['fit_s']:.1f} s ({'nesta execução' if surrogate_report['fitted_now'] else 'reaproveitado do cache'}); "
+            f"speedup contando o treino {surrogate_report['speedup_with_fit']:.0f}x."
+        )
+
     # --- Dimensionamento da Frota ---
     st.header("🏭 Dimensionamento da Frota (Análise Diária)")
     
-    avg_time_per_order = df_kpis['time_opt_s'].mean()
-    df_daily_ops = df_orders.groupby('day').size().reset_index(name='num_orders')
-    df_daily_ops['workload_hours'] = (df_daily_ops['num_orders'] * avg_time_per_order) / 3600
-    
-    daily_fleet_capacity_hours = num_forklifts * shift_window_hours
-    df_daily_ops['capacity_hours'] = daily_fleet_capacity_hours
-    df_daily_ops['utilization'] = (df_daily_ops['workload_hours'] / df_daily_ops['capacity_hours']) * 100
-    df_daily_ops['status'] = df_daily_ops['utilization'].apply(lambda x: 'Overload' if x > 100 else 'OK')
-    
-    max_utilization = df_daily_ops['utilization'].max()
-    days_overload = df_daily_ops[df_daily_ops['utilization'] > 100].shape[0]
-    avg_utilization = df_daily_ops['utilization'].mean()
+    avg_time_per_order = kpi_mean(df_kpis, 'time_opt_s')
+    df_daily_ops, fleet_summary = simulation_engine.calculate_fleet_sizing(
+        df_orders, avg_time_per_order, num_forklifts=num_forklifts, shift_hours=shift_window_hours
+    )
     
-    max_workload = df_daily_ops['workload_hours'].max()
-    suggested_fleet = np.ceil(max_workload / shift_window_hours)
+    max_utilization = fleet_summary['max_utilization']
+    avg_utilization = fleet_summary['avg_utilization']
     
     c1, c2, c3, c4 = st.columns(4)
     kpi_card(c1, "Utilização Média", f"{avg_utilization:.1f}%", icon="📉", color="#9b59b6")
@@ -416,11 +524,9 @@ if 'sim_results' in st.session_state:
     kpi_card(c2, "Utilização Pico", f"{max_utilization:.1f}%", delta=delta_peak, icon="🔥", color=peak_color)
     
     # KPIs de Planejamento Integrados
-    total_days = df_daily_ops.shape[0]
-    overload_days = df_daily_ops[df_daily_ops['status'] == 'Overload'].shape[0]
-    df_plan = df_daily_ops.copy()
-    df_plan['balance_hours'] = df_plan['capacity_hours'] - df_plan['workload_hours']
-    total_balance = df_plan['balance_hours'].sum()
+    total_days = fleet_summary['total_days']
+    overload_days = fleet_summary['overload_days']
+    total_balance = fleet_summary['total_balance_hours']
     
     delta_days = f"{overload_days} dias atraso" if overload_days > 0 else "OK"
     days_color = "#e67e22" if overload_days > 0 else "#2ecc71"
@@ -435,171 +541,156 @@ if 'sim_results' in st.session_state:
     fig_cap.update_layout(title="Balanço de Capacidade Diária", xaxis_title="Dia do Mês", yaxis_title="Horas de Trabalho", legend=dict(orientation="h", y=1.1))
     st.plotly_chart(fig_cap, use_container_width=True)
 
+    # --- Simulação Faseada (Dia / Onda) ---
+    phased_section = lazy_section("⏱️ Simulação Faseada por Dia e Onda (Staging & Backlog)", key="sec_phased")
+    if phased_section.open:
+        with phased_section:
+            with_replenishment = st.checkbox("Incluir reabastecimento (Pallet In) na frota", value=False,
+                                             help="Baixa o estoque dos bins a cada onda e intercala as tarefas de reabastecimento com o picking.")
+            inventory = inventory_engine.init_inventory(df_alloc, df_layout, df_skus, forklift_speed=forklift_speed) if with_replenishment else None
+            df_waves, phased_summary = simulation_engine.run_time_phased_simulation(
+                df_orders, df_alloc, df_layout, forklift_speed=forklift_speed,
+                num_forklifts=num_forklifts, shift_hours=shift_window_hours, inventory=inventory
+            )
+            p1, p2, p3 = st.columns(3)
+            kpi_card(p1, "Backlog Final", f"{phased_summary['final_backlog']} pedidos", icon="📥", color="#e67e22")
+            kpi_card(p2, "Pico de Staging", f"{phased_summary['peak_staging']} / {phased_summary['staging_capacity']}", icon="🧱", color="#9b59b6")
+            kpi_card(p3, "Espera por Staging", f"{phased_summary['total_staging_wait_h']:.1f} h", icon="⏳", color="#3498db")
+            if with_replenishment:
+                r1, r2 = st.columns(2)
+                kpi_card(r1, "Reabastecimentos", f"{phased_summary['replenishments']}", icon="🔁", color="#16a085")
+                kpi_card(r2, "Horas de Reabastecimento", f"{phased_summary['replenishment_hours']:.0f} h",
+                         delta=f"{df_waves['replenishment_utilization'].mean():.1f}% da frota", icon="🏗️", color="#16a085")
+
+            df_waves['slot'] = df_waves['day'].astype(str) + " " + df_waves['shipping_wave']
+            fig_waves = go.Figure()
+            fig_waves.add_trace(go.Bar(x=df_waves['slot'], y=df_waves['completed_in_window'], name='Pedidos Concluídos na Onda'))
+            fig_waves.add_trace(go.Scatter(x=df_waves['slot'], y=df_waves['carry_over'], mode='lines', name='Backlog Carregado', line=dict(color='red')))
+            fig_waves.add_trace(go.Scatter(x=df_waves['slot'], y=df_waves['peak_staging'], mode='lines', name='Pico de Staging', line=dict(color='purple', dash='dot')))
+            fig_waves.update_layout(title="Throughput por Onda, Backlog e Ocupação do Staging", xaxis_title="Dia / Onda", legend=dict(orientation="h", y=1.1))
+            st.plotly_chart(fig_waves, use_container_width=True)
+
+    # --- Docas de Expedição ---
+    docks_section = lazy_section("🚚 Docas de Expedição (Fila de Caminhões)", key="sec_docks")
+    if docks_section.open:
+        with docks_section:
+            order_time_s = dock_engine.order_pick_times(df_orders, df_alloc, df_layout, forklift_speed=forklift_speed)
+            df_schedule, df_dock_util, dock_summary = dock_engine.run_dock_scheduling(
+                df_orders, order_time_s, df_skus, num_active_docks=num_active_docks, forklift_speed=forklift_speed,
+                num_forklifts=num_forklifts, shift_hours=shift_window_hours
+            )
+            if num_active_docks > dock_summary['active_docks']:
+                st.caption(f"O layout tem {dock_summary['active_docks']} docas; as demais docas ativas foram ignoradas.")
+            d1, d2, d3, d4 = st.columns(4)
+            kpi_card(d1, "Caminhões", f"{dock_summary['trucks']:,}", icon="🚚", color="#34495e")
+            kpi_card(d2, "Espera Média", f"{dock_summary['avg_wait_min']:.1f} min", delta=f"P95 {dock_summary['p95_wait_min']:.1f} min", icon="⏳", color="#3498db")
+            late_color = "#e74c3c" if dock_summary['late_trucks'] > 0 else "#2ecc71"
+            kpi_card(d3, "Caminhões Atrasados", f"{dock_summary['late_trucks']}", icon="⏰", color=late_color)
+            kpi_card(d4, "Utilização das Docas", f"{dock_summary['avg_dock_utilization']:.1f}%", icon="🏗️", color="#9b59b6")
+
+            fig_docks = go.Figure()
+            fig_docks.add_trace(go.Bar(x=df_dock_util['dock_id'], y=df_dock_util['utilization_pct'], name='Utilização (%)', text=df_dock_util['trucks'].astype(int), textposition='outside'))
+            fig_docks.update_layout(title="Utilização por Doca (rótulo: caminhões carregados)", xaxis_title="Doca", yaxis_title="Utilização (%)")
+            st.plotly_chart(fig_docks, use_container_width=True)
+
+            daily_wait = df_schedule.groupby('day')['wait_s'].agg(['mean', 'max']) / 60
+            fig_wait = go.Figure()
+            fig_wait.add_trace(go.Bar(x=daily_wait.index, y=daily_wait['mean'], name='Espera Média (min)'))
+            fig_wait.add_trace(go.Scatter(x=daily_wait.index, y=daily_wait['max'], mode='lines', name='Espera Máxima (min)', line=dict(color='red')))
+            fig_wait.update_layout(title="Espera dos Caminhões por Dia", xaxis_title="Dia do Mês", yaxis_title="Minutos", legend=dict(orientation="h", y=1.1))
+            st.plotly_chart(fig_wait, use_container_width=True)
+
     # --- Heatmap de Estoque ---
     st.header("📦 Distribuição de Estoque (Mapa de Categorias)")
-    df_full = df_layout.merge(df_alloc[['bin_id', 'sku_id']], on='bin_id', how='left').merge(df_skus, on='sku_id', how='left')
-    if 'category' not in df_full.columns: df_full['category'] = df_full['description']
-    df_full['category'] = df_full['category'].fillna('Vazio')
-    
-    cat_color_map = {
-        'Vazio': 'lightgrey', 'Móveis': '#1f77b4', 'Eletrodomésticos': '#ff7f0e', 'Automotivo': '#2ca02c',
-        'Construção': '#d62728', 'Eletrônicos': '#9467bd', 'Vestuário': '#8c564b', 'Alimentos': '#e377c2',
-        'Farmácia': '#7f7f7f', 'Livros': '#bcbd22'
-    }
-    import plotly.colors as pc
-    default_colors = pc.qualitative.Plotly
-    
-    fig_heat = go.Figure()
-    for cat in sorted(df_full['category'].unique()):
-        df_cat = df_full[df_full['category'] == cat]
-        color = cat_color_map.get(cat, default_colors[hash(cat) % len(default_colors)])
-        fig_heat.add_trace(go.Scatter(x=df_cat['x'], y=df_cat['y'], mode='markers', marker=dict(size=15, color=color, symbol='square'), text=df_cat['bin_id'] + "<br>" + df_cat['category'], name=cat))
-    fig_heat.update_layout(
-        title="Mapa de Localização", 
-        xaxis_title="Corredor (X)", 
-        yaxis_title="Profundidade (Y)", 
-        height=600,
-        plot_bgcolor='#f2f2f2', # Fundo cinza claro
-        xaxis=dict(showgrid=True, gridcolor='white'),
-        yaxis=dict(showgrid=True, gridcolor='white', scaleanchor="x", scaleratio=1) # Proporção real (Retangular)
-    )
-    st.plotly_chart(fig_heat, use_container_width=True)
-    
+    map_section = lazy_section("🗺️ Mapa de Localização", key="sec_map")
+    if map_section.open:
+        with map_section:
+            df_full = render_engine.build_warehouse_state(df_layout, df_alloc, df_skus)
+            st.plotly_chart(render_engine.get_or_build('category_map', render_engine.build_category_map_figure, df_full), use_container_width=True)
+
     # --- Relatório de Alocação ---
     st.header("📋 Relatório de Alocação (Sugestão de Slotting)")
-    df_report = df_alloc.merge(df_skus[['sku_id', 'category', 'popularity_score']], on='sku_id', how='left').merge(df_layout[['bin_id', 'zone_class', 'distance_to_dock_meters']], on='bin_id', how='left')
-    if 'category' not in df_report.columns: df_report['category'] = 'Geral'
-    df_zone_dist = df_report.groupby(['category', 'zone_class']).size().reset_index(name='count')
-    fig_zone = px.bar(df_zone_dist, x='category', y='count', color='zone_class', title="Distribuição de Produtos nas Zonas", barmode='stack')
-    st.plotly_chart(fig_zone, use_container_width=True)
-    
+    zone_section = lazy_section("📋 Distribuição nas Zonas", key="sec_zone")
+    if zone_section.open:
+        with zone_section:
+            st.plotly_chart(render_engine.get_or_build('zone_dist', render_engine.build_zone_distribution_figure, df_alloc, df_skus, df_layout), use_container_width=True)
+
     # --- Visualização 3D ---
     st.header("🏭 Visualização 3D do Armazém (Digital Twin)")
-    fig_3d = go.Figure()
-    fig_3d.add_trace(go.Mesh3d(x=[0, 30, 30, 0], y=[0, 0, 20, 20], z=[0, 0, 0, 0], color='lightgray', opacity=0.5, name='Piso'))
-    
-    for cat in sorted(df_full['category'].unique()):
-        df_cat = df_full[df_full['category'] == cat]
-        color = cat_color_map.get(cat, default_colors[hash(cat) % len(default_colors)])
-        fig_3d.add_trace(go.Scatter3d(x=df_cat['x'], y=df_cat['y'], z=df_cat['z'], mode='markers', marker=dict(size=5, color=color, symbol='square', line=dict(width=1, color='DarkSlateGrey')), name=cat, text=df_cat['bin_id']))
-        
-    fig_3d.add_trace(go.Scatter3d(x=[30]*3, y=[5, 10, 15], z=[0]*3, mode='text', text=['Doca 1', 'Doca 2', 'Doca 3'], textposition="top center", name='Docas'))
-    fig_3d.add_trace(go.Scatter3d(x=[28], y=[10], z=[0], mode='markers+text', marker=dict(size=10, color='gold', symbol='diamond'), text=['Staging (Hub)'], name='Staging'))
-    fig_3d.update_layout(title="Gêmeo Digital 3D", scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z', aspectmode='data'), height=700)
-    st.plotly_chart(fig_3d, use_container_width=True)
-    
+    twin_section = lazy_section("🏭 Gêmeo Digital 3D", key="sec_twin")
+    if twin_section.open:
+        with twin_section:
+            df_full = render_engine.build_warehouse_state(df_layout, df_alloc, df_skus)
+            st.plotly_chart(render_engine.get_or_build('twin_3d', render_engine.build_twin_3d_figure, df_full), use_container_width=True)
+
     # --- Rotas ---
     st.header("👷🏻‍♀️ Simulação de Rotas (Hub-and-Spoke)")
-    day_to_viz = st.slider("Selecione o Dia para Visualizar Rotas:", min_value=int(df_orders['day'].min()), max_value=int(df_orders['day'].max()), value=1)
-    sim_orders_day = df_orders[df_orders['day'] == day_to_viz].head(20) # Limit to 20 orders for clarity
-    
-    # Identify SKUs involved in the selected day's simulation
-    moved_sku_ids = sim_orders_day['sku_id'].unique()
-    
-    # Prepare Warehouse State Data
-    # 1. Merge Layout with Allocation to see what's where
-    df_warehouse_state = df_layout.merge(df_alloc, on='bin_id', how='left')
-    
-    # 2. Classify each bin
-    def classify_bin(row):
-        if pd.isna(row['sku_id']):
-            return 'Vazio'
-        elif row['sku_id'] in moved_sku_ids:
-            return 'Movimentado'
-        else:
-            return 'Estático'
-            
-    df_warehouse_state['status'] = df_warehouse_state.apply(classify_bin, axis=1)
-    
-    # 3. Create Figure
-    fig_routes = go.Figure()
-    
-    # 4. Plot Bins by Status
-    # Empty (Gray)
-    df_empty = df_warehouse_state[df_warehouse_state['status'] == 'Vazio']
-    fig_routes.add_trace(go.Scatter3d(x=df_empty['x'], y=df_empty['y'], z=df_empty['z'], 
-                                      mode='markers', marker=dict(size=3, color='lightgrey', opacity=0.3), 
-                                      name='Vazio'))
-                                      
-    # Static (Blue)
-    df_static = df_warehouse_state[df_warehouse_state['status'] == 'Estático']
-    fig_routes.add_trace(go.Scatter3d(x=df_static['x'], y=df_static['y'], z=df_static['z'], 
-                                      mode='markers', marker=dict(size=4, color='blue', opacity=0.5), 
-                                      name='Estático (Sem Interação)'))
-                                      
-    # Moved (Red)
-    df_moved = df_warehouse_state[df_warehouse_state['status'] == 'Movimentado']
-    fig_routes.add_trace(go.Scatter3d(x=df_moved['x'], y=df_moved['y'], z=df_moved['z'], 
-                                      mode='markers', marker=dict(size=6, color='red', symbol='square'), 
-                                      name='Movimentado (Alvo)'))
-
-    # 5. Plot Routes (Lines)
-    # Hub Node
-    fig_routes.add_trace(go.Scatter3d(x=[28], y=[10], z=[0], mode='markers', marker=dict(size=10, color='gold', symbol='diamond'), name='Hub (Staging)'))
-    
-    # Draw lines from Hub to Moved Bins
-    sim_routes = sim_orders_day.merge(df_alloc, on='sku_id', how='left').merge(df_layout, on='bin_id', how='left')
-    
-    for i, row in sim_routes.iterrows():
-        if pd.isna(row['bin_id']): continue
-        # Line Hub -> Bin
-        fig_routes.add_trace(go.Scatter3d(
-            x=[28, row['x']], y=[10, row['y']], z=[0, row['z']], 
-            mode='lines', 
-            line=dict(color='red', width=3), 
-            opacity=0.7, 
-            showlegend=False,
-            hoverinfo='none'
-        ))
-
-    # Layout improvements
-    fig_routes.update_layout(
-        title=f"Simulação 3D: Rotas do Dia {day_to_viz} (Hub-and-Spoke)", 
-        scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z', aspectmode='data'), 
-        height=700,
-        legend=dict(x=0, y=1)
-    )
-    st.plotly_chart(fig_routes, use_container_width=True)
-        
+    routes_section = lazy_section("🛣️ Rotas do Dia", key="sec_routes")
+    if routes_section.open:
+        with routes_section:
+            day_to_viz = st.slider("Selecione o Dia para Visualizar Rotas:", min_value=int(df_orders['day'].min()), max_value=int(df_orders['day'].max()), value=1)
+            fig_routes = render_engine.get_or_build('routes', render_engine.build_routes_figure, df_orders, df_alloc, df_layout, day=day_to_viz)
+            st.plotly_chart(fig_routes, use_container_width=True)
+
     # --- Heatmap Tráfego ---
     st.header("🔥 Mapa de Calor de Tráfego")
-    if not df_kpis.empty:
-        max_x, max_y = 30, 20
-        traffic_grid = np.zeros((max_x + 1, max_y + 1))
-        
-        # 1. Identificar pedidos simulados
-        simulated_order_ids = df_kpis['order_id'].unique()
-        
-        # 2. Filtrar itens desses pedidos
-        df_sim_items = df_orders[df_orders['order_id'].isin(simulated_order_ids)]
-        
-        # 3. Merge com Alocação e Layout para pegar coordenadas (X, Y)
-        df_traffic = df_sim_items.merge(df_alloc, on='sku_id', how='left').merge(df_layout, on='bin_id', how='left')
-        
-        for _, row in df_traffic.iterrows():
-            if pd.isna(row['x']): continue
-            start_x, start_y = 28, 10
-            end_x, end_y = int(row['x']), int(row['y'])
-            
-            step_x = 1 if end_x > start_x else -1
-            for x in range(start_x, end_x, step_x): traffic_grid[x, 10] += 1
-            
-            if end_y != 10:
-                step_y = 1 if end_y > 10 else -1
-                for y in range(10, end_y, step_y): traffic_grid[end_x, y] += 1
-            traffic_grid[end_x, end_y] += 1
-            
-        custom_colorscale = [[0.0, 'rgba(0,0,0,0)'], [0.01, 'rgba(255, 200, 200, 0.5)'], [0.5, 'rgba(255, 0, 0, 0.8)'], [1.0, 'rgba(100, 0, 0, 1.0)']]
-        fig_heat_traffic = go.Figure(data=go.Heatmap(z=traffic_grid.T, x=list(range(max_x + 1)), y=list(range(max_y + 1)), colorscale=custom_colorscale))
-        
-        # Add Warehouse Layout Overlay
-        shape_offset = 1.0
-        warehouse_shapes = []
-        for x in [10, 14, 18]: warehouse_shapes.append(dict(type="rect", x0=x-0.4+shape_offset, y0=0, x1=x+0.4+shape_offset, y1=20, line=dict(color="RoyalBlue", width=1), fillcolor="rgba(65, 105, 225, 0.05)"))
-        for x in [22, 24, 26]: warehouse_shapes.append(dict(type="rect", x0=x-0.4+shape_offset, y0=0, x1=x+0.4+shape_offset, y1=10, line=dict(color="Green", width=1), fillcolor="rgba(0, 128, 0, 0.05)"))
-        warehouse_shapes.append(dict(type="rect", x0=29.5+shape_offset, y0=0, x1=30.5+shape_offset, y1=20, line=dict(color="Black", width=1), fillcolor="rgba(0, 0, 0, 0.05)"))
-        warehouse_shapes.append(dict(type="circle", x0=27+shape_offset, y0=9, x1=29+shape_offset, y1=11, line=dict(color="Orange", width=2)))
-        for y in [0, 10, 20]: warehouse_shapes.append(dict(type="line", x0=0+shape_offset, y0=y, x1=30+shape_offset, y1=y, line=dict(color="Grey", width=1, dash="dot")))
-        
-        fig_heat_traffic.update_layout(title="Densidade de Tráfego", xaxis_title="X", yaxis_title="Y", height=600, shapes=warehouse_shapes, plot_bgcolor='#f2f2f2')
-        st.plotly_chart(fig_heat_traffic, use_container_width=True)
\ No newline at end of file
+    traffic_section = lazy_section("🔥 Densidade de Tráfego", key="sec_traffic")
+    if traffic_section.open and not df_kpis.empty:
+        with traffic_section:
+            fig_heat_traffic = render_engine.get_or_build('traffic', render_engine.build_traffic_figure, df_kpis, df_orders, df_alloc, df_layout)
+            st.plotly_chart(fig_heat_traffic, use_container_width=True)
+
+    # --- Log de Eventos ---
+    events_section = lazy_section("🎞️ Log de Eventos (Replay, Calor e Utilização)", key="sec_events")
+    if events_section.open:
+        with events_section:
+            event_log = results.get('event_log')
+            if not event_log or not os.path.exists(event_log):
+                st.info("Log de eventos indisponível para a amostragem adaptativa. Rode a simulação com amostra fixa ou com todos os pedidos.")
+            else:
+                # Consultas direto no arquivo (memory-map), sem re-simular
+                events = event_log_engine.read_event_log(event_log)
+                st.caption(f"{events.num_rows:,} eventos em {event_log} ({os.path.getsize(event_log) / 1e6:.1f} MB).")
+                tab_heat, tab_util, tab_replay = st.tabs(["Calor por Posição", "Utilização da Frota", "Replay de Rotas"])
+                with tab_heat:
+                    st.plotly_chart(render_engine.build_event_heatmap_figure(event_log_engine.bin_visits(events)), use_container_width=True)
+                with tab_util:
+                    st.plotly_chart(render_engine.build_utilization_figure(event_log_engine.forklift_utilization(events)), use_container_width=True)
+                with tab_replay:
+                    forklift_ids = sorted(set(events['forklift_id'].to_pylist()))
+                    replay_forklift = st.selectbox("Empilhadeira", ["Todas"] + forklift_ids)
+                    t_min, t_max = float(pc.min(events['start_s']).as_py()) / 3600, float(pc.max(events['end_s']).as_py()) / 3600
+                    t_start = st.slider("Início da janela (h)", min_value=t_min, max_value=max(t_max, t_min + 1), value=t_min)
+                    df_legs = event_log_engine.route_replay(events, forklift_id=None if replay_forklift == "Todas" else replay_forklift,
+                                                            start_s=t_start * 3600, end_s=(t_start + 1) * 3600)
+                    st.plotly_chart(render_engine.build_replay_figure(df_legs), use_container_width=True)
+
+    # --- Histórico de Cenários ---
+    history_section = lazy_section("🗄️ Histórico de Cenários (Comparação entre Execuções)", key="sec_history")
+    if history_section.open:
+        with history_section:
+            conn = results_engine.connect(results_engine.DEFAULT_DB_PATH)
+            try:
+                df_scenarios = results_engine.list_scenarios(conn)
+                st.caption(f"{len(df_scenarios)} cenário(s) em {results_engine.DEFAULT_DB_PATH}. Execução atual: #{results.get('scenario_id')}.")
+                st.dataframe(df_scenarios[['scenario_id', 'created_at', 'source', 'opt_method', 'demand_multiplier', 'forklift_speed',
+                                           'num_forklifts', 'orders_simulated', 'avg_time_opt_s', 'avg_dist_opt_m']], hide_index=True)
+
+                min_demand = st.number_input("Melhor alocação com Mult. Demanda ≥", min_value=0.0, max_value=3.0, value=1.0, step=0.1)
+                best, df_best_alloc = results_engine.best_allocation(conn, min_params={'demand_multiplier': min_demand})
+                if best is None:
+                    st.info("Nenhum cenário gravado para esse filtro.")
+                else:
+                    st.caption(f"Melhor: cenário #{best['scenario_id']} ({best['source']}, {best['created_at']}), "
+                               f"{best['avg_time_opt_s']:.1f} s/pedido, {len(df_best_alloc)} posições.")
+
+                if len(df_scenarios) >= 2:
+                    ids = df_scenarios['scenario_id'].tolist()
+                    h1, h2 = st.columns(2)
+                    scenario_a = h1.selectbox("Cenário A", ids, index=1)
+                    scenario_b = h2.selectbox("Cenário B", ids, index=0)
+                    df_diff = results_engine.allocation_diff(conn, scenario_a, scenario_b)
+                    st.caption(f"{len(df_diff)} posições diferentes: " + ", ".join(f"{k} {v}" for k, v in df_diff['status'].value_counts().items()))
+                    st.dataframe(df_diff, hide_index=True)
+            finally:
+                conn.close()
@@ -0,0 +1,41 @@
+"""
+Engines do Gêmeo Digital do Armazém.
+
+Os submódulos são carregados sob demanda (PEP 562): `import src` não importa pandas,
+pyarrow nem plotly; `src.simulation_engine` (ou `from src import simulation_engine`)
+importa só aquele engine e suas dependências.
+"""
+import importlib
+
+__all__ = [
+    'data_engine',
+    'dock_engine',
+    'event_log_engine',
+    'forecast_engine',
+    'ingestion_engine',
+    'inventory_engine',
+    'jit_engine',
+    'kinematics_engine',
+    'network_engine',
+    'pipeline_engine',
+    'putaway_engine',
+    'relocation_engine',
+    'render_engine',
+    'results_engine',
+    'sampling_engine',
+    'sensitivity_engine',
+    'simulation_engine',
+    'slotting_engine',
+    'startup_engine',
+    'surrogate_engine',
+]
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f'{__name__}.{name}')
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,23 +1,31 @@
+import bisect
+import itertools
+
 import pandas as pd
 import numpy as np
-import random
 
-# Configuração de Semente para Reprodutibilidade
-random.seed(42)
-np.random.seed(42)
+# Sem semente global: cada gerador recebe seed (int ou np.random.Generator) por chamada,
+# para que processos paralelos sejam reprodutíveis sem disputar o estado do random/np.random.
+# Sem seed explícita, os dados são sempre os mesmos (seed=None gera dados novos a cada chamada)
+DEFAULT_SEED = 42
 
 class WarehouseTopology:
-    def __init__(self):
+    # Os parâmetros permitem variantes do prédio (outros CDs da rede) com o mesmo gabarito:
+    # Staging em (28, 10), cross aisles em Y = 0/10/20 e docas em X = 30
+    def __init__(self, rack_xs=(10, 14, 18), shelving_xs=(22, 24, 26), levels=5):
+        self.rack_xs = list(rack_xs)
+        self.shelving_xs = list(shelving_xs)
+        self.levels = levels
         self.nodes = []
         self._build_topology()
 
     def _build_topology(self):
         # --- ZONA A (Racks) - Paletadeiras (X <= 18) ---
-        rack_xs = [10, 14, 18]
+        rack_xs = self.rack_xs
         for i, x in enumerate(rack_xs):
             aisle_id = f"R{i+1}"
             for y in range(21): # Y 0-20
-                for z in range(1, 6):
+                for z in range(1, self.levels + 1):
                     self.nodes.append({
                         'bin_id': f"{aisle_id}_{y}_{z}",
                         'x': x, 'y': y, 'z': z, 'zone': 'A',
@@ -25,11 +33,11 @@ class WarehouseTopology:
                     })
 
         # --- ZONA B (Shelving) - Manual (X > 18) ---
-        shelving_xs = [22, 24, 26]
+        shelving_xs = self.shelving_xs
         for i, x in enumerate(shelving_xs):
             aisle_id = f"S{i+1}"
             for y in range(11): # Y 0-10
-                for z in range(1, 6):
+                for z in range(1, self.levels + 1):
                     self.nodes.append({
                         'bin_id': f"{aisle_id}_{y}_{z}",
                         'x': x, 'y': y, 'z': z, 'zone': 'B',
@@ -70,12 +78,14 @@ class WarehouseTopology:
         df['zone_class'] = df['distance_to_dock_meters'].apply(classify_bin)
         return df
 
-def generate_layout():
-    topology = WarehouseTopology()
+def generate_layout(topology=None):
+    topology = topology or WarehouseTopology()
     df_layout = topology.get_all_nodes_data()
     return df_layout
 
-def generate_skus(num_skus=500):
+def generate_skus(num_skus=500, seed=DEFAULT_SEED):
+    # seed: int ou np.random.Generator (None = dados novos a cada chamada)
+    rng = np.random.default_rng(seed)
     skus = []
     # Distribuição Pareto (Model Stock)
     # 20% SKUs = Classe A (Alto Giro)
@@ -96,26 +106,27 @@ def generate_skus(num_skus=500):
         sku_id = f"SKU_{i:03d}"
         
         # Determinar Classe ABC
-        rand_val = random.random()
+        rand_val = rng.random()
         if rand_val < 0.2:
             abc_class = 'A'
-            popularity_score = random.uniform(50, 100) # Alta popularidade
+            popularity_score = rng.uniform(50, 100) # Alta popularidade
         elif rand_val < 0.5:
             abc_class = 'B'
-            popularity_score = random.uniform(10, 50)
+            popularity_score = rng.uniform(10, 50)
         else:
             abc_class = 'C'
-            popularity_score = random.uniform(1, 10)
+            popularity_score = rng.uniform(1, 10)
             
         # Selecionar Categoria e Propriedades Físicas
-        cat_data = random.choice(cleaning_categories)
+        cat_data = cleaning_categories[rng.integers(len(cleaning_categories))]
         category = cat_data['name']
         
         # Peso da CAIXA (Picking Unit)
-        weight_per_unit = random.uniform(*cat_data['weight_range'])
+        weight_per_unit = rng.uniform(*cat_data['weight_range'])
         
         # Quantidade de Caixas por Palete (Entrada/Armazenagem)
-        units_per_pallet = random.randint(*cat_data['units_pallet_range'])
+        low, high = cat_data['units_pallet_range']
+        units_per_pallet = int(rng.integers(low, high + 1))
             
         pallet_weight = weight_per_unit * units_per_pallet
         
@@ -131,38 +142,43 @@ def generate_skus(num_skus=500):
         })
     return pd.DataFrame(skus)
 
-def generate_orders(df_skus, num_orders=2000, demand_multiplier=1.0):
+def generate_orders(df_skus, num_orders=2000, demand_multiplier=1.0, seed=DEFAULT_SEED):
+    # seed: int ou np.random.Generator (None = dados novos a cada chamada)
+    rng = np.random.default_rng(seed)
     orders = []
     waves = ['Morning', 'Afternoon']
     
     # Converter para lista com pesos de probabilidade baseados na popularidade
+    # (pesos acumulados uma vez só; o sorteio de cada linha é uma busca binária)
     skus_list = df_skus.to_dict('records')
-    weights = [sku['popularity_score'] for sku in skus_list]
+    cum_weights = list(itertools.accumulate(sku['popularity_score'] for sku in skus_list))
+    total_weight = cum_weights[-1]
     
     # Capacidade do Caminhão (Pallets)
     MAX_PALLETS_PER_TRUCK = 30
     
     for i in range(1, num_orders + 1):
         order_id = f"ORD_{i:05d}"
-        day = random.randint(1, 30)
-        wave = random.choice(waves)
+        day = int(rng.integers(1, 31))
+        wave = waves[rng.integers(len(waves))]
         
         current_pallets = 0
+        order_skus = set() # SKUs já presentes neste pedido
         
         # Tentar encher o caminhão (ou fazer um pedido LTL)
         # Limite de tentativas para não ficar loop infinito se só tiver itens gigantes
         while current_pallets < MAX_PALLETS_PER_TRUCK:
             # Selecionar SKU
-            sku = random.choices(skus_list, weights=weights, k=1)[0]
+            sku = skus_list[bisect.bisect_right(cum_weights, rng.random() * total_weight)]
             
             # Verificar se SKU já está no pedido (simplificação: permite duplicar linha ou não? 
             # Melhor não duplicar SKU no mesmo pedido para simplificar visualização)
-            if any(o['sku_id'] == sku['sku_id'] for o in orders if o['order_id'] == order_id):
+            if sku['sku_id'] in order_skus:
                 continue
 
             # Definir quantidade (1 a 5 pallets por item, ou fração)
             # Agora geramos baseado em pallets para controlar a capacidade
-            pallets_for_item = random.uniform(0.5, 5.0) 
+            pallets_for_item = rng.uniform(0.5, 5.0)
             
             # Ajustar se passar do limite do caminhão
             if current_pallets + pallets_for_item > MAX_PALLETS_PER_TRUCK:
@@ -178,6 +194,7 @@ def generate_orders(df_skus, num_orders=2000, demand_multiplier=1.0):
             # Atualizar contagem
             current_pallets += (qty / sku['units_per_pallet'])
             
+            order_skus.add(sku['sku_id'])
             orders.append({
                 'order_id': order_id,
                 'day': day,
@@ -188,7 +205,7 @@ def generate_orders(df_skus, num_orders=2000, demand_multiplier=1.0):
             
             # Chance de parar antes de encher (pedidos menores/LTL)
             # 10% de chance de parar a cada item adicionado
-            if random.random() < 0.1 and current_pallets > 5:
+            if rng.random() < 0.1 and current_pallets > 5:
                 break
                 
     return pd.DataFrame(orders)
\ No newline at end of file
@@ -0,0 +1,187 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from src import data_engine, simulation_engine
+
+# Carga máxima de um caminhão (paletes); pedidos maiores viram mais de um caminhão
+TRUCK_MAX_PALLETS = 30
+# Encostar, conferir e desencostar o caminhão (s)
+DOCK_SETUP_S = 600
+# Manuseio por palete na doca: pegar no Staging e posicionar no caminhão (s), além da viagem
+PALLET_HANDLING_S = 45
+# Prioridade da onda: a expedição da manhã sai antes da da tarde
+WAVE_PRIORITY = {'Morning': 0, 'Afternoon': 1}
+SECONDS_PER_DAY = 86400
+
+def dock_table(num_active_docks=1, forklift_speed=1.5):
+    """
+    Docas ativas (as num_active_docks mais próximas do Staging, entre as do WarehouseTopology)
+    com a distância pré-calculada Staging -> doca e o tempo por palete carregado
+    (ida e volta da empilhadeira + manuseio).
+    """
+    docks = [
+        {'dock_id': d['id'], 'x': d['x'], 'y': d['y'], 'z': d['z'],
+         'dist_m': abs(simulation_engine.STAGING_X - d['x']) + abs(simulation_engine.STAGING_Y - d['y'])}
+        for d in data_engine.WarehouseTopology().dock_positions
+    ]
+    docks = sorted(docks, key=lambda d: (d['dist_m'], d['dock_id']))[:max(1, num_active_docks)]
+    df_docks = pd.DataFrame(docks)
+    df_docks['pallet_time_s'] = PALLET_HANDLING_S + 2 * df_docks['dist_m'] / forklift_speed
+    return df_docks
+
+def order_pallets(df_orders, df_skus=None):
+    # Paletes de expedição por pedido: cada linha ocupa ceil(qty / units_per_pallet) paletes (1 por linha sem mestre de SKUs)
+    if df_skus is None:
+        return df_orders.groupby('order_id', sort=False).size()
+    upp = df_orders['sku_id'].map(df_skus.set_index('sku_id')['units_per_pallet']).fillna(1).to_numpy()
+    pallets = np.ceil(df_orders['quantity'].to_numpy() / upp)
+    return pd.Series(pallets, index=df_orders['order_id'].to_numpy()).groupby(level=0, sort=False).sum().astype(int)
+
+def order_pick_times(df_orders, df_alloc, df_layout, forklift_speed=1.5):
+    # Tempo de picking por pedido (s), mesmo modelo de tempo do run_simulation, para todos os pedidos
+    df_metrics = simulation_engine.compute_line_metrics(df_orders, df_alloc, df_layout)
+    _, line_time_s = simulation_engine.line_times(df_metrics, forklift_speed)
+    return pd.Series(line_time_s, index=df_metrics['order_id'].to_numpy()).groupby(level=0, sort=False).sum()
+
+def order_ready_times(df_orders, order_time_s, num_forklifts=5, shift_hours=16.0, waves=simulation_engine.SHIPPING_WAVES):
+    """
+    Instante (s desde o início do mês) em que cada pedido fica pronto no Staging:
+    início da janela da onda + tempo acumulado dos pedidos da mesma onda dividido pela frota
+    (aproximação fluida do picking em paralelo). order_time_s: Series order_id -> tempo de picking.
+    """
+    df_ord = df_orders.drop_duplicates('order_id')
+    order_ids = df_ord['order_id'].to_numpy()
+    day = df_ord['day'].to_numpy()
+    wave = df_ord['shipping_wave'].to_numpy()
+    wave_len_s = shift_hours * 3600 / len(waves)
+    wave_idx = pd.Series(wave).map({w: k for k, w in enumerate(waves)}).fillna(0).to_numpy()
+    window_start = (day - 1) * SECONDS_PER_DAY + wave_idx * wave_len_s
+
+    # Soma acumulada por (dia, onda), na ordem do backlog
+    time_s = order_time_s.reindex(order_ids).fillna(0).to_numpy(dtype=float)
+    slot = day * len(waves) + wave_idx
+    order = np.argsort(slot, kind='stable')
+    cum = np.cumsum(time_s[order])
+    first = np.r_[True, slot[order][1:] != slot[order][:-1]]
+    seg_start = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0)) if len(order) else order
+    cum_time = np.empty(len(order))
+    cum_time[order] = cum - (cum - time_s[order])[seg_start]
+
+    return pd.DataFrame({
+        'day': day,
+        'shipping_wave': wave,
+        'ready_s': window_start + cum_time / num_forklifts,
+        'due_s': window_start + wave_len_s,
+    }, index=pd.Index(order_ids, name='order_id'))
+
+def build_trucks(df_ready, pallets):
+    """
+    Um caminhão por pedido (até TRUCK_MAX_PALLETS paletes); pedidos maiores são divididos.
+    """
+    n_pallets = pallets.reindex(df_ready.index).fillna(1).clip(lower=1).to_numpy(dtype=int)
+    n_trucks = np.ceil(n_pallets / TRUCK_MAX_PALLETS).astype(int)
+    rep = np.repeat(np.arange(len(df_ready)), n_trucks)
+    k = np.arange(len(rep)) - np.repeat(np.cumsum(n_trucks) - n_trucks, n_trucks)
+    truck_pallets = np.minimum(n_pallets[rep] - k * TRUCK_MAX_PALLETS, TRUCK_MAX_PALLETS)
+
+    df_trucks = df_ready.iloc[rep].reset_index()
+    df_trucks.insert(0, 'truck_id', np.arange(len(df_trucks)))
+    df_trucks['pallets'] = truck_pallets
+    return df_trucks
+
+def schedule_docks(df_trucks, df_docks):
+    """
+    Escalonamento com fila de prioridade: sempre que uma doca fica livre, o caminhão pronto
+    de maior prioridade (menor prazo, depois onda da manhã, depois chegada) encosta na doca livre
+    mais próxima do Staging. Tempo de carga = setup + paletes x tempo por palete da doca.
+    """
+    # Listas Python no laço: indexar escalares de arrays NumPy é bem mais lento
+    ready = df_trucks['ready_s'].to_numpy(dtype=float)
+    by_ready = np.argsort(ready, kind='stable').tolist()
+    ready = ready.tolist()
+    due = df_trucks['due_s'].to_numpy(dtype=float).tolist()
+    wave_rank = df_trucks['shipping_wave'].map(WAVE_PRIORITY).fillna(len(WAVE_PRIORITY)).tolist()
+    pallets = df_trucks['pallets'].tolist()
+    pallet_time = df_docks['pallet_time_s'].tolist()
+    dock_dist = df_docks['dist_m'].tolist()
+
+    n = len(df_trucks)
+    start = [0.0] * n
+    end = [0.0] * n
+    dock = [0] * n
+
+    queue = []                                        # (prazo, onda, pronto, caminhão)
+    free = [(dock_dist[d], d) for d in range(len(df_docks))]
+    heapq.heapify(free)                               # docas livres, mais próxima primeiro
+    busy = []                                         # (livre_em, doca)
+    t = 0.0
+    i = scheduled = 0
+    while scheduled < n:
+        while i < n and ready[by_ready[i]] <= t:
+            k = by_ready[i]
+            heapq.heappush(queue, (due[k], wave_rank[k], ready[k], k))
+            i += 1
+        while busy and busy[0][0] <= t:
+            _, d = heapq.heappop(busy)
+            heapq.heappush(free, (dock_dist[d], d))
+
+        if not free:
+            t = busy[0][0]
+            continue
+        if not queue:
+            t = ready[by_ready[i]]
+            continue
+
+        _, _, _, k = heapq.heappop(queue)
+        _, d = heapq.heappop(free)
+        start[k] = t
+        end[k] = t + DOCK_SETUP_S + pallets[k] * pallet_time[d]
+        dock[k] = d
+        heapq.heappush(busy, (end[k], d))
+        scheduled += 1
+
+    df_schedule = df_trucks.copy()
+    df_schedule['dock_id'] = df_docks['dock_id'].to_numpy()[dock] if n else []
+    df_schedule['start_s'] = start
+    df_schedule['end_s'] = end
+    df_schedule['wait_s'] = df_schedule['start_s'] - df_schedule['ready_s']
+    df_schedule['late'] = df_schedule['end_s'] > df_schedule['due_s']
+    return df_schedule
+
+def dock_kpis(df_schedule, df_docks, horizon_s=None):
+    """
+    Utilização por doca (tempo ocupado / horizonte do escalonamento) e resumo das esperas.
+    """
+    if horizon_s is None:
+        horizon_s = (df_schedule['end_s'].max() - df_schedule['ready_s'].min()) if not df_schedule.empty else 0.0
+    busy = (df_schedule['end_s'] - df_schedule['start_s']).groupby(df_schedule['dock_id']).agg(['size', 'sum'])
+    df_util = df_docks[['dock_id', 'dist_m']].merge(busy.rename(columns={'size': 'trucks', 'sum': 'busy_s'}), left_on='dock_id', right_index=True, how='left')
+    df_util = df_util.fillna({'trucks': 0, 'busy_s': 0.0})
+    df_util['utilization_pct'] = df_util['busy_s'] / horizon_s * 100 if horizon_s > 0 else 0.0
+
+    wait_min = df_schedule['wait_s'] / 60
+    summary = {
+        'trucks': len(df_schedule),
+        'active_docks': len(df_docks),
+        'avg_wait_min': wait_min.mean() if not df_schedule.empty else 0.0,
+        'p95_wait_min': wait_min.quantile(0.95) if not df_schedule.empty else 0.0,
+        'max_wait_min': wait_min.max() if not df_schedule.empty else 0.0,
+        'late_trucks': int(df_schedule['late'].sum()),
+        'avg_dock_utilization': df_util['utilization_pct'].mean(),
+    }
+    return df_util, summary
+
+def run_dock_scheduling(df_orders, order_time_s, df_skus=None, num_active_docks=1, forklift_speed=1.5, num_forklifts=5, shift_hours=16.0):
+    """
+    Pipeline das docas: prontidão dos pedidos no Staging -> caminhões -> escalonamento -> KPIs.
+    order_time_s: Series order_id -> tempo de picking (ex.: time_opt_s do run_simulation).
+    Retorna (agenda por caminhão, utilização por doca, resumo).
+    """
+    df_docks = dock_table(num_active_docks, forklift_speed)
+    df_ready = order_ready_times(df_orders, order_time_s, num_forklifts=num_forklifts, shift_hours=shift_hours)
+    df_trucks = build_trucks(df_ready, order_pallets(df_orders, df_skus))
+    df_schedule = schedule_docks(df_trucks, df_docks)
+    df_util, summary = dock_kpis(df_schedule, df_docks)
+    return df_schedule, df_util, summary
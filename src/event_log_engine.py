@@ -0,0 +1,232 @@
+"""
+Log colunar de eventos de movimentação (uma linha por perna/operação da empilhadeira).
+
+Escrito de forma incremental em grupos de linhas (Parquet ou Arrow IPC) pelo
+run_simulation(event_log_path=...) e lido de volta por memory-map, para que mapas de calor,
+replay de rotas e utilização da frota consultem o log sem re-simular.
+
+Uso:
+    simulation_engine.run_simulation(df_orders, df_alloc, df_layout, event_log_path='data/eventos.parquet')
+    events = event_log_engine.read_event_log('data/eventos.parquet', filters=pc.field('forklift_id') == 0)
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src import simulation_engine
+
+STAGING_BIN = 'STAGING'
+# Sequência de cada linha (Hub-and-Spoke): busca o palete, separa as caixas no Staging e devolve o palete
+LEG_TYPES = ['travel_empty', 'lift', 'travel_loaded', 'pick', 'travel_return', 'putaway']
+LINE_EVENTS = [0, 1, 2, 3, 4, 5, 0] # Índices em LEG_TYPES (a última perna volta vazia ao Staging)
+TRAVEL_LEGS = ['travel_empty', 'travel_loaded', 'travel_return']
+
+# Linhas de pedido por grupo de linhas (7 eventos por linha)
+ROW_GROUP_LINES = 65536
+SECONDS_PER_DAY = 86400
+
+def event_schema():
+    # Strings repetidas (pedido, bin, tipo de perna) em dicionário: o log fica em poucos bytes por evento
+    return pa.schema([
+        ('day', pa.int16()),
+        ('order_id', pa.dictionary(pa.int32(), pa.string())),
+        ('forklift_id', pa.int16()),
+        ('start_s', pa.float64()),
+        ('end_s', pa.float64()),
+        ('leg_type', pa.dictionary(pa.int8(), pa.string())),
+        ('from_bin', pa.dictionary(pa.int32(), pa.string())),
+        ('to_bin', pa.dictionary(pa.int32(), pa.string())),
+        ('from_x', pa.int16()),
+        ('from_y', pa.int16()),
+        ('to_x', pa.int16()),
+        ('to_y', pa.int16()),
+        ('load_units', pa.int32()),
+    ])
+
+def schedule_orders(order_ids, order_days, order_time_s, num_forklifts=5):
+    """
+    Atribui cada pedido à empilhadeira que fica livre primeiro (heap), dia a dia: os pedidos
+    de um dia começam no início do dia ou quando a empilhadeira termina o trabalho anterior.
+    Retorna (forklift_id, início absoluto em s) na ordem de order_ids.
+    """
+    forklift_id = np.empty(len(order_ids), dtype=np.int16)
+    start_s = np.empty(len(order_ids))
+
+    forklifts = [(0.0, f) for f in range(num_forklifts)]
+    current_day = None
+    for k in np.argsort(order_days, kind='stable'):
+        day, time_s = order_days[k], order_time_s[k]
+        if day != current_day:
+            current_day = day
+            day_start = (day - 1) * SECONDS_PER_DAY
+            forklifts = [(max(free_at, day_start), f) for free_at, f in forklifts]
+            heapq.heapify(forklifts)
+        free_at, fid = forklifts[0]
+        forklift_id[k] = fid
+        start_s[k] = free_at
+        heapq.heapreplace(forklifts, (free_at + time_s, fid))
+    return forklift_id, start_s
+
+def _line_events(df_lines, forklift_speed):
+    """
+    Durações (n_linhas, 7) das operações de cada linha: 4 pernas de viagem, elevação e
+    descida (metade do tempo de elevação cada) e picking no Staging. A soma de cada linha
+    é o time_s do line_times. Com o modelo cinemático, as durações vêm das colunas por operação
+    que o kinematics_engine.line_times acrescenta às linhas.
+    """
+    pick = df_lines['picking_time_s'].to_numpy(dtype=float)
+    if 'travel_empty_s' in df_lines.columns:
+        empty, loaded = df_lines['travel_empty_s'].to_numpy(), df_lines['travel_loaded_s'].to_numpy()
+        return np.column_stack([empty, df_lines['lift_s'].to_numpy(), loaded, pick, loaded, df_lines['putaway_s'].to_numpy(), empty])
+
+    speed = np.where(df_lines['is_bronze'].to_numpy(dtype=bool), forklift_speed * simulation_engine.BRONZE_SPEED_FACTOR, forklift_speed)
+    travel = df_lines['dist_leg_m'].to_numpy() / speed
+    lift = df_lines['time_lift_s'].to_numpy() / 2
+    return np.column_stack([travel, lift, travel, pick, travel, lift, travel])
+
+def write_event_log(df_metrics, sim_orders, order_days, event_log_path, forklift_speed=1.5, num_forklifts=5,
+                    row_group_lines=ROW_GROUP_LINES):
+    """
+    Gera e grava o log de eventos das linhas simuladas (saída de compute_line_metrics com time_s).
+    Os pedidos são processados na ordem de sim_orders; cada grupo de row_group_lines linhas
+    vira um grupo de linhas no arquivo (.parquet ou .arrow), sem montar o log inteiro em memória.
+    Retorna o número de eventos gravados.
+    """
+    if not event_log_path.endswith(('.parquet', '.arrow')):
+        raise ValueError(f"Formato de log não suportado: {event_log_path} (use .parquet ou .arrow)")
+
+    # Linhas na ordem de execução (pedido a pedido); tempo de cada pedido para o escalonamento
+    order_pos = pd.Series(np.arange(len(sim_orders)), index=sim_orders)
+    df_lines = df_metrics.assign(_order_pos=df_metrics['order_id'].map(order_pos).to_numpy())
+    df_lines = df_lines.sort_values('_order_pos', kind='stable').reset_index(drop=True)
+    order_time = np.bincount(df_lines['_order_pos'].to_numpy(), weights=df_lines['time_s'].to_numpy(), minlength=len(sim_orders))
+    forklift_of_order, start_of_order = schedule_orders(sim_orders, order_days, order_time, num_forklifts)
+
+    # Início de cada linha: início do pedido + linhas anteriores do mesmo pedido
+    line_pos = df_lines['_order_pos'].to_numpy()
+    line_start = start_of_order[line_pos] + df_lines.groupby('_order_pos')['time_s'].cumsum().to_numpy() - df_lines['time_s'].to_numpy()
+
+    # Dicionários globais (iguais em todos os grupos de linhas)
+    order_dict = pa.array(np.asarray(sim_orders, dtype=str))
+    bin_values = np.concatenate([[STAGING_BIN], pd.unique(df_lines['bin_id'].astype(str))])
+    bin_dict = pa.array(bin_values)
+    bin_code = pd.Series(np.arange(len(bin_values)), index=bin_values)
+    leg_dict = pa.array(LEG_TYPES)
+
+    schema = event_schema()
+    if event_log_path.endswith('.parquet'):
+        writer = pq.ParquetWriter(event_log_path, schema, compression='zstd')
+        write = lambda table: writer.write_table(table, row_group_size=table.num_rows)
+    else:
+        writer = pa.ipc.new_file(event_log_path, schema)
+        write = writer.write_table
+
+    n_events = 0
+    legs = np.asarray(LINE_EVENTS, dtype=np.int8)
+    # Pernas que saem do Staging para o bin (0, 4) e do bin para o Staging (2, 6)
+    at_bin_from = np.array([False, True, True, False, False, True, True])
+    at_bin_to = np.array([True, True, False, False, True, True, False])
+    try:
+        for lo in range(0, len(df_lines), row_group_lines):
+            chunk = df_lines.iloc[lo:lo + row_group_lines]
+            n = len(chunk)
+            durations = _line_events(chunk, forklift_speed)
+            starts = line_start[lo:lo + n, None] + np.cumsum(durations, axis=1) - durations
+
+            bins = bin_code.loc[chunk['bin_id'].astype(str)].to_numpy(dtype=np.int32)
+            x = chunk['x'].to_numpy(dtype=np.int16)
+            y = chunk['y'].to_numpy(dtype=np.int16)
+            qty = chunk['quantity'].to_numpy(dtype=np.int32)
+
+            from_bin = np.where(at_bin_from, bins[:, None], 0).ravel()
+            to_bin = np.where(at_bin_to, bins[:, None], 0).ravel()
+            load = np.where(np.isin(np.arange(7), [1, 2, 3]), qty[:, None], 0).ravel()
+
+            table = pa.Table.from_arrays([
+                pa.array(np.repeat(chunk['day'].to_numpy(dtype=np.int16), 7)),
+                pa.DictionaryArray.from_arrays(pa.array(np.repeat(line_pos[lo:lo + n].astype(np.int32), 7)), order_dict),
+                pa.array(np.repeat(forklift_of_order[line_pos[lo:lo + n]], 7)),
+                pa.array(starts.ravel()),
+                pa.array((starts + durations).ravel()),
+                pa.DictionaryArray.from_arrays(pa.array(np.tile(legs, n)), leg_dict),
+                pa.DictionaryArray.from_arrays(pa.array(from_bin), bin_dict),
+                pa.DictionaryArray.from_arrays(pa.array(to_bin), bin_dict),
+                pa.array(np.where(at_bin_from, x[:, None], simulation_engine.STAGING_X).ravel().astype(np.int16)),
+                pa.array(np.where(at_bin_from, y[:, None], simulation_engine.STAGING_Y).ravel().astype(np.int16)),
+                pa.array(np.where(at_bin_to, x[:, None], simulation_engine.STAGING_X).ravel().astype(np.int16)),
+                pa.array(np.where(at_bin_to, y[:, None], simulation_engine.STAGING_Y).ravel().astype(np.int16)),
+                pa.array(load),
+            ], schema=schema)
+            write(table)
+            n_events += table.num_rows
+    finally:
+        writer.close()
+    return n_events
+
+def read_event_log(event_log_path, columns=None, filters=None):
+    """
+    Lê o log por memory-map (pyarrow.Table, sem cópia para .arrow).
+    filters: expressão pyarrow.compute, ex.: (pc.field('day') == 3) & (pc.field('forklift_id') == 1).
+    No Parquet, o filtro descarta grupos de linhas pelas estatísticas antes de ler.
+    """
+    if event_log_path.endswith('.parquet'):
+        return pq.read_table(event_log_path, columns=columns, filters=filters, memory_map=True)
+
+    table = pa.ipc.open_file(pa.memory_map(event_log_path, 'r')).read_all()
+    if filters is not None:
+        table = table.filter(filters)
+    return table.select(columns) if columns else table
+
+def bin_visits(events):
+    """
+    Chegadas (busca e devolução do palete) e tempo ocupado por posição (x, y) de bin.
+    """
+    df = events.filter(pc.field('to_bin') != STAGING_BIN).select(['to_x', 'to_y', 'leg_type', 'start_s', 'end_s']).to_pandas()
+    df['busy_s'] = df['end_s'] - df['start_s']
+    df['is_arrival'] = df['leg_type'].isin(['travel_empty', 'travel_return'])
+    return df.groupby(['to_x', 'to_y'], observed=True).agg(
+        visits=('is_arrival', 'sum'),
+        busy_s=('busy_s', 'sum'),
+    ).reset_index().rename(columns={'to_x': 'x', 'to_y': 'y'})
+
+def forklift_utilization(events, bucket_s=3600):
+    """
+    Tempo ocupado por empilhadeira e faixa de horário (bucket_s).
+    Eventos que atravessam o limite de uma faixa são divididos entre as faixas.
+    """
+    df = events.select(['forklift_id', 'start_s', 'end_s']).to_pandas()
+    start = df['start_s'].to_numpy()
+    end = df['end_s'].to_numpy()
+    first = (start // bucket_s).astype(np.int64)
+    last = np.maximum(np.ceil(end / bucket_s).astype(np.int64) - 1, first)
+
+    # Uma linha por (evento, faixa coberta): quase sempre 1 ou 2 faixas por evento
+    span = last - first + 1
+    rep = np.repeat(np.arange(len(df)), span)
+    bucket = first[rep] + np.arange(len(rep)) - np.repeat(np.cumsum(span) - span, span)
+    busy = np.minimum(end[rep], (bucket + 1) * bucket_s) - np.maximum(start[rep], bucket * bucket_s)
+
+    df_util = pd.DataFrame({'forklift_id': df['forklift_id'].to_numpy()[rep], 'bucket': bucket, 'busy_s': busy})
+    df_util = df_util.groupby(['forklift_id', 'bucket'])['busy_s'].sum().reset_index()
+    df_util['bucket_start_h'] = df_util['bucket'] * bucket_s / 3600
+    df_util['utilization_pct'] = df_util['busy_s'] / bucket_s * 100
+    return df_util
+
+def route_replay(events, forklift_id=None, start_s=None, end_s=None):
+    """
+    Pernas de viagem em ordem de tempo (para replay), filtradas por empilhadeira e janela.
+    """
+    expr = pc.field('leg_type').isin(TRAVEL_LEGS)
+    if forklift_id is not None:
+        expr = expr & (pc.field('forklift_id') == forklift_id)
+    if start_s is not None:
+        expr = expr & (pc.field('end_s') >= start_s)
+    if end_s is not None:
+        expr = expr & (pc.field('start_s') <= end_s)
+
+    df = events.filter(expr).to_pandas()
+    return df.sort_values(['forklift_id', 'start_s']).reset_index(drop=True)
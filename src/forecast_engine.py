@@ -0,0 +1,138 @@
+"""
+Previsão de demanda por SKU para o slotting olhar para frente, não só para o histórico:
+matriz SKU x dia de viagens (paletes) ponderadas pela onda, a partir do pedidos_backlog,
+e suavização exponencial simples (SES) ou Croston para todos os SKUs de uma vez, como
+operações sobre arrays (sem laço por SKU).
+
+Uso:
+    df_scores = forecast_engine.forecast_sku_scores(df_orders, df_skus, horizon_days=7)
+    df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout, score_source='forecast')
+"""
+import numpy as np
+import pandas as pd
+
+# ADI (intervalo médio entre dias com demanda) acima do qual a demanda é intermitente (Syntetos-Boylan)
+ADI_INTERMITTENT = 1.32
+FORECAST_METHODS = ['auto', 'ses', 'croston']
+
+def demand_matrix(df_orders, df_skus, wave_weight_morning=1.5, wave_weight_afternoon=1.0):
+    """
+    Matriz SKU x dia do esforço diário: viagens ceil(quantity / units_per_pallet) x peso da onda,
+    a mesma unidade do total_effort_score do calculate_sku_scores (a soma de cada linha é o score histórico).
+    Dias sem pedido dentro do intervalo do backlog entram como zero.
+
+    Retorna (sku_ids, days, matrix), matrix[i, t] = esforço do SKU sku_ids[i] no dia days[t].
+    """
+    # Códigos por SKU com um único factorize (strings do backlog são a parte cara); lookups nos SKUs únicos
+    codes, uniques = pd.factorize(df_orders['sku_id'])
+    upp = df_skus.set_index('sku_id')['units_per_pallet'].reindex(uniques).to_numpy(dtype=float)
+    order = np.argsort(np.asarray(uniques, dtype=object), kind='stable')
+    known = ~np.isnan(upp[order])
+    new_code = np.full(len(uniques), -1)
+    new_code[order[known]] = np.arange(known.sum())
+    sku_ids = np.asarray(uniques, dtype=object)[order[known]]
+
+    codes = new_code[codes]
+    lines = codes >= 0
+    day = df_orders['day'].to_numpy(dtype=np.int64)[lines]
+    first_day = int(day.min()) if len(day) else 1
+    days = np.arange(first_day, int(day.max()) + 1 if len(day) else first_day)
+
+    trips = np.ceil(df_orders['quantity'].to_numpy(dtype=float)[lines] / upp[order[known]][codes[lines]])
+    wave_weight = np.where((df_orders['shipping_wave'] == 'Morning').to_numpy()[lines], wave_weight_morning, wave_weight_afternoon)
+    codes = codes[lines]
+
+    # Acúmulo por (SKU, dia) num índice achatado: bincount agrega linhas repetidas sem laço
+    flat = codes * len(days) + (day - first_day)
+    matrix = np.bincount(flat, weights=trips * wave_weight, minlength=len(sku_ids) * len(days))
+    return sku_ids, days, matrix.reshape(len(sku_ids), len(days))
+
+def ses_forecast(matrix, alpha=0.2):
+    """
+    SES de todas as linhas: nível l_t = alpha * y_t + (1 - alpha) * l_(t-1), com l_0 = y_0.
+    A recursão fechada é uma média ponderada com pesos geométricos, então o nível final de
+    todos os SKUs sai de um único produto matriz-vetor. Retorna a previsão por dia de cada SKU.
+    """
+    n_days = matrix.shape[1]
+    if n_days == 0:
+        return np.zeros(matrix.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(n_days - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (n_days - 1)
+    return matrix @ weights
+
+def _segment_ses(values, rows, n_rows, alpha):
+    # SES do fim de cada segmento (valores agrupados por linha, em ordem): z_1 = v_1, z_k = alpha * v_k + (1 - alpha) * z_(k-1)
+    counts = np.bincount(rows, minlength=n_rows)
+    starts = np.cumsum(counts) - counts
+    pos = np.arange(len(values)) - starts[rows]           # ordem do evento dentro do SKU
+    from_end = counts[rows] - 1 - pos
+    weights = alpha * (1 - alpha) ** from_end.astype(float)
+    weights[pos == 0] = (1 - alpha) ** from_end[pos == 0].astype(float)
+    return np.bincount(rows, weights=weights * values, minlength=n_rows)
+
+def croston_forecast(matrix, alpha=0.1):
+    """
+    Croston para demanda intermitente, em todas as linhas ao mesmo tempo: SES separadas do tamanho
+    da demanda (só nos dias com demanda) e do intervalo entre esses dias; previsão por dia = tamanho / intervalo.
+    Os eventos de todos os SKUs são tratados como segmentos de um único array (np.nonzero em ordem de linha).
+    """
+    n_rows = matrix.shape[0]
+    rows, cols = np.nonzero(matrix)
+    if len(rows) == 0:
+        return np.zeros(n_rows)
+    # Intervalo até o dia anterior com demanda do mesmo SKU (o primeiro conta desde o início do histórico)
+    new_row = np.r_[True, rows[1:] != rows[:-1]]
+    intervals = np.where(new_row, cols + 1, cols - np.r_[0, cols[:-1]]).astype(float)
+
+    size = _segment_ses(matrix[rows, cols], rows, n_rows, alpha)
+    interval = _segment_ses(intervals, rows, n_rows, alpha)
+    forecast = np.zeros(n_rows)
+    has = interval > 0
+    forecast[has] = size[has] / interval[has]
+    return forecast
+
+def demand_intervals(matrix):
+    # ADI por SKU: dias do histórico / dias com demanda (inf sem demanda)
+    nonzero_days = np.count_nonzero(matrix, axis=1)
+    with np.errstate(divide='ignore'):
+        return np.where(nonzero_days > 0, matrix.shape[1] / nonzero_days, np.inf)
+
+def forecast_daily_effort(matrix, method='auto', alpha=0.2, croston_alpha=0.1):
+    """
+    Previsão do esforço diário por SKU. method: 'ses', 'croston' ou 'auto'
+    (Croston para os SKUs intermitentes, ADI > ADI_INTERMITTENT; SES para os demais).
+    Retorna (previsão por dia, método usado por SKU).
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Método de previsão desconhecido: {method} (use {', '.join(FORECAST_METHODS)})")
+    n_rows = matrix.shape[0]
+    if method == 'ses':
+        return ses_forecast(matrix, alpha), np.full(n_rows, 'ses', dtype=object)
+    if method == 'croston':
+        return croston_forecast(matrix, croston_alpha), np.full(n_rows, 'croston', dtype=object)
+
+    intermittent = demand_intervals(matrix) > ADI_INTERMITTENT
+    forecast = ses_forecast(matrix, alpha)
+    if intermittent.any():
+        forecast[intermittent] = croston_forecast(matrix[intermittent], croston_alpha)
+    return forecast, np.where(intermittent, 'croston', 'ses').astype(object)
+
+def forecast_sku_scores(df_orders, df_skus, horizon_days=7, method='auto', alpha=0.2, croston_alpha=0.1,
+                        wave_weight_morning=1.5, wave_weight_afternoon=1.0):
+    """
+    Scores de slotting voltados para frente: esforço previsto para os próximos horizon_days dias.
+    Mesmo formato do calculate_sku_scores (sku_id, total_effort_score, pallet_weight_kg, em ordem
+    decrescente de esforço), com as colunas extras forecast_per_day, history_effort e forecast_method.
+    """
+    sku_ids, _, matrix = demand_matrix(df_orders, df_skus, wave_weight_morning, wave_weight_afternoon)
+    per_day, methods = forecast_daily_effort(matrix, method=method, alpha=alpha, croston_alpha=croston_alpha)
+
+    sku_scores = pd.DataFrame({
+        'sku_id': sku_ids,
+        'total_effort_score': per_day * horizon_days,
+        'forecast_per_day': per_day,
+        'history_effort': matrix.sum(axis=1),
+        'forecast_method': methods,
+    })
+    sku_scores = sku_scores.merge(df_skus[['sku_id', 'pallet_weight_kg']], on='sku_id', how='left')
+    return sku_scores.sort_values(by=['total_effort_score', 'history_effort'], ascending=False, kind='stable').reset_index(drop=True)
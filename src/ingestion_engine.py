@@ -0,0 +1,393 @@
+"""
+Ingestão contínua de eventos do WMS para manter o Gêmeo Digital atualizado.
+
+Eventos em JSON, um por linha, lidos de um arquivo em crescimento (tail) ou de um socket TCP local:
+    {"type": "order", "order_id": "ORD_1", "day": 3, "shipping_wave": "Morning", "lines": [{"sku_id": "SKU_001", "quantity": 12}]}
+    {"type": "pick", "order_id": "ORD_1", "sku_id": "SKU_001", "quantity": 12, "forklift_id": 2, "bin_id": "R1_3_1"}
+    {"type": "replenish", "bin_id": "R1_3_1", "quantity": 58}
+No socket, a linha {"type": "kpi"} responde com o snapshot de KPIs atual.
+
+Uso:
+    python -m src.ingestion_engine --data-dir data --tail data/wms_eventos.jsonl --port 8765
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import slotting_engine, inventory_engine, putaway_engine
+
+WAVE_WEIGHTS = {'Morning': 1.5, 'Afternoon': 1.0}
+# Chaves obrigatórias por tipo de evento (linhas de pedido: sku_id e quantity)
+REQUIRED_KEYS = {'order': ('order_id', 'lines'), 'pick': ('order_id', 'sku_id', 'quantity'), 'replenish': ('bin_id',)}
+
+# Identificadores usados como chave de dicionário: precisam ser escalares (str/int)
+ID_KEYS = ('order_id', 'sku_id', 'bin_id', 'forklift_id', 'shipping_wave')
+
+def _is_quantity(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_id(value):
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+def valid_event(e):
+    """
+    True se o evento tem as chaves obrigatórias do tipo, identificadores escalares (str/int;
+    os opcionais também podem ser null) e quantidades/ts numéricos.
+    Eventos de tipo desconhecido passam (são ignorados pelo apply_batch).
+    """
+    if not isinstance(e, dict):
+        return False
+    required = REQUIRED_KEYS.get(e.get('type'), ())
+    if any(key not in e for key in required):
+        return False
+    if any(key in e and not (_is_id(e[key]) or (e[key] is None and key not in required)) for key in ID_KEYS):
+        return False
+    if 'ts' in e and not _is_quantity(e['ts']):
+        return False
+    if e.get('type') == 'order':
+        return isinstance(e['lines'], list) and all(isinstance(line, dict) and _is_id(line.get('sku_id')) and _is_quantity(line.get('quantity')) for line in e['lines'])
+    if e.get('type') == 'pick':
+        return _is_quantity(e['quantity'])
+    if e.get('type') == 'replenish':
+        return 'quantity' not in e or _is_quantity(e['quantity'])
+    return True
+
+def log_rejected(reason, detail):
+    # Evento descartado: registra no stderr e segue (um evento ruim não derruba o serviço)
+    print(f"[ingestion] evento descartado ({reason}): {str(detail).strip()[:200]}", file=sys.stderr)
+
+class TwinState:
+    """
+    Estado em memória do Gêmeo Digital: estoque por posição (arrays do inventory_engine),
+    pedidos abertos, posição das empilhadeiras e score de esforço por SKU.
+    As atualizações chegam em micro-lotes (apply_batch) e são aplicadas com operações
+    vetorizadas; nada é recalculado do zero.
+    """
+    def __init__(self, df_layout, df_alloc, df_skus, df_orders=None, wave_weights=WAVE_WEIGHTS):
+        self.wave_weights = dict(wave_weights)
+        self.df_layout = df_layout.reset_index(drop=True)
+        self.bin_row = dict(zip(self.df_layout['bin_id'], range(len(self.df_layout))))
+        self.bin_xyz = self.df_layout[['x', 'y', 'z']].to_numpy(dtype=int)
+        self.upp = df_skus.set_index('sku_id')['units_per_pallet']
+        self.pallet_weight = df_skus.set_index('sku_id')['pallet_weight_kg']
+
+        # Estoque por posição (um palete por bin alocado) e posição mais próxima de cada SKU
+        inv = inventory_engine.init_inventory(df_alloc, self.df_layout, df_skus)
+        self.sku_code = {sku: k for k, sku in enumerate(inv['sku_ids'])}
+        self.slot_bin = inv['bin_rows'].copy()
+        self.slot_sku = inv['slot_sku'].copy()
+        self.stock = inv['stock'].copy()
+        self.capacity = inv['capacity'].copy()
+        self.threshold = inv['threshold']
+        self.nearest_slot = inv['offsets'][:-1].copy()
+        self.slot_of_bin = np.full(len(self.df_layout), -1, dtype=np.int64)
+        self.slot_of_bin[self.slot_bin] = np.arange(len(self.slot_bin))
+
+        # Custo e capacidade por bin (slotting_drift) e índice de putaway dos bins livres
+        # (para alocar SKUs novos sem refazer o slotting)
+        df_costs = slotting_engine.calculate_bin_costs(self.df_layout.copy())
+        cost_rows = df_costs['bin_id'].map(self.bin_row).to_numpy()
+        self.bin_cost = np.empty(len(self.df_layout))
+        self.bin_cost[cost_rows] = df_costs['total_cost_score'].to_numpy()
+        self.bin_max_weight = np.empty(len(self.df_layout))
+        self.bin_max_weight[cost_rows] = df_costs['max_weight_kg'].to_numpy()
+        self.putaway = putaway_engine.PutawayIndex(self.df_layout, occupied_bins=self.df_layout['bin_id'].to_numpy()[self.slot_bin])
+
+        # Score de esforço (mesma fórmula do calculate_sku_scores), acumulado por SKU
+        self.effort = np.zeros(len(self.sku_code))
+        if df_orders is not None and not df_orders.empty:
+            scores = slotting_engine.calculate_sku_scores(df_orders, df_skus, wave_weight_morning=self.wave_weights.get('Morning', 1.0),
+                                                           wave_weight_afternoon=self.wave_weights.get('Afternoon', 1.0))
+            known = scores[scores['sku_id'].isin(self.sku_code)]
+            self.effort[[self.sku_code[s] for s in known['sku_id']]] = known['total_effort_score'].to_numpy()
+
+        self.open_orders = {} # order_id -> {'lines': {sku_id: qty pendente}, 'received': ts}
+        self.forklifts = {}   # forklift_id -> {'x', 'y', 'z', 'bin_id', 'ts'}
+        self.completed = 0
+        self.cycle_time_sum_s = 0.0
+        self.stockout_units = 0.0
+        self.events_processed = 0
+        self.events_rejected = 0
+        self.recent_picks = [] # (ts, n_picks) dos últimos micro-lotes
+        self.last_batch_ms = 0.0
+
+    def _ensure_sku(self, sku_id):
+        # SKU novo: código, score zerado e o bin livre mais barato que suporta o palete
+        if sku_id in self.sku_code:
+            return self.sku_code[sku_id]
+        code = len(self.sku_code)
+        self.sku_code[sku_id] = code
+        self.effort = np.append(self.effort, 0.0)
+        self.nearest_slot = np.append(self.nearest_slot, -1)
+
+        bin_id = self.putaway.putaway(self.pallet_weight.get(sku_id, 0.0))
+        if bin_id is not None:
+            row = self.bin_row[bin_id]
+            slot = len(self.slot_bin)
+            self.slot_bin = np.append(self.slot_bin, row)
+            self.slot_sku = np.append(self.slot_sku, code)
+            cap = float(self.upp.get(sku_id, 1))
+            self.capacity = np.append(self.capacity, cap)
+            self.stock = np.append(self.stock, cap)
+            self.slot_of_bin[row] = slot
+            self.nearest_slot[code] = slot
+        return code
+
+    def apply_batch(self, events, now=None):
+        """
+        Aplica um micro-lote de eventos. Pedidos e confirmações de picking são agrupados
+        em arrays e aplicados ao estoque e aos scores com np.add.at / np.subtract.at.
+        Eventos inválidos (valid_event) são descartados um a um, antes de montar os arrays.
+        """
+        t0 = time.perf_counter()
+        now = time.time() if now is None else now
+        valid = [e for e in events if valid_event(e)]
+        for e in events:
+            if not valid_event(e):
+                log_rejected('chaves ausentes ou quantidade inválida', e)
+        self.events_rejected += len(events) - len(valid)
+        events = valid
+        orders = [e for e in events if e.get('type') == 'order']
+        picks = [e for e in events if e.get('type') == 'pick']
+        replenishments = [e for e in events if e.get('type') == 'replenish']
+
+        # 1. Pedidos novos: abertos + incremento do score (viagens x peso da onda)
+        if orders:
+            sku_ids, qty, weight = [], [], []
+            for e in orders:
+                lines = {}
+                for line in e.get('lines', []):
+                    lines[line['sku_id']] = lines.get(line['sku_id'], 0) + line['quantity']
+                    sku_ids.append(line['sku_id'])
+                    qty.append(line['quantity'])
+                    weight.append(self.wave_weights.get(e.get('shipping_wave'), 1.0))
+                self.open_orders[e['order_id']] = {'lines': lines, 'received': e.get('ts', now)}
+            codes = np.array([self._ensure_sku(s) for s in sku_ids], dtype=np.int64)
+            upp = np.array([self.upp.get(s, 1) for s in sku_ids], dtype=float)
+            np.add.at(self.effort, codes, np.ceil(np.array(qty, dtype=float) / upp) * np.array(weight))
+
+        # 2. Confirmações de picking: baixa de estoque no bin informado (ou no mais próximo do SKU)
+        if picks:
+            slots = np.empty(len(picks), dtype=np.int64)
+            qty = np.empty(len(picks))
+            for k, e in enumerate(picks):
+                qty[k] = e['quantity']
+                row = self.bin_row.get(e.get('bin_id'), -1)
+                slot = self.slot_of_bin[row] if row >= 0 else -1
+                if slot < 0 and e['sku_id'] in self.sku_code:
+                    slot = self.nearest_slot[self.sku_code[e['sku_id']]]
+                slots[k] = slot
+            valid = slots >= 0
+            np.subtract.at(self.stock, slots[valid], qty[valid])
+            self.stockout_units += float(-self.stock[self.stock < 0].sum()) + float(qty[~valid].sum())
+            np.maximum(self.stock, 0, out=self.stock)
+
+            for k, e in enumerate(picks):
+                self._close_line(e, now)
+                if e.get('forklift_id') is not None and slots[k] >= 0:
+                    row = self.slot_bin[slots[k]]
+                    x, y, z = self.bin_xyz[row].tolist()
+                    self.forklifts[e['forklift_id']] = {'x': x, 'y': y, 'z': z, 'bin_id': self.df_layout.at[row, 'bin_id'], 'ts': e.get('ts', now)}
+            self.recent_picks.append((now, len(picks)))
+
+        # 3. Reabastecimentos: entrada de palete no bin (quantidade informada ou palete cheio)
+        for e in replenishments:
+            row = self.bin_row.get(e.get('bin_id'), -1)
+            slot = self.slot_of_bin[row] if row >= 0 else -1
+            if slot >= 0:
+                self.stock[slot] = min(self.stock[slot] + e.get('quantity', self.capacity[slot]), self.capacity[slot])
+
+        self.events_processed += len(events)
+        self.last_batch_ms = (time.perf_counter() - t0) * 1000
+
+    def _close_line(self, e, now):
+        order = self.open_orders.get(e.get('order_id'))
+        if order is None:
+            return
+        pending = order['lines'].get(e['sku_id'], 0) - e['quantity']
+        if pending > 0:
+            order['lines'][e['sku_id']] = pending
+        else:
+            order['lines'].pop(e['sku_id'], None)
+        if not order['lines']:
+            del self.open_orders[e['order_id']]
+            self.completed += 1
+            self.cycle_time_sum_s += e.get('ts', now) - order['received']
+
+    def slotting_drift(self, top_n=20):
+        """
+        SKUs do top-N de esforço cuja posição mais próxima está fora dos N bins ocupados mais baratos:
+        candidatos a re-slotting sem rodar a alocação completa.
+        """
+        has_slot = np.flatnonzero(self.nearest_slot >= 0)
+        if has_slot.size == 0:
+            return []
+        top_n = min(top_n, has_slot.size)
+        top = has_slot[np.argsort(-self.effort[has_slot], kind='stable')[:top_n]]
+        occupied_cost = np.sort(self.bin_cost[self.slot_bin])
+        limit = occupied_cost[top_n - 1]
+        codes_to_sku = np.array(list(self.sku_code), dtype=object)
+        return codes_to_sku[top[self.bin_cost[self.slot_bin[self.nearest_slot[top]]] > limit]].tolist()
+
+    def kpis(self, window_s=60.0):
+        # Snapshot dos KPIs (só reduções sobre arrays e contadores: custo de microssegundos)
+        now = time.time()
+        self.recent_picks = [(ts, n) for ts, n in self.recent_picks if now - ts <= window_s]
+        below = self.stock < self.threshold * self.capacity
+        return {
+            'open_orders': len(self.open_orders),
+            'open_lines': sum(len(o['lines']) for o in self.open_orders.values()),
+            'orders_completed': self.completed,
+            'avg_cycle_time_s': self.cycle_time_sum_s / self.completed if self.completed else 0.0,
+            'picks_per_min': sum(n for _, n in self.recent_picks) * 60 / window_s,
+            'bins_below_threshold': int(below.sum()),
+            'stock_fill_pct': float(self.stock.sum() / self.capacity.sum() * 100) if self.capacity.sum() > 0 else 0.0,
+            'stockout_units': self.stockout_units,
+            'forklifts_tracked': len(self.forklifts),
+            'slotting_drift': len(self.slotting_drift()),
+            'events_processed': self.events_processed,
+            'events_rejected': self.events_rejected,
+            'last_batch_ms': self.last_batch_ms,
+        }
+
+class IngestionService:
+    """
+    Serviço asyncio: produtores (tail de arquivo, socket) colocam eventos numa fila e um único
+    consumidor aplica micro-lotes de até batch_size eventos ou a cada batch_interval_s.
+    """
+    def __init__(self, state, batch_size=500, batch_interval_s=0.05):
+        self.state = state
+        self.batch_size = batch_size
+        self.batch_interval_s = batch_interval_s
+        self.queue = asyncio.Queue()
+
+    def _parse(self, line):
+        # Linha JSON do feed; linha inválida é registrada, contada e descartada (None)
+        try:
+            return json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self.state.events_rejected += 1
+            log_rejected('JSON inválido', line)
+            return None
+
+    async def tail_file(self, path, poll_s=0.1, from_start=True):
+        # Acompanha o arquivo como `tail -f`: lê linhas novas à medida que são anexadas
+        while not os.path.exists(path):
+            await asyncio.sleep(poll_s)
+        with open(path, encoding='utf-8') as f:
+            if not from_start:
+                f.seek(0, os.SEEK_END)
+            buffer = ''
+            while True:
+                chunk = f.readline()
+                if not chunk:
+                    await asyncio.sleep(poll_s)
+                    continue
+                buffer += chunk
+                if buffer.endswith('\n'):
+                    event = self._parse(buffer) if buffer.strip() else None
+                    if event is not None:
+                        await self.queue.put(event)
+                    buffer = ''
+
+    async def _handle_client(self, reader, writer):
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            event = self._parse(line)
+            if event is None:
+                continue
+            if isinstance(event, dict) and event.get('type') == 'kpi':
+                writer.write((json.dumps(self.state.kpis()) + '\n').encode())
+                await writer.drain()
+            else:
+                await self.queue.put(event)
+        writer.close()
+
+    async def serve_socket(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self._handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def run_batches(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_interval_s
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                self.state.apply_batch(batch)
+            except Exception as exc: # Lote com erro inesperado: registra e continua consumindo
+                self.state.events_rejected += len(batch)
+                log_rejected(f'lote de {len(batch)} eventos, {type(exc).__name__}', exc)
+
+    async def report(self, every_s=5.0):
+        while True:
+            await asyncio.sleep(every_s)
+            print(json.dumps(self.state.kpis()), file=sys.stderr)
+
+def orders_to_feed(df_orders, df_alloc, out_path, num_forklifts=5):
+    """
+    Gera um feed de exemplo (JSON lines) a partir do backlog: cada pedido seguido das
+    confirmações de picking das suas linhas, para alimentar o tail como se fosse o WMS.
+    """
+    alloc = df_alloc.drop_duplicates('sku_id').set_index('sku_id')['bin_id']
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for k, (order_id, df_ord) in enumerate(df_orders.groupby('order_id', sort=False)):
+            lines = [{'sku_id': s, 'quantity': int(q)} for s, q in zip(df_ord['sku_id'], df_ord['quantity'])]
+            f.write(json.dumps({'type': 'order', 'order_id': order_id, 'day': int(df_ord['day'].iloc[0]),
+                                'shipping_wave': df_ord['shipping_wave'].iloc[0], 'lines': lines}) + '\n')
+            for line in lines:
+                f.write(json.dumps({'type': 'pick', 'order_id': order_id, **line, 'forklift_id': k % num_forklifts,
+                                    'bin_id': alloc.get(line['sku_id'])}) + '\n')
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Ingestão contínua de eventos do WMS para o Gêmeo Digital.")
+    parser.add_argument('--data-dir', default='data', help="Diretório com layout_fisico.csv, mestre_skus.csv e pedidos_backlog.csv.")
+    parser.add_argument('--tail', help="Arquivo JSON lines a acompanhar (tail -f).")
+    parser.add_argument('--port', type=int, help="Porta TCP local para eventos e consultas {\"type\": \"kpi\"}.")
+    parser.add_argument('--batch-size', type=int, default=500, help="Máximo de eventos por micro-lote.")
+    parser.add_argument('--report-every', type=float, default=5.0, help="Intervalo (s) do relatório de KPIs no stderr.")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if not args.tail and not args.port:
+        raise SystemExit("Informe --tail e/ou --port.")
+
+    df_layout = pd.read_csv(os.path.join(args.data_dir, 'layout_fisico.csv'))
+    df_skus = pd.read_csv(os.path.join(args.data_dir, 'mestre_skus.csv'))
+    df_orders = pd.read_csv(os.path.join(args.data_dir, 'pedidos_backlog.csv'))
+    df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout)
+
+    # Twin parte do slotting do backlog; os pedidos novos chegam pelo feed
+    service = IngestionService(TwinState(df_layout, df_alloc, df_skus, df_orders), batch_size=args.batch_size)
+
+    async def run():
+        tasks = [service.run_batches(), service.report(args.report_every)]
+        if args.tail:
+            tasks.append(service.tail_file(args.tail))
+        if args.port:
+            tasks.append(service.serve_socket(port=args.port))
+        await asyncio.gather(*tasks)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from src import simulation_engine
+
+# Reserva (paletes fechados do recebimento) junto à doca de entrada
+RESERVE_X = 30
+RESERVE_Y = 20
+# Manuseio fixo por reabastecimento (conferência + retirada do palete vazio), em segundos
+REPLENISH_HANDLING_S = 30
+# Nível mínimo do bin (fração do palete) que dispara o reabastecimento
+REPLENISH_THRESHOLD = 0.2
+
+def replenishment_task_times(df_layout, bin_rows, forklift_speed=1.5):
+    """
+    Tempo de uma tarefa de reabastecimento por bin: ida e volta à reserva,
+    2 operações de elevação (retirar na reserva, guardar no bin) e manuseio fixo.
+    """
+    x = df_layout['x'].to_numpy()[bin_rows]
+    y = df_layout['y'].to_numpy()[bin_rows]
+    z = df_layout['z'].to_numpy()[bin_rows]
+    dist = simulation_engine.manhattan_dist_array(RESERVE_X, RESERVE_Y, x, y) * 2
+
+    if 'zone_class' in df_layout.columns:
+        is_bronze = df_layout['zone_class'].to_numpy()[bin_rows] == 'Bronze'
+    else:
+        is_bronze = np.zeros(len(bin_rows), dtype=bool)
+    speed = np.where(is_bronze, forklift_speed * simulation_engine.BRONZE_SPEED_FACTOR, forklift_speed)
+
+    return dist / speed + (15 + (z - 1) * 5) * 2 + REPLENISH_HANDLING_S
+
+def init_inventory(df_alloc, df_layout, df_skus, forklift_speed=1.5, threshold=REPLENISH_THRESHOLD, fill=1.0):
+    """
+    Estado do estoque em arrays compactos, um elemento por posição (SKU x bin),
+    na ordem do índice de coleta (build_sku_bin_index: bins de cada SKU contíguos,
+    do mais próximo ao mais distante). Cada bin guarda até um palete (units_per_pallet).
+    """
+    sku_index = simulation_engine.build_sku_bin_index(df_alloc, df_layout)
+    counts = np.diff(sku_index['offsets'])
+    slot_sku = np.repeat(np.arange(len(sku_index['sku_ids'])), counts)
+
+    upp = df_skus.set_index('sku_id')['units_per_pallet'].reindex(sku_index['sku_ids']).fillna(1).to_numpy(dtype=float)
+    capacity = upp[slot_sku]
+
+    return {
+        'sku_ids': sku_index['sku_ids'],
+        'offsets': sku_index['offsets'],
+        'bin_rows': sku_index['bin_rows'],
+        'slot_sku': slot_sku,
+        'capacity': capacity,
+        'stock': capacity * fill,
+        'threshold': threshold,
+        'task_time_s': replenishment_task_times(df_layout, sku_index['bin_rows'], forklift_speed),
+    }
+
+def sku_codes(state, sku_ids):
+    # Código (posição em state['sku_ids']) de cada SKU; -1 para SKUs sem posição
+    sku_ids = np.asarray(sku_ids)
+    codes = np.full(len(sku_ids), -1, dtype=np.int64)
+    if len(state['sku_ids']) == 0:
+        return codes
+    pos = np.minimum(np.searchsorted(state['sku_ids'], sku_ids), len(state['sku_ids']) - 1)
+    found = state['sku_ids'][pos] == sku_ids
+    codes[found] = pos[found]
+    return codes
+
+def apply_demand(state, codes, quantities):
+    """
+    Baixa a demanda (linhas já codificadas por SKU) do estoque, de uma vez:
+    cada SKU consome primeiro o bin mais próximo, depois o seguinte (soma acumulada por segmento).
+    Demanda acima do estoque gera reabastecimentos de emergência no bin mais próximo
+    (um palete por tarefa) antes do picking. Altera state['stock'].
+
+    Retorna (unidades coletadas, tempos das tarefas de emergência em s).
+    """
+    valid = codes >= 0
+    n_sku = len(state['sku_ids'])
+    demand = np.bincount(codes[valid], weights=quantities[valid], minlength=n_sku)
+    stock = state['stock']
+    slot_sku = state['slot_sku']
+    first_slot = state['offsets'][:-1]
+
+    # Estoque dos bins anteriores do mesmo SKU (soma acumulada exclusiva por segmento)
+    excl = np.cumsum(stock) - stock
+    before = excl - excl[first_slot][slot_sku]
+    take = np.clip(demand[slot_sku] - before, 0, stock)
+    stock -= take
+
+    # Falta de estoque: paletes de emergência no bin mais próximo
+    unmet = demand - np.bincount(slot_sku, weights=take, minlength=n_sku)
+    short = np.flatnonzero(unmet > 1e-9)
+    n_pallets = np.ceil(unmet[short] / state['capacity'][first_slot[short]]).astype(int)
+    stock[first_slot[short]] = n_pallets * state['capacity'][first_slot[short]] - unmet[short]
+
+    emergency_s = np.repeat(state['task_time_s'][first_slot[short]], n_pallets)
+    return float(demand.sum()), emergency_s
+
+def trigger_replenishment(state):
+    """
+    Bins abaixo do limite (threshold x palete) recebem um palete cheio da reserva.
+    Altera state['stock'] e retorna os tempos das tarefas (s).
+    """
+    below = state['stock'] < state['threshold'] * state['capacity']
+    state['stock'][below] = state['capacity'][below]
+    return state['task_time_s'][below]
+
+def run_inventory_simulation(df_orders, df_alloc, df_layout, df_skus, forklift_speed=1.5, num_forklifts=5, shift_hours=16.0,
+                             threshold=REPLENISH_THRESHOLD):
+    """
+    Simula o fluxo Pallet In / Box Out dia a dia: o picking esvazia os bins e dispara
+    reabastecimentos a partir da reserva, que consomem horas de empilhadeira.
+    Cada dia é uma atualização vetorizada do estoque.
+
+    Retorna (tabela diária, resumo).
+    """
+    state = init_inventory(df_alloc, df_layout, df_skus, forklift_speed=forklift_speed, threshold=threshold)
+
+    # Horas de picking por dia (mesmo modelo de tempo do run_simulation)
+    df_metrics = simulation_engine.compute_line_metrics(df_orders, df_alloc, df_layout)
+    _, line_time_s = simulation_engine.line_times(df_metrics, forklift_speed)
+    pick_h = pd.Series(line_time_s, index=df_metrics['day'].to_numpy()).groupby(level=0).sum() / 3600
+
+    days = np.sort(df_orders['day'].unique())
+    codes = sku_codes(state, df_orders['sku_id'].to_numpy())
+    quantities = df_orders['quantity'].to_numpy(dtype=float)
+    day_of_line = df_orders['day'].to_numpy()
+    order = np.argsort(day_of_line, kind='stable')
+    bounds = np.searchsorted(day_of_line[order], days, side='left').tolist() + [len(order)]
+
+    capacity_h = num_forklifts * shift_hours
+    rows = []
+    for k, day in enumerate(days):
+        lines = order[bounds[k]:bounds[k + 1]]
+        units, emergency_s = apply_demand(state, codes[lines], quantities[lines])
+        replenish_s = trigger_replenishment(state)
+
+        repl_h = (emergency_s.sum() + replenish_s.sum()) / 3600
+        day_pick_h = pick_h.get(day, 0.0)
+        rows.append({
+            'day': day,
+            'units_picked': units,
+            'replenishments': len(replenish_s),
+            'emergency_replenishments': len(emergency_s),
+            'replenishment_hours': repl_h,
+            'picking_hours': day_pick_h,
+            'replenishment_share_pct': repl_h / (repl_h + day_pick_h) * 100 if repl_h + day_pick_h > 0 else 0.0,
+            'replenishment_capacity_pct': repl_h / capacity_h * 100,
+            'avg_fill_pct': state['stock'].sum() / state['capacity'].sum() * 100 if len(state['stock']) else 0.0,
+        })
+
+    df_daily = pd.DataFrame(rows)
+    total_repl_h = df_daily['replenishment_hours'].sum() if not df_daily.empty else 0.0
+    total_pick_h = df_daily['picking_hours'].sum() if not df_daily.empty else 0.0
+    summary = {
+        'days': len(df_daily),
+        'replenishments': int(df_daily['replenishments'].sum()) if not df_daily.empty else 0,
+        'emergency_replenishments': int(df_daily['emergency_replenishments'].sum()) if not df_daily.empty else 0,
+        'replenishment_hours': total_repl_h,
+        'picking_hours': total_pick_h,
+        'replenishment_share_pct': total_repl_h / (total_repl_h + total_pick_h) * 100 if total_repl_h + total_pick_h > 0 else 0.0,
+        'avg_replenishment_capacity_pct': df_daily['replenishment_capacity_pct'].mean() if not df_daily.empty else 0.0,
+    }
+    return df_daily, summary
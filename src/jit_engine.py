@@ -0,0 +1,112 @@
+import importlib.util
+import warnings
+
+import numpy as np
+
+# Backend acelerado opcional: com Numba os kernels abaixo são compilados (njit) na primeira
+# chamada com engine 'numba'; sem Numba as mesmas funções rodam em Python puro sobre arrays NumPy.
+# O Numba só é importado nessa hora, para que importar os engines continue rápido.
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+_COMPILED = {}
+
+ENGINES = ('numpy', 'numba', 'auto')
+
+def resolve_engine(engine):
+    """
+    'auto' escolhe Numba se instalado; 'numba' sem Numba cai para 'numpy' com aviso.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Engine desconhecida: {engine} (use {', '.join(ENGINES)})")
+    if engine == 'auto':
+        return 'numba' if HAS_NUMBA else 'numpy'
+    if engine == 'numba' and not HAS_NUMBA:
+        warnings.warn("Numba não está instalado; usando a engine NumPy.", RuntimeWarning, stacklevel=2)
+        return 'numpy'
+    return engine
+
+def get_kernel(kernel, engine):
+    # Na engine 'numba', a versão compilada (njit, cache em disco), criada uma vez por kernel;
+    # na 'numpy', a própria função Python
+    if resolve_engine(engine) != 'numba':
+        return kernel
+    if kernel not in _COMPILED:
+        from numba import njit # Import tardio: só quem usa a engine 'numba' paga o import
+        _COMPILED[kernel] = njit(cache=True)(kernel)
+    return _COMPILED[kernel]
+
+def manhattan_dist_kernel(x1, y1, x2, y2, cross_aisles_y):
+    # Mesma regra de calculate_manhattan_dist, um laço sobre os pares de pontos
+    n = x2.shape[0]
+    out = np.empty(n)
+    for k in range(n):
+        dx = abs(x1[k] - x2[k])
+        dy = abs(y1[k] - y2[k])
+        if dx == 0:
+            out[k] = dy
+            continue
+        on_ca = False
+        for ca in cross_aisles_y:
+            if y1[k] == ca:
+                on_ca = True
+        if on_ca and y1[k] == y2[k]:
+            out[k] = dx + dy
+            continue
+        best = np.inf
+        for ca in cross_aisles_y:
+            d = abs(y1[k] - ca) + dx + abs(y2[k] - ca)
+            if d < best:
+                best = d
+        out[k] = best
+    return out
+
+def line_times_kernel(dist_leg, is_bronze, time_lift, picking_time, forklift_speed, bronze_factor):
+    # Tempo por linha: 4 pernas de viagem + elevação + picking
+    n = dist_leg.shape[0]
+    dist_total = np.empty(n)
+    time_total = np.empty(n)
+    for k in range(n):
+        speed = forklift_speed * bronze_factor if is_bronze[k] else forklift_speed
+        dist_total[k] = dist_leg[k] * 4
+        time_total[k] = dist_total[k] / speed + time_lift[k] + picking_time[k]
+    return dist_total, time_total
+
+def hill_climb_kernel(bin_of_sku, q, c, pairs_a, pairs_b):
+    """
+    Laço de trocas do Hill Climbing sobre arrays inteiros: o SKU s está no bin bin_of_sku[s],
+    com demanda q[s] e custo de acesso c[bin]. Trocar a e b muda o custo em
+        (q_a - q_b) * (c[bin_b] - c[bin_a])
+    e a troca só é mantida se o custo cair. Retorna o histórico do melhor custo.
+    """
+    cost = 0.0
+    for s in range(q.shape[0]):
+        cost += q[s] * c[bin_of_sku[s]]
+
+    n_iter = pairs_a.shape[0]
+    history = np.empty(n_iter + 1)
+    history[0] = cost
+    for it in range(n_iter):
+        a = pairs_a[it]
+        b = pairs_b[it]
+        delta = (q[a] - q[b]) * (c[bin_of_sku[b]] - c[bin_of_sku[a]])
+        if delta < 0:
+            tmp = bin_of_sku[a]
+            bin_of_sku[a] = bin_of_sku[b]
+            bin_of_sku[b] = tmp
+            cost += delta
+        history[it + 1] = cost
+    return history
+
+def manhattan_dist(x1, y1, x2, y2, cross_aisles_y, engine='numpy'):
+    """
+    Distância com restrição de Cross Aisle para arrays (origem escalar ou array).
+    """
+    if resolve_engine(engine) == 'numba':
+        x2 = np.ascontiguousarray(x2, dtype=np.float64)
+        y2 = np.ascontiguousarray(y2, dtype=np.float64)
+        x1 = np.broadcast_to(np.asarray(x1, dtype=np.float64), x2.shape).copy()
+        y1 = np.broadcast_to(np.asarray(y1, dtype=np.float64), y2.shape).copy()
+        return get_kernel(manhattan_dist_kernel, engine)(x1, y1, x2, y2, np.asarray(cross_aisles_y, dtype=np.float64))
+
+    # Caminho NumPy (import tardio: simulation_engine também usa este módulo)
+    from src import simulation_engine
+    return simulation_engine.manhattan_dist_array(x1, y1, x2, y2, cross_aisles_y)
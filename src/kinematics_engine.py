@@ -0,0 +1,204 @@
+"""
+Tempos de deslocamento cinemáticos da empilhadeira: aceleração e frenagem (perfil trapezoidal por
+trecho reto), redução de velocidade e penalidade nas curvas dos cross aisles, e velocidade de
+translação/elevação dependente do peso do palete (pallet_weight_kg).
+
+Para não pesar no simulador, o modelo é compilado em tabelas por bin x classe de carga, construídas
+uma vez por layout (e parâmetros) e guardadas em disco (.npz) com a impressão digital do layout no
+nome; a simulação só indexa as tabelas.
+
+Uso:
+    df_kpis = simulation_engine.run_simulation(df_orders, df_alloc, df_layout, travel_model='kinematic', df_skus=df_skus)
+    tables = kinematics_engine.get_tables(df_layout, forklift_speed=1.5)
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src import simulation_engine, putaway_engine
+
+CACHE_DIR = os.path.join('data', 'cache')
+# Classes de carga: limites superiores (kg); cada classe usa o peso do limite (conservador)
+LOAD_CLASS_KG = [250, 500, 1000, 1500, 2000]
+# Peso assumido quando não há mestre de SKUs
+DEFAULT_PALLET_WEIGHT_KG = 500.0
+
+DEFAULT_PARAMS = {
+    'accel_mps2': 0.5,            # Aceleração vazia
+    'decel_mps2': 0.6,            # Frenagem
+    'loaded_accel_drop': 0.4,     # Perda de aceleração na carga nominal (fração)
+    'loaded_speed_drop': 0.25,    # Perda de velocidade máxima na carga nominal (fração)
+    'rated_capacity_kg': 2000.0,  # Carga nominal da empilhadeira
+    'turn_speed_mps': 0.8,        # Velocidade máxima numa curva de 90°
+    'turn_penalty_s': 2.0,        # Manobra (esterçamento) em cada curva
+    'lift_speed_empty_mps': 0.5,  # Elevação dos garfos vazios
+    'lift_speed_rated_mps': 0.3,  # Elevação com a carga nominal
+    'lower_speed_mps': 0.5,       # Descida (com ou sem carga)
+    'handling_s': 15.0,           # Pegar ou largar o palete (base do modelo linear)
+}
+
+_TABLES = {}
+
+def load_class(weight_kg):
+    # Classe de carga de cada peso (acima da última classe conta como a última)
+    return np.minimum(np.searchsorted(LOAD_CLASS_KG, np.asarray(weight_kg, dtype=float), side='left'), len(LOAD_CLASS_KG) - 1)
+
+def segment_time(dist, v_in, v_out, v_max, accel, decel):
+    """
+    Tempo de um trecho reto com perfil trapezoidal: acelera de v_in até v_max, cruza, freia até v_out.
+    Trechos curtos viram triangulares (pico abaixo de v_max). Arrays com broadcast.
+    """
+    dist, v_in, v_out = (np.asarray(v, dtype=float) for v in (dist, v_in, v_out))
+    v_in, v_out = np.minimum(v_in, v_max), np.minimum(v_out, v_max)
+    d_ramp = (v_max ** 2 - v_in ** 2) / (2 * accel) + (v_max ** 2 - v_out ** 2) / (2 * decel)
+    # Pico do perfil triangular: (vp² - v_in²)/2a + (vp² - v_out²)/2b = dist
+    v_peak = np.sqrt(np.maximum((2 * dist + v_in ** 2 / accel + v_out ** 2 / decel) / (1 / accel + 1 / decel), 0))
+    v_peak = np.maximum(np.minimum(v_peak, v_max), np.maximum(v_in, v_out))
+    trapezoid = (v_max - v_in) / accel + (v_max - v_out) / decel + (dist - d_ramp) / v_max
+    triangle = (v_peak - v_in) / accel + (v_peak - v_out) / decel
+    return np.where(dist <= 0, 0.0, np.where(dist >= d_ramp, trapezoid, triangle))
+
+def route_segments(x, y, cross_aisles_y=simulation_engine.CROSS_AISLES_Y):
+    """
+    Trechos retos da rota Staging -> bin com a mesma regra do manhattan_dist_array:
+    (Staging -> cross aisle, ao longo do cross aisle, cross aisle -> bin). Retorna (n_bins, 3) em metros;
+    trechos de comprimento zero não existem (não geram curva).
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    sx, sy = float(simulation_engine.STAGING_X), float(simulation_engine.STAGING_Y)
+    cas = np.asarray(cross_aisles_y, dtype=float)
+    dx = np.abs(x - sx)
+    best = cas[np.argmin(np.abs(sy - cas)[None, :] + np.abs(y[:, None] - cas[None, :]), axis=1)]
+
+    segments = np.column_stack([np.abs(sy - best), dx, np.abs(best - y)])
+    straight = dx == 0 # Mesmo corredor: um trecho só, em Y
+    segments[straight] = np.column_stack([np.zeros(straight.sum()), np.zeros(straight.sum()), np.abs(y[straight] - sy)])
+    same_ca = np.isin(sy, cas) & (y == sy) # Bin no próprio cross aisle do Staging
+    segments[same_ca & ~straight] = np.column_stack([np.zeros((same_ca & ~straight).sum()), dx[same_ca & ~straight], np.zeros((same_ca & ~straight).sum())])
+    return segments
+
+def _travel_time(segments, v_max, accel, decel, params):
+    # Percurso de trechos (v_max escalar): parte e chega parado, passa pelas curvas na velocidade de curva
+    n_seg = (segments > 0).sum(axis=1)
+    v_turn = min(params['turn_speed_mps'], v_max)
+    time = np.zeros(len(segments))
+    seen = np.zeros(len(segments), dtype=int)
+    for k in range(segments.shape[1]):
+        exists = segments[:, k] > 0
+        v_in = np.where(seen > 0, v_turn, 0.0)          # entra do trecho anterior pela curva
+        v_out = np.where(seen + 1 < n_seg, v_turn, 0.0)  # sai para o próximo trecho pela curva
+        time += np.where(exists, segment_time(segments[:, k], v_in, v_out, v_max, accel, decel), 0.0)
+        seen += exists
+    return time + np.maximum(n_seg - 1, 0) * params['turn_penalty_s']
+
+def build_tables(df_layout, forklift_speed=1.5, params=None):
+    """
+    Tabelas do modelo cinemático para o layout (linhas na ordem de df_layout):
+      dist_leg_m[bin]                 distância de uma perna Staging <-> bin (igual ao modelo linear)
+      travel_empty_s[bin]             perna vazia
+      travel_loaded_s[bin, classe]    perna carregada
+      lift_s[bin, classe]             coleta no bin: sobe vazio, pega, desce carregado + largar no Staging
+      putaway_s[bin, classe]          devolução: pega no Staging + sobe carregado, larga, desce vazio
+    Tempo da linha = 2 x vazia + 2 x carregada + lift + putaway + picking.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    x, y, z = (df_layout[c].to_numpy(dtype=float) for c in ('x', 'y', 'z'))
+    segments = route_segments(x, y)
+    is_bronze = (df_layout['zone_class'] == 'Bronze').to_numpy() if 'zone_class' in df_layout.columns else np.zeros(len(df_layout), dtype=bool)
+    v_base = np.where(is_bronze, forklift_speed * simulation_engine.BRONZE_SPEED_FACTOR, forklift_speed)
+
+    load = np.asarray(LOAD_CLASS_KG, dtype=float) / params['rated_capacity_kg']
+    v_loaded = v_base[:, None] * (1 - params['loaded_speed_drop'] * load[None, :])
+    a_loaded = params['accel_mps2'] * (1 - params['loaded_accel_drop'] * load[None, :])
+
+    # Perna vazia: bins com a mesma velocidade máxima (zona) são agrupados para o broadcast
+    travel_empty = np.empty(len(df_layout))
+    for v in np.unique(v_base):
+        rows = v_base == v
+        travel_empty[rows] = _travel_time(segments[rows], float(v), params['accel_mps2'], params['decel_mps2'], params)
+    travel_loaded = np.empty((len(df_layout), len(LOAD_CLASS_KG)))
+    for k in range(len(LOAD_CLASS_KG)):
+        for v in np.unique(v_loaded[:, k]):
+            rows = v_loaded[:, k] == v
+            travel_loaded[rows, k] = _travel_time(segments[rows], float(v), a_loaded[0, k], params['decel_mps2'], params)
+
+    height = (z - 1)[:, None] * putaway_engine.LEVEL_HEIGHT_M
+    lift_loaded = params['lift_speed_empty_mps'] + (params['lift_speed_rated_mps'] - params['lift_speed_empty_mps']) * load[None, :]
+    raise_empty = height / params['lift_speed_empty_mps']
+    lower = height / params['lower_speed_mps']
+    lift = raise_empty + lower + 2 * params['handling_s'] + np.zeros_like(lift_loaded)
+    putaway = height / lift_loaded + lower + 2 * params['handling_s']
+
+    return {
+        'bin_id': df_layout['bin_id'].to_numpy(dtype=str),
+        'dist_leg_m': np.asarray(simulation_engine.manhattan_dist_array(simulation_engine.STAGING_X, simulation_engine.STAGING_Y, x, y)),
+        'travel_empty_s': travel_empty,
+        'travel_loaded_s': travel_loaded,
+        'lift_s': lift,
+        'putaway_s': putaway,
+    }
+
+def layout_fingerprint(df_layout, forklift_speed, params):
+    # Hash das posições do layout + parâmetros do modelo: muda o layout ou o modelo, muda a tabela
+    cols = [c for c in ('bin_id', 'x', 'y', 'z', 'zone_class') if c in df_layout.columns]
+    h = hashlib.sha1(pd.util.hash_pandas_object(df_layout[cols], index=False).values.tobytes())
+    h.update(json.dumps({'speed': float(forklift_speed), 'classes': LOAD_CLASS_KG, 'staging': [simulation_engine.STAGING_X, simulation_engine.STAGING_Y],
+                         'cross_aisles': simulation_engine.CROSS_AISLES_Y, **params}, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def get_tables(df_layout, forklift_speed=1.5, params=None, cache_dir=CACHE_DIR):
+    """
+    Tabelas do layout: da memória do processo, do cache em disco (cache_dir/kinematics_<fingerprint>.npz)
+    ou construídas e gravadas. cache_dir=None desliga o cache em disco.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    key = layout_fingerprint(df_layout, forklift_speed, params)
+    if key in _TABLES:
+        return _TABLES[key]
+
+    path = os.path.join(cache_dir, f'kinematics_{key}.npz') if cache_dir else None
+    if path and os.path.exists(path):
+        with np.load(path) as data:
+            tables = {name: data[name] for name in data.files}
+    else:
+        tables = build_tables(df_layout, forklift_speed, params)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Grava num temporário e troca: workers paralelos nunca leem um arquivo pela metade
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **tables)
+            os.replace(tmp_path, path)
+    _TABLES[key] = tables
+    return tables
+
+def clear_cache():
+    _TABLES.clear()
+
+def line_times(df_metrics, tables, df_skus=None):
+    """
+    Distância e tempo de cada linha (saída de compute_line_metrics) pelas tabelas: só indexação.
+    O peso do palete vem de df_skus (senão DEFAULT_PALLET_WEIGHT_KG). Acrescenta a df_metrics as
+    colunas de cada operação (travel_empty_s, travel_loaded_s, lift_s, putaway_s), usadas pelo log de eventos.
+    """
+    rows = pd.Index(tables['bin_id']).get_indexer(df_metrics['bin_id'].astype(str))
+    if (rows < 0).any():
+        raise ValueError("Bins fora da tabela cinemática: a tabela é de outro layout")
+    if df_skus is not None:
+        weight = df_metrics['sku_id'].map(df_skus.set_index('sku_id')['pallet_weight_kg']).fillna(DEFAULT_PALLET_WEIGHT_KG).to_numpy()
+    else:
+        weight = np.full(len(df_metrics), DEFAULT_PALLET_WEIGHT_KG)
+    k = load_class(weight)
+
+    df_metrics['travel_empty_s'] = tables['travel_empty_s'][rows]
+    df_metrics['travel_loaded_s'] = tables['travel_loaded_s'][rows, k]
+    df_metrics['lift_s'] = tables['lift_s'][rows, k]
+    df_metrics['putaway_s'] = tables['putaway_s'][rows, k]
+
+    dist_total = df_metrics['dist_leg_m'].to_numpy() * 4
+    time_total = (2 * (df_metrics['travel_empty_s'].to_numpy() + df_metrics['travel_loaded_s'].to_numpy())
+                  + df_metrics['lift_s'].to_numpy() + df_metrics['putaway_s'].to_numpy() + df_metrics['picking_time_s'].to_numpy())
+    return dist_total, time_total
@@ -0,0 +1,281 @@
+"""
+Simulação de uma rede de CDs: vários WarehouseTopology, atribuição SKU -> site, divisão do backlog
+e slotting + simulação de cada site em processos paralelos.
+
+Os dados não trafegam como DataFrames entre processos: o mestre de SKUs (só leitura) e as linhas
+de pedido de todos os sites são gravados uma vez como arrays .npy e abertos por memory-map em cada
+worker, que lê só a sua fatia; os KPIs por pedido voltam por um array de saída também mapeado
+(cada site escreve no seu intervalo). Do worker para o processo principal volta só um dicionário
+de KPIs do site.
+
+Uso:
+    python -m src.network_engine --orders 6000 --policy fast_movers --workers 3 --out data/kpis_rede.json
+    df_sites, df_order_kpis, network = network_engine.run_network(df_skus, df_orders, network_engine.DEFAULT_SITES)
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import data_engine, slotting_engine, simulation_engine
+
+# Sites da rede: variantes do mesmo prédio (ver WarehouseTopology), fatia dos pedidos que nasce em cada um e frota
+DEFAULT_SITES = [
+    {'site_id': 'CD_SP', 'rack_xs': [2, 6, 10, 14, 18], 'shelving_xs': [22, 24, 26], 'levels': 5, 'share': 0.5, 'num_forklifts': 8},
+    {'site_id': 'CD_RJ', 'rack_xs': [10, 14, 18], 'shelving_xs': [22, 24, 26], 'levels': 5, 'share': 0.3, 'num_forklifts': 5},
+    {'site_id': 'CD_MG', 'rack_xs': [14, 18], 'shelving_xs': [22, 24], 'levels': 4, 'share': 0.2, 'num_forklifts': 3},
+]
+SITE_DEFAULTS = {'rack_xs': [10, 14, 18], 'shelving_xs': [22, 24, 26], 'levels': 5, 'share': 1.0,
+                 'num_forklifts': 5, 'forklift_speed': 1.5, 'shift_hours': 16.0, 'morning_weight': 1.5}
+# Colunas do mestre de SKUs compartilhadas com os workers (slotting e paletes por pedido)
+SKU_COLUMNS = ['units_per_pallet', 'pallet_weight_kg']
+LINE_COLUMNS = ['order_code', 'day', 'wave_code', 'sku_code', 'quantity']
+POLICIES = ['all', 'fast_movers']
+
+def site_layout(site):
+    topology = data_engine.WarehouseTopology(rack_xs=site['rack_xs'], shelving_xs=site['shelving_xs'], levels=site['levels'])
+    return data_engine.generate_layout(topology)
+
+def assign_home_sites(order_ids, sites, seed=42):
+    # Site de origem de cada pedido (sorteio pela fatia 'share' de cada site), determinístico pela semente
+    shares = np.array([site['share'] for site in sites], dtype=float)
+    rng = np.random.default_rng(seed)
+    return rng.choice(len(sites), size=len(order_ids), p=shares / shares.sum())
+
+def assign_skus_to_sites(df_skus, df_orders, home_site, n_sites, policy='fast_movers', fast_share=0.2):
+    """
+    Matriz booleana SKU x site de quem estoca o quê (linhas na ordem de df_skus).
+    'all': todos os sites estocam tudo. 'fast_movers': os fast_share SKUs de maior esforço na rede
+    ficam em todos os sites; os demais só no site com mais demanda de origem para eles.
+    home_site: site de origem de cada linha de df_orders.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Política desconhecida: {policy} (use {', '.join(POLICIES)})")
+    stocked = np.ones((len(df_skus), n_sites), dtype=bool)
+    if policy == 'all':
+        return stocked
+
+    sku_codes = pd.Index(df_skus['sku_id']).get_indexer(df_orders['sku_id'])
+    known = sku_codes >= 0
+    upp = df_skus['units_per_pallet'].to_numpy(dtype=float)
+    trips = np.ceil(df_orders['quantity'].to_numpy(dtype=float)[known] / upp[sku_codes[known]])
+    demand = np.zeros((len(df_skus), n_sites))
+    np.add.at(demand, (sku_codes[known], home_site[known]), trips)
+
+    total = demand.sum(axis=1)
+    fast = np.zeros(len(df_skus), dtype=bool)
+    fast[np.argsort(-total, kind='stable')[:int(np.ceil(fast_share * len(df_skus)))]] = True
+    stocked[~fast] = False
+    stocked[np.flatnonzero(~fast), demand[~fast].argmax(axis=1)] = True
+    return stocked
+
+def route_lines(home_site, sku_codes, stocked):
+    # Site que atende cada linha: o de origem se ele estoca o SKU, senão o primeiro site que estoca
+    served = home_site.copy()
+    known = sku_codes >= 0
+    missing = known & ~stocked[np.maximum(sku_codes, 0), home_site]
+    served[missing] = stocked[sku_codes[missing]].argmax(axis=1)
+    return served
+
+def _write_array(work_dir, name, values):
+    path = os.path.join(work_dir, f'{name}.npy')
+    np.save(path, values)
+    return path
+
+def prepare_shared_data(df_skus, df_orders, served_site, n_sites, work_dir):
+    """
+    Grava em work_dir os arrays lidos pelos workers por memory-map:
+      * mestre de SKUs (sku_id como texto de largura fixa + SKU_COLUMNS), compartilhado por todos;
+      * linhas de pedido codificadas (LINE_COLUMNS), ordenadas por site e pedido;
+      * arrays de saída dist_m/time_s, uma posição por (site, pedido).
+    Retorna o manifesto (caminhos e intervalos por site) e os rótulos de cada posição de saída.
+    """
+    manifest = {'sku_id': _write_array(work_dir, 'sku_id', df_skus['sku_id'].to_numpy(dtype=str))}
+    for col in SKU_COLUMNS:
+        manifest[col] = _write_array(work_dir, col, df_skus[col].to_numpy(dtype=float))
+
+    sku_codes = pd.Index(df_skus['sku_id']).get_indexer(df_orders['sku_id'])
+    order_codes, order_ids = pd.factorize(df_orders['order_id'])
+    # Onda desconhecida (-1) cai na última onda do turno
+    wave_codes = pd.Index(simulation_engine.SHIPPING_WAVES).get_indexer(df_orders['shipping_wave'])
+    keep = sku_codes >= 0
+    order = np.lexsort((order_codes[keep], served_site[keep]))
+    lines = {
+        'order_code': order_codes[keep][order],
+        'day': df_orders['day'].to_numpy(dtype=np.int64)[keep][order],
+        'wave_code': wave_codes[keep][order].astype(np.int8),
+        'sku_code': sku_codes[keep][order].astype(np.int32),
+        'quantity': df_orders['quantity'].to_numpy(dtype=np.int64)[keep][order],
+    }
+    for col in LINE_COLUMNS:
+        manifest[col] = _write_array(work_dir, col, lines[col])
+    site_of_line = served_site[keep][order]
+    line_bounds = np.searchsorted(site_of_line, np.arange(n_sites + 1))
+
+    # Uma posição de saída por (site, pedido), na ordem crescente de order_code dentro do site
+    first = np.r_[True, (site_of_line[1:] != site_of_line[:-1]) | (lines['order_code'][1:] != lines['order_code'][:-1])]
+    out_site, out_order = site_of_line[first], lines['order_code'][first]
+    out_bounds = np.searchsorted(out_site, np.arange(n_sites + 1))
+    for col in ['dist_m', 'time_s']:
+        path = os.path.join(work_dir, f'out_{col}.npy')
+        np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(len(out_site),)).flush()
+        manifest[f'out_{col}'] = path
+
+    manifest['line_bounds'] = line_bounds.tolist()
+    manifest['out_bounds'] = out_bounds.tolist()
+    return manifest, out_site, np.asarray(order_ids)[out_order]
+
+def _site_frames(manifest, site_idx):
+    # DataFrames do site a partir das fatias mapeadas (só a fatia do site é lida do disco)
+    sku_id = np.load(manifest['sku_id'], mmap_mode='r')
+    df_skus = pd.DataFrame({'sku_id': np.asarray(sku_id).astype(object),
+                            **{col: np.load(manifest[col], mmap_mode='r') for col in SKU_COLUMNS}})
+    lo, hi = manifest['line_bounds'][site_idx], manifest['line_bounds'][site_idx + 1]
+    cols = {col: np.asarray(np.load(manifest[col], mmap_mode='r')[lo:hi]) for col in LINE_COLUMNS}
+    df_orders = pd.DataFrame({
+        'order_id': cols['order_code'],
+        'day': cols['day'],
+        'shipping_wave': np.asarray(simulation_engine.SHIPPING_WAVES, dtype=object)[cols['wave_code']],
+        'sku_id': df_skus['sku_id'].to_numpy()[cols['sku_code']],
+        'quantity': cols['quantity'],
+    })
+    return df_skus, df_orders
+
+def run_site(task):
+    """
+    Worker de um site: layout, slotting dos SKUs estocados, simulação de todos os pedidos do site
+    e dimensionamento da frota. Escreve dist/tempo por pedido no array de saída mapeado e devolve
+    só o resumo do site.
+    """
+    t0 = time.perf_counter()
+    site, manifest, site_idx = {**SITE_DEFAULTS, **task['site']}, task['manifest'], task['site_idx']
+    df_skus, df_orders = _site_frames(manifest, site_idx)
+    df_skus = df_skus[np.asarray(task['stocked'], dtype=bool)]
+    df_layout = site_layout(site)
+
+    summary = {'site_id': site['site_id'], 'bins': len(df_layout), 'skus_stocked': len(df_skus), 'orders': 0, 'lines': len(df_orders),
+               'skus_allocated': 0, 'forklift_hours': 0.0, 'num_forklifts': site['num_forklifts'],
+               'suggested_fleet': 0, 'max_utilization': 0.0, 'overload_days': 0}
+    if not df_orders.empty:
+        df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout, wave_weight_morning=site['morning_weight'])
+        order_ids = np.unique(df_orders['order_id'].to_numpy())
+        df_kpis = simulation_engine.run_simulation(df_orders, df_alloc, df_layout, forklift_speed=site['forklift_speed'],
+                                                   order_ids=order_ids, num_forklifts=site['num_forklifts'], df_skus=df_skus)
+        lo, hi = manifest['out_bounds'][site_idx], manifest['out_bounds'][site_idx + 1]
+        for col, values in [('dist_m', df_kpis['dist_opt_m']), ('time_s', df_kpis['time_opt_s'])]:
+            out = np.load(manifest[f'out_{col}'], mmap_mode='r+')
+            out[lo:hi] = values.to_numpy()
+            out.flush()
+
+        avg_time = df_kpis['time_opt_s'].mean()
+        _, fleet_summary = simulation_engine.calculate_fleet_sizing(df_orders, avg_time, num_forklifts=site['num_forklifts'], shift_hours=site['shift_hours'])
+        summary.update({
+            'orders': len(order_ids),
+            'skus_allocated': int(df_alloc['sku_id'].nunique()),
+            'avg_time_opt_s': avg_time,
+            'avg_dist_opt_m': df_kpis['dist_opt_m'].mean(),
+            'forklift_hours': df_kpis['time_opt_s'].sum() / 3600,
+            **fleet_summary,
+        })
+    summary['runtime_s'] = time.perf_counter() - t0
+    return summary
+
+def network_kpis(df_sites, df_order_kpis, home_site, served_site):
+    # KPIs da rede a partir dos resumos por site e das posições de saída (sem juntar DataFrames dos workers)
+    orders = df_order_kpis.groupby('order_id', sort=False)['site_id'].nunique()
+    return {
+        'sites': len(df_sites),
+        'orders': int(len(orders)),
+        'split_orders': int((orders > 1).sum()),
+        'lines': int(df_sites['lines'].sum()),
+        'rerouted_lines': int((home_site != served_site).sum()),
+        'forklift_hours': float(df_sites['forklift_hours'].sum()),
+        'avg_time_opt_s': float(df_order_kpis['time_s'].mean()) if len(df_order_kpis) else 0.0,
+        'configured_fleet': int(df_sites['num_forklifts'].sum()),
+        'suggested_fleet': int(df_sites['suggested_fleet'].sum()),
+        'max_site_utilization': float(df_sites['max_utilization'].max()),
+        'overload_site_days': int(df_sites['overload_days'].sum()),
+    }
+
+def run_network(df_skus, df_orders, sites=DEFAULT_SITES, policy='fast_movers', fast_share=0.2, workers=None, seed=42, work_dir=None):
+    """
+    Roda a rede: sites de origem dos pedidos -> SKUs por site -> roteamento das linhas ->
+    um processo por site (slotting + simulação + frota) -> KPIs por site, por pedido e da rede.
+    work_dir guarda os arrays mapeados (padrão: diretório temporário apagado ao final).
+    Retorna (df_sites, df_order_kpis, network).
+    """
+    sites = [{**SITE_DEFAULTS, **site} for site in sites]
+    order_codes, order_ids = pd.factorize(df_orders['order_id'])
+    home_site = assign_home_sites(order_ids, sites, seed=seed)[order_codes]
+    stocked = assign_skus_to_sites(df_skus, df_orders, home_site, len(sites), policy=policy, fast_share=fast_share)
+    sku_codes = pd.Index(df_skus['sku_id']).get_indexer(df_orders['sku_id'])
+    served_site = route_lines(home_site, sku_codes, stocked)
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        manifest, out_site, out_order = prepare_shared_data(df_skus, df_orders, served_site, len(sites), tmp_dir)
+        tasks = [{'site': site, 'site_idx': k, 'manifest': manifest, 'stocked': stocked[:, k].tolist()} for k, site in enumerate(sites)]
+        if workers == 1 or len(sites) == 1:
+            summaries = [run_site(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers or len(sites)) as pool:
+                summaries = list(pool.map(run_site, tasks))
+
+        df_order_kpis = pd.DataFrame({
+            'order_id': out_order,
+            'site_id': np.asarray([site['site_id'] for site in sites], dtype=object)[out_site],
+            'dist_m': np.array(np.load(manifest['out_dist_m'], mmap_mode='r')),
+            'time_s': np.array(np.load(manifest['out_time_s'], mmap_mode='r')),
+        })
+
+    df_sites = pd.DataFrame(summaries)
+    network = network_kpis(df_sites, df_order_kpis, home_site, served_site)
+    return df_sites, df_order_kpis, network
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Simulação de uma rede de CDs (um processo por site).")
+    parser.add_argument('--sites', help="JSON com a lista de sites (padrão: DEFAULT_SITES).")
+    parser.add_argument('--data-dir', help="Diretório com mestre_skus.csv e pedidos_backlog.csv (senão gera dados).")
+    parser.add_argument('--orders', type=int, default=6000, help="Pedidos gerados (sem --data-dir).")
+    parser.add_argument('--skus', type=int, default=500, help="SKUs gerados (sem --data-dir).")
+    parser.add_argument('--policy', choices=POLICIES, default='fast_movers', help="Atribuição SKU -> site.")
+    parser.add_argument('--fast-share', type=float, default=0.2, help="Fração de SKUs estocados em todos os sites (fast_movers).")
+    parser.add_argument('--workers', type=int, default=None, help="Processos paralelos (padrão: um por site).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help="Grava os KPIs por site e da rede em JSON.")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    sites = DEFAULT_SITES
+    if args.sites:
+        with open(args.sites, encoding='utf-8') as f:
+            sites = json.load(f)
+    if args.data_dir:
+        df_skus = pd.read_csv(os.path.join(args.data_dir, 'mestre_skus.csv'))
+        df_orders = pd.read_csv(os.path.join(args.data_dir, 'pedidos_backlog.csv'))
+    else:
+        rng = np.random.default_rng(args.seed)
+        df_skus = data_engine.generate_skus(num_skus=args.skus, seed=rng)
+        df_orders = data_engine.generate_orders(df_skus, num_orders=args.orders, seed=rng)
+
+    t0 = time.perf_counter()
+    df_sites, _, network = run_network(df_skus, df_orders, sites, policy=args.policy, fast_share=args.fast_share, workers=args.workers, seed=args.seed)
+    print(df_sites.to_string(index=False), file=sys.stderr)
+    print(json.dumps(network, indent=2), file=sys.stderr)
+    print(f"Concluído em {time.perf_counter() - t0:.1f}s.", file=sys.stderr)
+    if args.out:
+        out_dir = os.path.dirname(args.out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'sites': df_sites.to_dict(orient='records'), 'network': network}, f, indent=2, default=float)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
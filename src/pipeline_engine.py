@@ -0,0 +1,233 @@
+"""
+Execução headless do pipeline completo (sem Streamlit):
+Geração -> Slotting -> Simulação -> Dimensionamento de Frota.
+
+Uso:
+    python -m src.pipeline_engine --config cenario.json --out kpis.parquet
+    python -m src.pipeline_engine --speed 1.0 1.5 2.0 --demand 1 2 --forklifts 3 5 --workers 8 --out grid.json
+    python -m src.pipeline_engine --demand 1 2 3 --store data/resultados.sqlite   # também grava alocação e KPIs por pedido
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src import data_engine, slotting_engine, simulation_engine, sampling_engine, results_engine
+
+# Parâmetros padrão do cenário (espelham os defaults da barra lateral do app.py)
+DEFAULT_SCENARIO = {
+    'num_orders': 3000,
+    'num_skus': 500,
+    'demand_multiplier': 1.0,
+    'forklift_speed': 1.5,
+    'morning_weight': 1.5,
+    'score_source': 'history', # 'forecast': slotting pelo esforço previsto (forecast_engine)
+    'forecast_horizon_days': 7,
+    'travel_model': 'linear', # 'kinematic': aceleração, curvas e peso do palete (kinematics_engine)
+    'sim_sample_size': 50,
+    'num_forklifts': 5,
+    'shift_hours': 16.0,
+    'num_active_docks': 1,
+    'opt_iterations': 0,
+    'opt_sample': 20,
+    'seed': 42,
+    'data_dir': None, # Se definido, carrega os CSVs existentes em vez de gerar
+}
+
+# Atalhos da linha de comando -> chaves do cenário
+GRID_ARGS = {
+    'speed': 'forklift_speed',
+    'demand': 'demand_multiplier',
+    'forklifts': 'num_forklifts',
+}
+
+# Parâmetros que só valem para dados gerados: com data_dir não mudam nada
+GENERATION_ONLY = ['num_orders', 'num_skus']
+
+def load_scenario_data(config):
+    if config.get('data_dir'):
+        data_dir = config['data_dir']
+        df_layout = pd.read_csv(os.path.join(data_dir, 'layout_fisico.csv'))
+        df_skus = pd.read_csv(os.path.join(data_dir, 'mestre_skus.csv'))
+        df_orders = pd.read_csv(os.path.join(data_dir, 'pedidos_backlog.csv'))
+        if config['demand_multiplier'] != 1.0:
+            # Mesma regra do generate_orders: quantidade x multiplicador, truncada, mínimo 1
+            quantity = (df_orders['quantity'].to_numpy(dtype=float) * config['demand_multiplier']).astype(np.int64)
+            df_orders = df_orders.assign(quantity=np.maximum(quantity, 1))
+        return df_layout, df_skus, df_orders
+
+    # Gerador por cenário (sem estado global): cada processo gera exatamente os mesmos dados para a mesma config
+    rng = np.random.default_rng(config['seed'])
+
+    df_layout = data_engine.generate_layout()
+    df_skus = data_engine.generate_skus(num_skus=config['num_skus'], seed=rng)
+    df_orders = data_engine.generate_orders(df_skus, num_orders=config['num_orders'], demand_multiplier=config['demand_multiplier'], seed=rng)
+    return df_layout, df_skus, df_orders
+
+def run_scenario(config):
+    """
+    Roda o pipeline completo para um cenário e retorna um dicionário plano de KPIs
+    (parâmetros do cenário + resultados), pronto para virar uma linha de tabela.
+    """
+    return run_scenario_frames(config)[0]
+
+def run_scenario_frames(config):
+    # Como run_scenario, mas devolve também a alocação e os KPIs por pedido (para o results_engine)
+    config = {**DEFAULT_SCENARIO, **config}
+    t0 = time.perf_counter()
+
+    # 1. Dados
+    df_layout, df_skus, df_orders = load_scenario_data(config)
+
+    # 2. Slotting
+    df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout, wave_weight_morning=config['morning_weight'],
+                                                     score_source=config['score_source'], forecast_horizon_days=config['forecast_horizon_days'])
+    if config['opt_iterations'] > 0:
+        df_alloc, _ = slotting_engine.optimize_slotting_hill_climbing(
+            df_alloc, df_orders, df_layout, iterations=config['opt_iterations'], sample_size=config['opt_sample'], seed=config['seed']
+        )
+
+    # 3. Simulação (amostra estratificada por dia/onda/tamanho)
+    sample_ids = sampling_engine.stratified_order_sample(df_orders, config['sim_sample_size'], seed=config['seed'])
+    df_kpis = simulation_engine.run_simulation(
+        df_orders, df_alloc, df_layout,
+        forklift_speed=config['forklift_speed'],
+        num_active_docks=config['num_active_docks'],
+        order_ids=sample_ids,
+        df_skus=df_skus,
+        travel_model=config['travel_model']
+    )
+
+    # 4. Frota
+    avg_time_per_order = df_kpis['time_opt_s'].mean()
+    _, fleet_summary = simulation_engine.calculate_fleet_sizing(
+        df_orders, avg_time_per_order, num_forklifts=config['num_forklifts'], shift_hours=config['shift_hours']
+    )
+
+    avg_time_rnd = df_kpis['time_rnd_s'].mean()
+    result = dict(config)
+    result.update({
+        'total_orders': int(df_orders['order_id'].nunique()),
+        'total_lines': len(df_orders),
+        'skus_allocated': int(df_alloc['sku_id'].nunique()),
+        'orders_simulated': len(df_kpis),
+        'avg_dist_opt_m': df_kpis['dist_opt_m'].mean(),
+        'avg_time_opt_s': avg_time_per_order,
+        'reduction_time_pct': ((avg_time_rnd - avg_time_per_order) / avg_time_rnd) * 100 if avg_time_rnd > 0 else 0,
+        **fleet_summary,
+        'runtime_s': time.perf_counter() - t0,
+    })
+    return result, df_alloc, df_kpis
+
+def expand_grid(base_config, grid):
+    """
+    Produto cartesiano de um dicionário {parametro: [valores]} sobre a config base.
+    Chaves fora do DEFAULT_SCENARIO são rejeitadas: seriam ignoradas e a "varredura"
+    rodaria N cenários idênticos. Pelo mesmo motivo, com data_dir a grade não pode variar
+    os parâmetros de geração (GENERATION_ONLY); demand_multiplier escala as quantidades carregadas.
+    """
+    unknown = set(grid or {}) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos na grade: {sorted(unknown)}")
+    if base_config.get('data_dir') or (grid or {}).get('data_dir'):
+        no_effect = set(grid or {}) & set(GENERATION_ONLY)
+        if no_effect:
+            raise ValueError(f"Parâmetros sem efeito com data_dir (dados carregados): {sorted(no_effect)}")
+    if not grid:
+        return [dict(base_config)]
+    keys = list(grid.keys())
+    configs = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        configs.append({**base_config, **dict(zip(keys, values))})
+    return configs
+
+def run_batch(configs, workers=None, keep_frames=False):
+    """
+    Executa vários cenários em paralelo (um processo por cenário).
+    A ordem do resultado segue a ordem de configs.
+    keep_frames: cada item vira (kpis, alocação, KPIs por pedido), ver run_scenario_frames.
+    """
+    run = run_scenario_frames if keep_frames else run_scenario
+    if workers == 1 or len(configs) == 1:
+        return [run(c) for c in configs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, configs))
+
+def store_results(results, db_path, source='pipeline'):
+    """
+    Grava cada cenário (parâmetros, alocação e KPIs por pedido) no banco de resultados,
+    no processo principal (um único escritor no SQLite). Retorna os scenario_ids.
+    """
+    conn = results_engine.connect(db_path)
+    try:
+        return [results_engine.save_scenario(conn, result, df_alloc, df_kpis, source=source) for result, df_alloc, df_kpis in results]
+    finally:
+        conn.close()
+
+def write_results(rows, out_path):
+    df_results = pd.DataFrame(rows)
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    if out_path.endswith('.parquet'):
+        df_results.to_parquet(out_path, index=False)
+    elif out_path.endswith('.json'):
+        df_results.to_json(out_path, orient='records', indent=2)
+    else:
+        raise ValueError(f"Formato de saída não suportado: {out_path} (use .parquet ou .json)")
+    return df_results
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Runner headless do Gêmeo Digital (Slotting + Simulação + Frota).")
+    parser.add_argument('--config', help="JSON com o cenário base e, opcionalmente, uma chave 'grid' {parametro: [valores]}.")
+    parser.add_argument('--speed', type=float, nargs='+', help="Velocidades da empilhadeira (m/s) para a grade.")
+    parser.add_argument('--demand', type=float, nargs='+', help="Multiplicadores de demanda para a grade.")
+    parser.add_argument('--forklifts', type=int, nargs='+', help="Números de empilhadeiras para a grade.")
+    parser.add_argument('--workers', type=int, default=None, help="Processos paralelos (padrão: nº de CPUs).")
+    parser.add_argument('--out', default='data/kpis_cenarios.parquet', help="Arquivo de saída (.parquet ou .json).")
+    parser.add_argument('--store', help="Banco SQLite de resultados (ex.: data/resultados.sqlite) para gravar também alocação e KPIs por pedido.")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    base_config = dict(DEFAULT_SCENARIO)
+    grid = {}
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            file_config = json.load(f)
+        grid.update(file_config.pop('grid', {}))
+        base_config.update(file_config)
+
+    unknown = set(base_config) - set(DEFAULT_SCENARIO)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos no cenário: {sorted(unknown)}")
+
+    for arg_name, key in GRID_ARGS.items():
+        values = getattr(args, arg_name)
+        if values:
+            grid[key] = values
+
+    configs = expand_grid(base_config, grid)
+    print(f"Rodando {len(configs)} cenário(s)...", file=sys.stderr)
+    t0 = time.perf_counter()
+    if args.store:
+        results = run_batch(configs, workers=args.workers, keep_frames=True)
+        rows = [result for result, _, _ in results]
+        scenario_ids = store_results(results, args.store)
+        print(f"Cenários {scenario_ids} gravados em {args.store}", file=sys.stderr)
+    else:
+        rows = run_batch(configs, workers=args.workers)
+    write_results(rows, args.out)
+    print(f"{len(rows)} cenário(s) em {time.perf_counter() - t0:.1f}s -> {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
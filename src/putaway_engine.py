@@ -0,0 +1,294 @@
+"""
+Índice espacial e de espaço livre para putaway em tempo real (recebimento), sem refazer o slotting:
+KD-tree implícita sobre (x, y, z) dos bins em que cada subárvore guarda, para cada piso de
+capacidade (max_weight_kg >= classe), o menor total_cost_score entre os seus bins livres.
+
+Uso:
+    index = putaway_engine.PutawayIndex(df_layout, occupied_bins=df_alloc['bin_id'])
+    # Bin livre mais barato a até 10 m do corredor R2 que suporta 1.200 kg
+    bin_id, cost = index.cheapest_feasible(1200, region=index.aisle_region('R2'), radius_m=10)
+    # Bin livre viável mais próximo de um ponto (ex.: a doca de recebimento)
+    bin_id, dist = index.nearest_feasible(30, 20, 1, weight_kg=800)
+    index.occupy(bin_id); index.release(bin_id)
+
+Consultas descem a árvore pela menor chave (custo ou distância) e podam subárvores sem bin livre
+viável; occupy/release refazem só o caminho folha -> raiz: O(log n).
+"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from src import slotting_engine
+
+# Altura de um nível de rack (m): distância = |dx| + |dy| + LEVEL_HEIGHT_M x |dz|
+LEVEL_HEIGHT_M = 1.5
+INF = float('inf')
+
+def _build_kdtree(points):
+    """
+    KD-tree implícita e balanceada: perm ordena os pontos de modo que cada nó é a mediana do seu
+    intervalo [lo, hi) e os filhos são as duas metades. Construída nível a nível, com um lexsort
+    por nível (eixo = profundidade % nº de dimensões). Os nós são identificados pela posição em perm.
+
+    Retorna (perm, left, right, parent, levels), levels = posições dos nós de cada profundidade.
+    """
+    n, n_dims = points.shape
+    perm = np.arange(n)
+    left = np.full(n, -1, dtype=np.int64)
+    right = np.full(n, -1, dtype=np.int64)
+    parent = np.full(n, -1, dtype=np.int64)
+    levels = []
+
+    seg_lo, seg_hi = np.array([0]), np.array([n])
+    seg_parent, seg_side = np.array([-1]), np.array([0])
+    depth = 0
+    while n and len(seg_lo):
+        # Chave de bloco: início do segmento nas posições ativas, a própria posição nos nós já fixados;
+        # ordenar por (bloco, coordenada) mantém os blocos no lugar e ordena cada segmento pelo eixo
+        lengths = seg_hi - seg_lo
+        active = np.repeat(seg_lo, lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        block = np.arange(n)
+        block[active] = np.repeat(seg_lo, lengths)
+        coord = np.zeros(n)
+        coord[active] = points[perm[active], depth % n_dims]
+        perm = perm[np.lexsort((coord, block))]
+
+        mids = (seg_lo + seg_hi) // 2
+        parent[mids] = seg_parent
+        has_parent = seg_parent >= 0
+        is_left = has_parent & (seg_side == 0)
+        is_right = has_parent & (seg_side == 1)
+        left[seg_parent[is_left]] = mids[is_left]
+        right[seg_parent[is_right]] = mids[is_right]
+        levels.append(mids)
+
+        has_l, has_r = mids > seg_lo, seg_hi > mids + 1
+        seg_lo = np.concatenate([seg_lo[has_l], mids[has_r] + 1])
+        seg_hi = np.concatenate([mids[has_l], seg_hi[has_r]])
+        seg_parent = np.concatenate([mids[has_l], mids[has_r]])
+        seg_side = np.concatenate([np.zeros(has_l.sum(), dtype=int), np.ones(has_r.sum(), dtype=int)])
+        depth += 1
+    return perm, left, right, parent, levels
+
+def _reduce_up(values, levels, left, right, func):
+    # Agrega cada nó com as subárvores dos filhos, do nível mais fundo para a raiz
+    for mids in reversed(levels):
+        for child in (left[mids], right[mids]):
+            has = child >= 0
+            values[..., mids[has]] = func(values[..., mids[has]], values[..., child[has]])
+    return values
+
+class PutawayIndex:
+    """
+    Índice de putaway sobre um layout: bins livres/ocupados, custo (total_cost_score do
+    calculate_bin_costs) e capacidade (max_weight_kg) de cada bin, organizados numa KD-tree.
+    """
+    def __init__(self, df_layout, occupied_bins=None, forklift_speed=1.5, level_height_m=LEVEL_HEIGHT_M):
+        self.df_layout = df_layout.reset_index(drop=True)
+        self.bin_ids = self.df_layout['bin_id'].to_numpy()
+        self.bin_row = dict(zip(self.bin_ids, range(len(self.bin_ids))))
+        self.level_height_m = level_height_m
+
+        df_costs = slotting_engine.calculate_bin_costs(self.df_layout.copy(), forklift_speed=forklift_speed)
+        cost_rows = df_costs['bin_id'].map(self.bin_row).to_numpy()
+        cost = np.empty(len(self.bin_ids))
+        cost[cost_rows] = df_costs['total_cost_score'].to_numpy()
+        capacity = np.empty(len(self.bin_ids))
+        capacity[cost_rows] = df_costs['max_weight_kg'].to_numpy()
+
+        points = self._points(self.df_layout['x'].to_numpy(), self.df_layout['y'].to_numpy(), self.df_layout['z'].to_numpy())
+        perm, left, right, parent, levels = _build_kdtree(points)
+        self.class_caps = np.unique(capacity)
+        node_class = np.searchsorted(self.class_caps, capacity[perm])
+
+        free = np.ones(len(perm), dtype=bool)
+        if occupied_bins is not None:
+            occupied_rows = [self.bin_row[b] for b in occupied_bins if b in self.bin_row]
+            pos_of_row = np.empty(len(perm), dtype=np.int64)
+            pos_of_row[perm] = np.arange(len(perm))
+            free[pos_of_row[occupied_rows]] = False
+
+        # Caixa envolvente de cada subárvore (poda por distância)
+        box_lo = _reduce_up(points[perm].T.copy(), levels, left, right, np.minimum)
+        box_hi = _reduce_up(points[perm].T.copy(), levels, left, right, np.maximum)
+        # Menor custo entre os bins livres com capacidade >= cada classe, por subárvore:
+        # um palete de peso w consulta uma única lista (a da menor classe que o suporta)
+        own = np.full((len(self.class_caps), len(perm)), INF)
+        own[node_class[free], np.flatnonzero(free)] = cost[perm][free]
+        own = np.minimum.accumulate(own[::-1], axis=0)[::-1].copy()
+        sub_min = _reduce_up(own, levels, left, right, np.minimum)
+
+        # Laços de consulta/atualização em Python puro: listas são bem mais rápidas que escalares NumPy
+        self._row = perm.tolist()
+        self._pos = dict(zip(self._row, range(len(self._row))))
+        self._left, self._right, self._parent = left.tolist(), right.tolist(), parent.tolist()
+        self._cost = cost[perm].tolist()
+        self._cls = node_class.tolist()
+        self._cap = capacity[perm].tolist()
+        self._free = free.tolist()
+        self._pt = points[perm].tolist()
+        self._box_lo, self._box_hi = box_lo.T.tolist(), box_hi.T.tolist()
+        self._sub = [row.tolist() for row in sub_min]
+        self._root = int(levels[0][0]) if levels else -1
+        self.free_count = int(free.sum())
+
+    def _points(self, x, y, z):
+        return np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float), np.asarray(z, dtype=float) * self.level_height_m])
+
+    # --- Regiões de consulta: caixas (lo, hi) nas coordenadas do índice ---
+    def point_region(self, x, y, z=1):
+        p = self._points([x], [y], [z])[0].tolist()
+        return p, p
+
+    def aisle_region(self, aisle_id):
+        # Caixa que envolve todos os bins do corredor (ex.: 'R2'): distância 0 dentro do corredor
+        rows = self.df_layout.index[self.df_layout['aisle_id'] == aisle_id]
+        if len(rows) == 0:
+            raise ValueError(f"Corredor desconhecido: {aisle_id}")
+        pts = self._points(self.df_layout.loc[rows, 'x'], self.df_layout.loc[rows, 'y'], self.df_layout.loc[rows, 'z'])
+        return pts.min(axis=0).tolist(), pts.max(axis=0).tolist()
+
+    def _box_dist(self, lo, hi, q_lo, q_hi):
+        # Distância Manhattan entre duas caixas (0 se se sobrepõem)
+        return (max(q_lo[0] - hi[0], lo[0] - q_hi[0], 0.0) + max(q_lo[1] - hi[1], lo[1] - q_hi[1], 0.0)
+                + max(q_lo[2] - hi[2], lo[2] - q_hi[2], 0.0))
+
+    def _box_far(self, lo, hi, q_lo, q_hi):
+        # Maior distância de um ponto da caixa [lo, hi] até a região (a folga por eixo é máxima num dos extremos)
+        far = 0.0
+        for d in range(3):
+            far += max(q_lo[d] - lo[d], lo[d] - q_hi[d], q_lo[d] - hi[d], hi[d] - q_hi[d], 0.0)
+        return far
+
+    def _min_list(self, weight_kg):
+        # Lista de mínimos por subárvore da menor classe que suporta o palete (None se nenhuma suporta)
+        k = int(np.searchsorted(self.class_caps, weight_kg))
+        return self._sub[k] if k < len(self._sub) else None
+
+    # --- Consultas ---
+    def cheapest_feasible(self, weight_kg=0.0, region=None, radius_m=None):
+        """
+        Bin livre de menor custo que suporta weight_kg, opcionalmente a até radius_m da região
+        (point_region / aisle_region). Busca best-first pela menor chave de custo das subárvores:
+        sem região desce direto pelo caminho do mínimo (O(log n)).
+        Retorna (bin_id, custo) ou (None, inf).
+        """
+        sub = self._min_list(weight_kg)
+        if self._root < 0 or sub is None:
+            return None, INF
+        limited = region is not None and radius_m is not None
+        q_lo, q_hi = region if region is not None else (None, None)
+
+        # Entradas (custo mínimo da subárvore, nó, subárvore inteira dentro do raio)
+        best_cost, best_pos = INF, -1
+        heap = [(sub[self._root], self._root, not limited)]
+        while heap:
+            key, p, inside = heapq.heappop(heap)
+            if key >= best_cost:
+                break
+            if (self._free[p] and self._cost[p] < best_cost and self._cap[p] >= weight_kg
+                    and (inside or self._box_dist(self._pt[p], self._pt[p], q_lo, q_hi) <= radius_m)):
+                best_cost, best_pos = self._cost[p], p
+            for c in (self._left[p], self._right[p]):
+                if c < 0:
+                    continue
+                m = sub[c]
+                if m >= best_cost:
+                    continue
+                c_inside = inside
+                if not inside:
+                    lo, hi = self._box_lo[c], self._box_hi[c]
+                    if self._box_dist(lo, hi, q_lo, q_hi) > radius_m:
+                        continue
+                    # Dentro do raio por inteiro: o mínimo da subárvore é exato e os descendentes não testam distância
+                    c_inside = self._box_far(lo, hi, q_lo, q_hi) <= radius_m
+                heapq.heappush(heap, (m, c, c_inside))
+        return (self.bin_ids[self._row[best_pos]], best_cost) if best_pos >= 0 else (None, INF)
+
+    def nearest_feasible(self, x, y, z=1, weight_kg=0.0, region=None):
+        """
+        Bin livre mais próximo (Manhattan em x, y e altura) de um ponto ou região que suporta weight_kg;
+        empate na distância fica com o de menor custo. Retorna (bin_id, distância em m) ou (None, inf).
+        """
+        sub = self._min_list(weight_kg)
+        if self._root < 0 or sub is None:
+            return None, INF
+        q_lo, q_hi = region if region is not None else self.point_region(x, y, z)
+
+        best = (INF, INF)
+        best_pos = -1
+        heap = [(self._box_dist(self._box_lo[self._root], self._box_hi[self._root], q_lo, q_hi), self._root)]
+        while heap:
+            d, p = heapq.heappop(heap)
+            if d > best[0]:
+                break
+            if self._free[p] and self._cap[p] >= weight_kg:
+                cand = (self._box_dist(self._pt[p], self._pt[p], q_lo, q_hi), self._cost[p])
+                if cand < best:
+                    best, best_pos = cand, p
+            for c in (self._left[p], self._right[p]):
+                if c >= 0 and sub[c] < INF:
+                    dc = self._box_dist(self._box_lo[c], self._box_hi[c], q_lo, q_hi)
+                    if dc <= best[0]:
+                        heapq.heappush(heap, (dc, c))
+        return (self.bin_ids[self._row[best_pos]], best[0]) if best_pos >= 0 else (None, INF)
+
+    # --- Atualizações ---
+    def _set_free(self, bin_id, is_free):
+        p = self._pos[self.bin_row[bin_id]]
+        if self._free[p] == is_free:
+            return
+        self._free[p] = is_free
+        self.free_count += 1 if is_free else -1
+
+        # Refaz, em cada piso de capacidade que inclui a classe do bin, o mínimo no caminho
+        # até a raiz; para quando nada muda
+        for k in range(self._cls[p] + 1):
+            sub = self._sub[k]
+            node = p
+            while node >= 0:
+                v = self._cost[node] if (self._free[node] and self._cls[node] >= k) else INF
+                l, r = self._left[node], self._right[node]
+                if l >= 0 and sub[l] < v:
+                    v = sub[l]
+                if r >= 0 and sub[r] < v:
+                    v = sub[r]
+                if sub[node] == v and node != p:
+                    break
+                sub[node] = v
+                node = self._parent[node]
+
+    def occupy(self, bin_id):
+        self._set_free(bin_id, False)
+
+    def release(self, bin_id):
+        self._set_free(bin_id, True)
+
+    def is_free(self, bin_id):
+        return self._free[self._pos[self.bin_row[bin_id]]]
+
+    def putaway(self, weight_kg=0.0, region=None, radius_m=None):
+        # Decide e reserva: bin livre mais barato viável (na região, se dada); None se não houver
+        bin_id, _ = self.cheapest_feasible(weight_kg, region=region, radius_m=radius_m)
+        if bin_id is not None:
+            self.occupy(bin_id)
+        return bin_id
+
+def putaway_inbound(index, df_inbound, df_skus, region=None, radius_m=None):
+    """
+    Putaway de um lote de recebimento (sku_id, e opcionalmente pallets): cada palete vai para o
+    bin livre mais barato que suporta o seu peso. Retorna as linhas (sku_id, bin_id) alocadas,
+    no formato do run_slotting_strategy, prontas para concatenar à alocação atual.
+    """
+    pallet_weight = df_skus.set_index('sku_id')['pallet_weight_kg']
+    pallets = df_inbound['pallets'].to_numpy(dtype=int) if 'pallets' in df_inbound.columns else np.ones(len(df_inbound), dtype=int)
+    rows = []
+    for sku_id, n in zip(df_inbound['sku_id'], pallets):
+        weight = float(pallet_weight.get(sku_id, 0.0))
+        for _ in range(n):
+            bin_id = index.putaway(weight, region=region, radius_m=radius_m)
+            if bin_id is None:
+                break # Sem bin viável: o restante do SKU fica sem posição
+            rows.append({'sku_id': sku_id, 'bin_id': bin_id})
+    return pd.DataFrame(rows, columns=['sku_id', 'bin_id'])
@@ -0,0 +1,218 @@
+"""
+Plano de realocação física entre duas alocações (ex.: a atual e a do otimizador): quais paletes
+mover, em que ordem e quantas horas de empilhadeira custa, para decidir se o re-slotting compensa.
+
+A diferença entre as alocações vira um grafo de movimentos bin -> bin em que cada bin tem no máximo
+um palete saindo e um entrando, ou seja, uma união de cadeias e ciclos:
+  * cadeia: b1 -> b2 -> ... -> bk -> (bin vazio ou Staging); executada de trás para frente;
+  * ciclo: b1 -> b2 -> ... -> bk -> b1; precisa de um bin de buffer (um palete sai, o ciclo gira, ele volta).
+Os trabalhos (cadeias e ciclos) são encadeados pelo vizinho mais próximo a partir do Staging.
+
+Uso:
+    df_moves, summary = relocation_engine.plan_relocation(df_alloc, df_alloc_optimized, df_layout, df_skus)
+"""
+import numpy as np
+import pandas as pd
+
+from src import simulation_engine, putaway_engine
+
+# Origem/destino fora das posições: paletes que entram (reserva) ou saem (sem posição na nova alocação)
+STAGING_ID = 'STAGING'
+STAGING = -1
+
+def allocation_rows(df_alloc, layout_bins):
+    # Posições da alocação como (sku_id, linha do layout); bins fora do layout são ignorados
+    df = df_alloc[['sku_id', 'bin_id']].drop_duplicates('bin_id')
+    rows = layout_bins.get_indexer(df['bin_id'])
+    return pd.DataFrame({'sku_id': df['sku_id'].to_numpy()[rows >= 0], 'row': rows[rows >= 0]})
+
+def allocation_moves(df_alloc_from, df_alloc_to, layout_bins):
+    """
+    Movimentos de palete entre as alocações, em linhas do layout (STAGING = -1; layout_bins = pd.Index dos bin_id):
+    para cada SKU, os bins que ele deixa são pareados com os bins que ganha (na ordem do layout);
+    sobras viram saídas para o Staging ou entradas a partir dele. Bins mantidos não geram movimento.
+    Retorna (sku_ids, src, dst) em arrays.
+    """
+    old, new = allocation_rows(df_alloc_from, layout_bins), allocation_rows(df_alloc_to, layout_bins)
+    both = old.merge(new, on=['sku_id', 'row'], how='outer', indicator=True)
+    leaving = both[both['_merge'] == 'left_only'].sort_values(['sku_id', 'row'])
+    arriving = both[both['_merge'] == 'right_only'].sort_values(['sku_id', 'row'])
+    leaving = leaving.assign(k=leaving.groupby('sku_id').cumcount())
+    arriving = arriving.assign(k=arriving.groupby('sku_id').cumcount())
+
+    moves = leaving[['sku_id', 'k', 'row']].merge(arriving[['sku_id', 'k', 'row']], on=['sku_id', 'k'], how='outer', suffixes=('_src', '_dst'))
+    return (moves['sku_id'].to_numpy(),
+            moves['row_src'].fillna(STAGING).to_numpy(dtype=np.int64),
+            moves['row_dst'].fillna(STAGING).to_numpy(dtype=np.int64))
+
+def decompose_moves(src, dst):
+    """
+    Separa os movimentos em cadeias e ciclos (índices dos movimentos na ordem do caminho).
+    Retorna (cadeias, ciclos), listas de listas.
+    """
+    src, dst = src.tolist(), dst.tolist()
+    out = {s: m for m, s in enumerate(src) if s != STAGING} # bin -> movimento que esvazia o bin
+    into = {d for d in dst if d != STAGING}                  # bins que recebem palete
+    visited = [False] * len(src)
+
+    chains = []
+    for m, s in enumerate(src):
+        if s != STAGING and s in into:
+            continue # Não é início de cadeia: alguém precisa ocupar este bin depois que ele esvazia
+        path = [m]
+        visited[m] = True
+        while dst[path[-1]] in out:
+            nxt = out[dst[path[-1]]]
+            visited[nxt] = True
+            path.append(nxt)
+        chains.append(path)
+
+    cycles = []
+    for m in range(len(src)):
+        if visited[m]:
+            continue
+        path = [m]
+        visited[m] = True
+        while not visited[out[dst[path[-1]]]]:
+            path.append(out[dst[path[-1]]])
+            visited[path[-1]] = True
+        cycles.append(path)
+    return chains, cycles
+
+def _job_steps(chains, cycles, src, dst, weight, xyz, bin_row, buffer_index):
+    # Passos de cada trabalho, na ordem de execução: (movimento, origem, destino, tipo)
+    jobs = []
+    for path in chains:
+        jobs.append(('chain', [(m, src[m], dst[m], 'move') for m in reversed(path)]))
+    for path in cycles:
+        # O palete do último bin (destino = primeiro bin) vai ao buffer; o ciclo gira; ele volta ao primeiro bin
+        last = path[-1]
+        buffer = STAGING # Sem bin vazio que suporte o palete: o buffer é o próprio Staging
+        if buffer_index is not None:
+            bin_id, _ = buffer_index.nearest_feasible(*xyz[src[last]], weight_kg=weight[last])
+            if bin_id is not None:
+                buffer = bin_row[bin_id]
+        steps = [(last, src[last], buffer, 'to_buffer')]
+        steps += [(m, src[m], dst[m], 'move') for m in reversed(path[:-1])]
+        steps.append((last, buffer, dst[last], 'from_buffer'))
+        jobs.append(('cycle', steps))
+    return jobs
+
+def order_jobs(jobs, xyz, df_layout, bin_row):
+    """
+    Sequência dos trabalhos pelo vizinho mais próximo: a empilhadeira sai do Staging e, ao terminar
+    cada trabalho, segue para o trabalho cujo primeiro palete está mais perto. A busca usa um
+    PutawayIndex sobre os bins de início (cada bin começa no máximo um trabalho); trabalhos que
+    começam no Staging (entradas da reserva) competem pela distância até o Staging.
+    """
+    staging_xyz = (simulation_engine.STAGING_X, simulation_engine.STAGING_Y, 1)
+    start_rows = [steps[0][1] for _, steps in jobs]
+    job_of_row = {row: k for k, row in enumerate(start_rows) if row != STAGING}
+    from_staging = [k for k, row in enumerate(start_rows) if row == STAGING]
+    index = putaway_engine.PutawayIndex(df_layout.iloc[sorted(job_of_row)]) if job_of_row else None
+
+    order = []
+    pos = staging_xyz
+    remaining = len(job_of_row)
+    while remaining or from_staging:
+        best_job, best_d, bin_id = -1, np.inf, None
+        if remaining:
+            bin_id, best_d = index.nearest_feasible(*pos)
+            best_job = job_of_row[bin_row[bin_id]]
+        if from_staging:
+            # Mesma métrica do índice (Manhattan com altura)
+            d = abs(pos[0] - staging_xyz[0]) + abs(pos[1] - staging_xyz[1]) + putaway_engine.LEVEL_HEIGHT_M * abs(pos[2] - 1)
+            if d <= best_d:
+                best_job, bin_id = from_staging.pop(), None
+        if bin_id is not None:
+            index.occupy(bin_id)
+            remaining -= 1
+        order.append(best_job)
+        end = jobs[best_job][1][-1][2]
+        pos = staging_xyz if end == STAGING else xyz[end]
+    return order
+
+def plan_relocation(df_alloc_from, df_alloc_to, df_layout, df_skus=None, forklift_speed=1.5):
+    """
+    Plano de movimentos para ir de df_alloc_from a df_alloc_to. df_skus (opcional) dá o peso
+    do palete, usado na escolha do bin de buffer dos ciclos (capacidade do nível).
+
+    Retorna (df_moves, summary): uma linha por movimento na ordem de execução (seq, job_id, tipo,
+    SKU, bins de origem/destino, distâncias vazio/carregado e tempo) e o resumo com horas de empilhadeira.
+    """
+    df_layout = df_layout.reset_index(drop=True)
+    bin_ids = df_layout['bin_id'].to_numpy()
+    bin_row = dict(zip(bin_ids, range(len(bin_ids))))
+    xyz = df_layout[['x', 'y', 'z']].to_numpy().tolist()
+
+    sku_ids, src, dst = allocation_moves(df_alloc_from, df_alloc_to, pd.Index(bin_ids))
+    chains, cycles = decompose_moves(src, dst)
+    weight = np.zeros(len(sku_ids))
+    if df_skus is not None:
+        weight = pd.Series(sku_ids).map(df_skus.set_index('sku_id')['pallet_weight_kg']).fillna(0).to_numpy()
+
+    # Buffer dos ciclos: bins vazios nas duas alocações
+    buffer_index = None
+    if cycles:
+        occupied = np.zeros(len(df_layout), dtype=bool)
+        for df_alloc in (df_alloc_from, df_alloc_to):
+            rows = pd.Index(bin_ids).get_indexer(df_alloc['bin_id'])
+            occupied[rows[rows >= 0]] = True
+        if not occupied.all():
+            buffer_index = putaway_engine.PutawayIndex(df_layout[~occupied])
+
+    jobs = _job_steps(chains, cycles, src.tolist(), dst.tolist(), weight.tolist(), xyz, bin_row, buffer_index)
+    order = order_jobs(jobs, xyz, df_layout, bin_row)
+
+    # Movimentos na ordem de execução; STAGING (-1) indexa a última linha das coordenadas
+    steps = [(job_id, jobs[job_id][0], *step) for job_id in order for step in jobs[job_id][1]]
+    job_id = np.array([st[0] for st in steps], dtype=np.int64)
+    move = np.array([st[2] for st in steps], dtype=np.int64)
+    s = np.array([st[3] for st in steps], dtype=np.int64)
+    d = np.array([st[4] for st in steps], dtype=np.int64)
+    pts = np.vstack([np.asarray(xyz, dtype=float).reshape(-1, 3), [[simulation_engine.STAGING_X, simulation_engine.STAGING_Y, 1]]])
+    p_src, p_dst = pts[s], pts[d]
+    p_prev = np.vstack([pts[-1:], p_dst[:-1]]) # A empilhadeira sai do Staging
+
+    # Distâncias com a regra de cross aisle do simulador; pegar na origem e largar no destino: 15 s + 5 s por nível
+    empty_m = simulation_engine.manhattan_dist_array(p_prev[:, 0], p_prev[:, 1], p_src[:, 0], p_src[:, 1])
+    loaded_m = simulation_engine.manhattan_dist_array(p_src[:, 0], p_src[:, 1], p_dst[:, 0], p_dst[:, 1])
+    time_s = (empty_m + loaded_m) / forklift_speed + (15 + (p_src[:, 2] - 1) * 5) + (15 + (p_dst[:, 2] - 1) * 5)
+
+    names = np.append(bin_ids, STAGING_ID).astype(object)
+    df_moves = pd.DataFrame({
+        'seq': np.arange(len(steps)),
+        'job_id': job_id,
+        'job_type': [st[1] for st in steps],
+        'move_type': [st[5] for st in steps],
+        'sku_id': np.asarray(sku_ids, dtype=object)[move],
+        'from_bin': names[s],
+        'to_bin': names[d],
+        'empty_m': empty_m,
+        'loaded_m': loaded_m,
+        'time_s': time_s,
+    })
+    summary = {
+        'positions_changed': len(sku_ids),
+        'moves': len(df_moves),
+        'chains': len(chains),
+        'cycles': len(cycles),
+        'buffer_moves': int((df_moves['move_type'] == 'to_buffer').sum()),
+        'empty_km': float(empty_m.sum()) / 1000,
+        'loaded_km': float(loaded_m.sum()) / 1000,
+        'forklift_hours': float(time_s.sum()) / 3600,
+    }
+    return df_moves, summary
+
+def payback_days(summary, time_saved_s_per_day, num_forklifts=1):
+    """
+    Dias de operação para o ganho diário de tempo pagar as horas de realocação
+    (inf se o novo layout não economiza tempo). Também devolve o prazo da realocação com a frota.
+    """
+    hours = summary['forklift_hours']
+    return {
+        'relocation_hours': hours,
+        'relocation_shift_hours': hours / max(num_forklifts, 1),
+        'saved_hours_per_day': time_saved_s_per_day / 3600,
+        'payback_days': hours * 3600 / time_saved_s_per_day if time_saved_s_per_day > 0 else float('inf'),
+    }
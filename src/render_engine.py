@@ -0,0 +1,326 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.express as px
+import plotly.colors as pc
+
+# Posição do Staging (Hub) - mesma referência do simulation_engine
+HUB_X = 28
+HUB_Y = 10
+
+# Limite de pontos no Gêmeo 3D antes de agregar por nível de detalhe (LOD)
+MAX_3D_POINTS = 20000
+
+CAT_COLOR_MAP = {
+    'Vazio': 'lightgrey', 'Móveis': '#1f77b4', 'Eletrodomésticos': '#ff7f0e', 'Automotivo': '#2ca02c',
+    'Construção': '#d62728', 'Eletrônicos': '#9467bd', 'Vestuário': '#8c564b', 'Alimentos': '#e377c2',
+    'Farmácia': '#7f7f7f', 'Livros': '#bcbd22'
+}
+
+# --- Cache de Figuras (por Fingerprint das Entradas) ---
+_FIGURE_CACHE = OrderedDict()
+_FIGURE_CACHE_SIZE = 32
+
+def fingerprint(*inputs):
+    """
+    Gera uma impressão digital (hash) estável das entradas de uma figura.
+    DataFrames são hasheados pelo conteúdo; demais valores pelo repr.
+    """
+    h = hashlib.sha1()
+    for obj in inputs:
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+            h.update(repr(list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name).encode())
+        elif isinstance(obj, np.ndarray):
+            h.update(obj.tobytes())
+        else:
+            h.update(repr(obj).encode())
+        h.update(b'|')
+    return h.hexdigest()
+
+def get_or_build(name, builder, *inputs, **params):
+    """
+    Retorna a figura do cache se as entradas não mudaram; senão constrói e armazena.
+    O cache é LRU e vive no processo (sobrevive aos reruns do Streamlit).
+    """
+    key = (name, fingerprint(*inputs, sorted(params.items())))
+    if key in _FIGURE_CACHE:
+        _FIGURE_CACHE.move_to_end(key)
+        return _FIGURE_CACHE[key]
+
+    fig = builder(*inputs, **params)
+    _FIGURE_CACHE[key] = fig
+    if len(_FIGURE_CACHE) > _FIGURE_CACHE_SIZE:
+        _FIGURE_CACHE.popitem(last=False)
+    return fig
+
+def clear_cache():
+    _FIGURE_CACHE.clear()
+
+def category_color(cat, categories):
+    # Cor estável entre processos (hash() de string é aleatorizado no Python)
+    if cat in CAT_COLOR_MAP:
+        return CAT_COLOR_MAP[cat]
+    default_colors = pc.qualitative.Plotly
+    return default_colors[sorted(categories).index(cat) % len(default_colors)]
+
+# --- Análise de Demanda ---
+def build_qty_day_figure(df_orders):
+    df_qty_day = df_orders.groupby('day')['quantity'].sum().reset_index(name='total_qty')
+    fig = px.line(df_qty_day, x='day', y='total_qty', markers=True,
+                  title="Total de Peças Movimentadas por Dia",
+                  labels={'day': 'Dia', 'total_qty': 'Qtd Peças'})
+    fig.update_traces(line_color='green')
+    return fig
+
+def build_orders_day_figure(df_orders):
+    df_demand_day = df_orders.groupby(['day', 'shipping_wave']).size().reset_index(name='count')
+    return px.bar(df_demand_day, x='day', y='count', color='shipping_wave',
+                  title="Volume de Pedidos Diário",
+                  labels={'day': 'Dia', 'count': 'Qtd Pedidos', 'shipping_wave': 'Turno'})
+
+def build_category_demand_figure(df_orders, df_skus):
+    df_orders_cat = df_orders.merge(df_skus[['sku_id', 'category']], on='sku_id', how='left')
+    df_cat_demand = df_orders_cat.groupby('category')['quantity'].sum().reset_index().sort_values('quantity', ascending=False)
+    fig = px.bar(df_cat_demand, x='quantity', y='category', orientation='h',
+                 title="Top Categorias (Qtd Itens)",
+                 labels={'quantity': 'Total Itens', 'category': 'Categoria'})
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+# --- Estado do Armazém ---
+def build_warehouse_state(df_layout, df_alloc, df_skus):
+    df_full = df_layout.merge(df_alloc[['bin_id', 'sku_id']], on='bin_id', how='left').merge(df_skus, on='sku_id', how='left')
+    if 'category' not in df_full.columns: df_full['category'] = df_full['description']
+    df_full['category'] = df_full['category'].fillna('Vazio')
+    return df_full
+
+def build_category_map_figure(df_full):
+    # Mapa 2D: várias posições Z caem no mesmo (X, Y); basta um marcador por (X, Y, Categoria)
+    df_2d = df_full.drop_duplicates(subset=['x', 'y', 'category'])
+    categories = list(df_2d['category'].unique())
+
+    fig = go.Figure()
+    for cat, df_cat in df_2d.groupby('category', sort=True):
+        fig.add_trace(go.Scatter(x=df_cat['x'], y=df_cat['y'], mode='markers',
+                                 marker=dict(size=15, color=category_color(cat, categories), symbol='square'),
+                                 text=df_cat['bin_id'] + "<br>" + df_cat['category'], name=cat))
+    fig.update_layout(
+        title="Mapa de Localização",
+        xaxis_title="Corredor (X)",
+        yaxis_title="Profundidade (Y)",
+        height=600,
+        plot_bgcolor='#f2f2f2', # Fundo cinza claro
+        xaxis=dict(showgrid=True, gridcolor='white'),
+        yaxis=dict(showgrid=True, gridcolor='white', scaleanchor="x", scaleratio=1) # Proporção real (Retangular)
+    )
+    return fig
+
+def build_zone_distribution_figure(df_alloc, df_skus, df_layout):
+    df_report = df_alloc.merge(df_skus[['sku_id', 'category', 'popularity_score']], on='sku_id', how='left').merge(df_layout[['bin_id', 'zone_class', 'distance_to_dock_meters']], on='bin_id', how='left')
+    if 'category' not in df_report.columns: df_report['category'] = 'Geral'
+    df_zone_dist = df_report.groupby(['category', 'zone_class']).size().reset_index(name='count')
+    return px.bar(df_zone_dist, x='category', y='count', color='zone_class', title="Distribuição de Produtos nas Zonas", barmode='stack')
+
+def downsample_layout(df_points, max_points=MAX_3D_POINTS, group_cols=('category',)):
+    """
+    Agrega posições em voxels (X, Y, Z) quando o layout excede max_points.
+    Cada voxel vira um único marcador com a contagem de posições agregadas.
+    """
+    group_cols = list(group_cols)
+    if len(df_points) <= max_points:
+        df_out = df_points.copy()
+        df_out['n_bins'] = 1
+        return df_out
+
+    # Aumentar o tamanho da célula até caber no orçamento de pontos
+    cell = 1.0
+    while True:
+        keys = pd.DataFrame({
+            'vx': np.floor(df_points['x'].to_numpy() / cell),
+            'vy': np.floor(df_points['y'].to_numpy() / cell),
+            'vz': np.floor(df_points['z'].to_numpy() / cell),
+        }, index=df_points.index)
+        for col in group_cols:
+            keys[col] = df_points[col]
+        n_voxels = len(keys.drop_duplicates())
+        if n_voxels <= max_points:
+            break
+        cell *= 2
+
+    df_work = pd.concat([df_points[['x', 'y', 'z', 'bin_id']], keys], axis=1)
+    df_out = df_work.groupby(['vx', 'vy', 'vz'] + group_cols, sort=False).agg(
+        x=('x', 'mean'), y=('y', 'mean'), z=('z', 'mean'),
+        bin_id=('bin_id', 'first'), n_bins=('bin_id', 'size')
+    ).reset_index()
+    df_out['bin_id'] = df_out['bin_id'] + " (+" + (df_out['n_bins'] - 1).astype(str) + ")"
+    return df_out
+
+def build_twin_3d_figure(df_full, max_points=MAX_3D_POINTS):
+    df_plot = downsample_layout(df_full, max_points=max_points)
+    categories = list(df_plot['category'].unique())
+
+    fig = go.Figure()
+    fig.add_trace(go.Mesh3d(x=[0, 30, 30, 0], y=[0, 0, 20, 20], z=[0, 0, 0, 0], color='lightgray', opacity=0.5, name='Piso'))
+
+    for cat, df_cat in df_plot.groupby('category', sort=True):
+        fig.add_trace(go.Scatter3d(x=df_cat['x'], y=df_cat['y'], z=df_cat['z'], mode='markers',
+                                   marker=dict(size=5, color=category_color(cat, categories), symbol='square', line=dict(width=1, color='DarkSlateGrey')),
+                                   name=cat, text=df_cat['bin_id']))
+
+    fig.add_trace(go.Scatter3d(x=[30]*3, y=[5, 10, 15], z=[0]*3, mode='text', text=['Doca 1', 'Doca 2', 'Doca 3'], textposition="top center", name='Docas'))
+    fig.add_trace(go.Scatter3d(x=[HUB_X], y=[HUB_Y], z=[0], mode='markers+text', marker=dict(size=10, color='gold', symbol='diamond'), text=['Staging (Hub)'], name='Staging'))
+    title = "Gêmeo Digital 3D" if len(df_plot) == len(df_full) else f"Gêmeo Digital 3D (LOD: {len(df_plot)} de {len(df_full)} posições)"
+    fig.update_layout(title=title, scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z', aspectmode='data'), height=700)
+    return fig
+
+# --- Rotas ---
+def route_segments(xs, ys, zs, origin=(HUB_X, HUB_Y, 0)):
+    """
+    Converte N destinos em um único traço de linhas Hub -> Bin separadas por None.
+    Um traço com 3N pontos substitui N traços independentes.
+    """
+    n = len(xs)
+    seg_x = np.empty(n * 3, dtype=object)
+    seg_y = np.empty(n * 3, dtype=object)
+    seg_z = np.empty(n * 3, dtype=object)
+    seg_x[0::3], seg_y[0::3], seg_z[0::3] = origin
+    seg_x[1::3], seg_y[1::3], seg_z[1::3] = xs, ys, zs
+    seg_x[2::3] = seg_y[2::3] = seg_z[2::3] = None
+    return seg_x.tolist(), seg_y.tolist(), seg_z.tolist()
+
+def build_routes_figure(df_orders, df_alloc, df_layout, day, max_orders=20, max_points=MAX_3D_POINTS):
+    sim_orders_day = df_orders[df_orders['day'] == day].head(max_orders) # Limite para clareza
+    moved_sku_ids = sim_orders_day['sku_id'].unique()
+
+    # Estado do armazém: Vazio / Estático / Movimentado
+    df_state = df_layout.merge(df_alloc[['bin_id', 'sku_id']], on='bin_id', how='left')
+    df_state['status'] = np.where(df_state['sku_id'].isna(), 'Vazio',
+                                  np.where(df_state['sku_id'].isin(moved_sku_ids), 'Movimentado', 'Estático'))
+    df_state = downsample_layout(df_state, max_points=max_points, group_cols=('status',))
+
+    fig = go.Figure()
+    styles = [
+        ('Vazio', 'Vazio', dict(size=3, color='lightgrey', opacity=0.3)),
+        ('Estático', 'Estático (Sem Interação)', dict(size=4, color='blue', opacity=0.5)),
+        ('Movimentado', 'Movimentado (Alvo)', dict(size=6, color='red', symbol='square')),
+    ]
+    for status, label, marker in styles:
+        df_s = df_state[df_state['status'] == status]
+        fig.add_trace(go.Scatter3d(x=df_s['x'], y=df_s['y'], z=df_s['z'], mode='markers', marker=marker, name=label))
+
+    fig.add_trace(go.Scatter3d(x=[HUB_X], y=[HUB_Y], z=[0], mode='markers', marker=dict(size=10, color='gold', symbol='diamond'), name='Hub (Staging)'))
+
+    # Todas as linhas Hub -> Bin em um único traço
+    sim_routes = sim_orders_day.merge(df_alloc[['sku_id', 'bin_id']], on='sku_id', how='left').merge(df_layout[['bin_id', 'x', 'y', 'z']], on='bin_id', how='left')
+    sim_routes = sim_routes.dropna(subset=['x'])
+    seg_x, seg_y, seg_z = route_segments(sim_routes['x'].to_numpy(), sim_routes['y'].to_numpy(), sim_routes['z'].to_numpy())
+    fig.add_trace(go.Scatter3d(x=seg_x, y=seg_y, z=seg_z, mode='lines',
+                               line=dict(color='red', width=3), opacity=0.7,
+                               showlegend=False, hoverinfo='none'))
+
+    fig.update_layout(
+        title=f"Simulação 3D: Rotas do Dia {day} (Hub-and-Spoke)",
+        scene=dict(xaxis_title='X', yaxis_title='Y', zaxis_title='Z', aspectmode='data'),
+        height=700,
+        legend=dict(x=0, y=1)
+    )
+    return fig
+
+# --- Mapa de Calor de Tráfego ---
+def compute_traffic_grid(end_xs, end_ys, max_x=30, max_y=20, start_x=HUB_X, start_y=HUB_Y):
+    """
+    Acumula o tráfego Hub -> Bin em uma grade (X, Y) com arrays de diferenças.
+    Trecho horizontal no Y do Hub, depois vertical no X do destino.
+    """
+    end_xs = np.asarray(end_xs, dtype=int)
+    end_ys = np.asarray(end_ys, dtype=int)
+
+    # Trecho horizontal (linha Y = start_y): [start, end) ou (end, start]
+    row_diff = np.zeros(max_x + 2)
+    lo = np.where(end_xs > start_x, start_x, end_xs + 1)
+    hi = np.where(end_xs > start_x, end_xs, start_x + 1)
+    valid = end_xs != start_x
+    np.add.at(row_diff, lo[valid], 1)
+    np.add.at(row_diff, hi[valid], -1)
+
+    # Trecho vertical (coluna X = end_x): [start_y, end) ou (end, start_y]
+    col_diff = np.zeros((max_x + 1, max_y + 2))
+    lo = np.where(end_ys > start_y, start_y, end_ys + 1)
+    hi = np.where(end_ys > start_y, end_ys, start_y + 1)
+    valid = end_ys != start_y
+    np.add.at(col_diff, (end_xs[valid], lo[valid]), 1)
+    np.add.at(col_diff, (end_xs[valid], hi[valid]), -1)
+
+    traffic_grid = np.cumsum(col_diff, axis=1)[:, :max_y + 1]
+    traffic_grid[:, start_y] += np.cumsum(row_diff)[:max_x + 1]
+    np.add.at(traffic_grid, (end_xs, end_ys), 1)
+    return traffic_grid
+
+def build_traffic_figure(df_kpis, df_orders, df_alloc, df_layout):
+    max_x, max_y = 30, 20
+
+    # Itens dos pedidos simulados -> coordenadas (X, Y)
+    simulated_order_ids = df_kpis['order_id'].unique()
+    df_sim_items = df_orders[df_orders['order_id'].isin(simulated_order_ids)]
+    df_traffic = df_sim_items.merge(df_alloc[['sku_id', 'bin_id']], on='sku_id', how='left').merge(df_layout[['bin_id', 'x', 'y']], on='bin_id', how='left')
+    df_traffic = df_traffic.dropna(subset=['x'])
+
+    traffic_grid = compute_traffic_grid(df_traffic['x'].to_numpy(), df_traffic['y'].to_numpy(), max_x=max_x, max_y=max_y)
+
+    custom_colorscale = [[0.0, 'rgba(0,0,0,0)'], [0.01, 'rgba(255, 200, 200, 0.5)'], [0.5, 'rgba(255, 0, 0, 0.8)'], [1.0, 'rgba(100, 0, 0, 1.0)']]
+    fig = go.Figure(data=go.Heatmap(z=traffic_grid.T, x=list(range(max_x + 1)), y=list(range(max_y + 1)), colorscale=custom_colorscale))
+
+    # Sobreposição do Layout do Armazém
+    shape_offset = 1.0
+    warehouse_shapes = []
+    for x in [10, 14, 18]: warehouse_shapes.append(dict(type="rect", x0=x-0.4+shape_offset, y0=0, x1=x+0.4+shape_offset, y1=20, line=dict(color="RoyalBlue", width=1), fillcolor="rgba(65, 105, 225, 0.05)"))
+    for x in [22, 24, 26]: warehouse_shapes.append(dict(type="rect", x0=x-0.4+shape_offset, y0=0, x1=x+0.4+shape_offset, y1=10, line=dict(color="Green", width=1), fillcolor="rgba(0, 128, 0, 0.05)"))
+    warehouse_shapes.append(dict(type="rect", x0=29.5+shape_offset, y0=0, x1=30.5+shape_offset, y1=20, line=dict(color="Black", width=1), fillcolor="rgba(0, 0, 0, 0.05)"))
+    warehouse_shapes.append(dict(type="circle", x0=27+shape_offset, y0=9, x1=29+shape_offset, y1=11, line=dict(color="Orange", width=2)))
+    for y in [0, 10, 20]: warehouse_shapes.append(dict(type="line", x0=0+shape_offset, y0=y, x1=30+shape_offset, y1=y, line=dict(color="Grey", width=1, dash="dot")))
+
+    fig.update_layout(title="Densidade de Tráfego", xaxis_title="X", yaxis_title="Y", height=600, shapes=warehouse_shapes, plot_bgcolor='#f2f2f2')
+    return fig
+
+# --- Log de Eventos (Replay / Utilização) ---
+def build_event_heatmap_figure(df_visits, max_x=30, max_y=20, value='busy_s'):
+    # Grade (X, Y) com as chegadas ou o tempo ocupado por posição, a partir de event_log_engine.bin_visits
+    grid = np.zeros((max_x + 1, max_y + 1))
+    np.add.at(grid, (df_visits['x'].to_numpy(dtype=int), df_visits['y'].to_numpy(dtype=int)), df_visits[value].to_numpy(dtype=float))
+    if value == 'busy_s':
+        grid /= 3600
+
+    label = "Tempo Ocupado (h)" if value == 'busy_s' else "Chegadas"
+    fig = go.Figure(data=go.Heatmap(z=grid.T, x=list(range(max_x + 1)), y=list(range(max_y + 1)), colorscale='YlOrRd', colorbar=dict(title=label)))
+    fig.add_trace(go.Scatter(x=[HUB_X], y=[HUB_Y], mode='markers', marker=dict(size=14, color='gold', symbol='diamond'), name='Hub (Staging)'))
+    fig.update_layout(title=f"Mapa de Calor por Posição ({label})", xaxis_title="X", yaxis_title="Y", height=500)
+    return fig
+
+def build_utilization_figure(df_util):
+    # Utilização (%) por empilhadeira e hora, a partir de event_log_engine.forklift_utilization
+    pivot = df_util.pivot_table(index='forklift_id', columns='bucket_start_h', values='utilization_pct', fill_value=0)
+    fig = go.Figure(data=go.Heatmap(z=pivot.to_numpy(), x=pivot.columns, y=[f"Empilhadeira {f}" for f in pivot.index],
+                                    colorscale='Blues', zmin=0, zmax=100, colorbar=dict(title="%")))
+    fig.update_layout(title="Utilização da Frota por Hora (Log de Eventos)", xaxis_title="Hora (desde o início do mês)", height=150 + 30 * len(pivot))
+    return fig
+
+def build_replay_figure(df_legs):
+    # Pernas de viagem de cada empilhadeira em um traço (segmentos separados por None), na ordem de tempo
+    fig = go.Figure()
+    for forklift_id, df_f in df_legs.groupby('forklift_id', sort=True):
+        n = len(df_f)
+        seg_x = np.empty(n * 3, dtype=object)
+        seg_y = np.empty(n * 3, dtype=object)
+        seg_x[0::3], seg_y[0::3] = df_f['from_x'].to_numpy(), df_f['from_y'].to_numpy()
+        seg_x[1::3], seg_y[1::3] = df_f['to_x'].to_numpy(), df_f['to_y'].to_numpy()
+        seg_x[2::3] = seg_y[2::3] = None
+        fig.add_trace(go.Scatter(x=seg_x.tolist(), y=seg_y.tolist(), mode='lines+markers', name=f"Empilhadeira {forklift_id}",
+                                 line=dict(width=2), marker=dict(size=5), opacity=0.7))
+
+    fig.add_trace(go.Scatter(x=[HUB_X], y=[HUB_Y], mode='markers', marker=dict(size=14, color='gold', symbol='diamond'), name='Hub (Staging)'))
+    fig.update_layout(title="Replay de Rotas (Log de Eventos)", xaxis_title="X", yaxis_title="Y", height=550, xaxis=dict(range=[-1, 31]), yaxis=dict(range=[-1, 21]))
+    return fig
@@ -0,0 +1,239 @@
+"""
+Armazenamento persistente de resultados (SQLite, sem dependências extras):
+parâmetros do cenário, alocação (SKU -> bin) e KPIs por pedido de cada execução,
+para comparar cenários ao longo do tempo em vez de sobrescrever data/kpis_simulacao.csv.
+
+Uso:
+    conn = results_engine.connect('data/resultados.sqlite')
+    scenario_id = results_engine.save_scenario(conn, params, df_alloc, df_kpis, source='app')
+    best, df_alloc = results_engine.best_allocation(conn, min_params={'demand_multiplier': 2})
+    df_diff = results_engine.allocation_diff(conn, scenario_a, scenario_b)
+"""
+import datetime
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DB_PATH = 'data/resultados.sqlite'
+
+# Parâmetros do cenário com coluna própria (indexada); os demais vão para params_json
+PARAM_COLUMNS = {
+    'num_orders': 'INTEGER',
+    'num_skus': 'INTEGER',
+    'demand_multiplier': 'REAL',
+    'forklift_speed': 'REAL',
+    'morning_weight': 'REAL',
+    'score_source': 'TEXT',
+    'travel_model': 'TEXT',
+    'sim_sample_size': 'INTEGER',
+    'num_forklifts': 'INTEGER',
+    'shift_hours': 'REAL',
+    'num_active_docks': 'INTEGER',
+    'opt_method': 'TEXT',
+    'opt_iterations': 'INTEGER',
+    'seed': 'INTEGER',
+}
+# Resumo dos KPIs por pedido, gravado junto do cenário para ordenar sem ler order_kpis
+SUMMARY_COLUMNS = {'orders_simulated': 'INTEGER', 'avg_dist_opt_m': 'REAL', 'avg_time_opt_s': 'REAL', 'total_time_opt_h': 'REAL'}
+KPI_COLUMNS = ['order_id', 'assigned_dock', 'shipping_wave', 'dist_opt_m', 'time_opt_s', 'dist_rnd_m', 'time_rnd_s']
+INDEXED_PARAMS = ['demand_multiplier', 'forklift_speed', 'num_forklifts', 'morning_weight', 'num_active_docks']
+
+def _schema():
+    param_defs = ',\n        '.join(f'{name} {sql_type}' for name, sql_type in PARAM_COLUMNS.items())
+    summary_defs = ',\n        '.join(f'{name} {sql_type}' for name, sql_type in SUMMARY_COLUMNS.items())
+    statements = [
+        f"""CREATE TABLE IF NOT EXISTS scenarios (
+        scenario_id INTEGER PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        label TEXT,
+        source TEXT,
+        {param_defs},
+        {summary_defs},
+        params_json TEXT
+        )""",
+        # Uma linha por posição (SKU x bin); slot 0 é a posição principal do SKU
+        """CREATE TABLE IF NOT EXISTS allocations (
+        scenario_id INTEGER NOT NULL REFERENCES scenarios(scenario_id) ON DELETE CASCADE,
+        sku_id TEXT NOT NULL,
+        slot INTEGER NOT NULL,
+        bin_id TEXT NOT NULL,
+        PRIMARY KEY (scenario_id, sku_id, slot)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS order_kpis (
+        scenario_id INTEGER NOT NULL REFERENCES scenarios(scenario_id) ON DELETE CASCADE,
+        order_id TEXT NOT NULL,
+        assigned_dock TEXT,
+        shipping_wave TEXT,
+        dist_opt_m REAL,
+        time_opt_s REAL,
+        dist_rnd_m REAL,
+        time_rnd_s REAL
+        )""",
+        # Só scenario_id no índice: as inserções em lote viram append no fim da árvore (sem chave por pedido)
+        'CREATE INDEX IF NOT EXISTS idx_order_kpis_scenario ON order_kpis(scenario_id)',
+        'CREATE INDEX IF NOT EXISTS idx_scenarios_created ON scenarios(created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_allocations_bin ON allocations(scenario_id, bin_id)',
+    ]
+    # Índice composto (parâmetro, tempo médio): filtros de faixa como demand_multiplier >= 2 leem só o trecho do índice
+    statements += [f'CREATE INDEX IF NOT EXISTS idx_scenarios_{name} ON scenarios({name}, avg_time_opt_s)' for name in INDEXED_PARAMS]
+    return statements
+
+def connect(path=DEFAULT_DB_PATH):
+    """
+    Abre (e cria, se preciso) o banco de resultados. WAL permite ler no app enquanto
+    um lote do pipeline grava.
+    """
+    if path != ':memory:':
+        out_dir = os.path.dirname(path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    with conn:
+        for statement in _schema():
+            conn.execute(statement)
+        # Bancos criados antes de um parâmetro novo: acrescenta as colunas que faltam (ficam NULL nos cenários antigos)
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(scenarios)')}
+        for name, sql_type in PARAM_COLUMNS.items():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE scenarios ADD COLUMN {name} {sql_type}')
+    return conn
+
+def _py(value):
+    # Escalares NumPy -> tipos nativos (sqlite3 não aceita np.float64/np.int64)
+    return value.item() if isinstance(value, np.generic) else value
+
+def _allocation_rows(scenario_id, df_alloc):
+    # slot = ordem da posição dentro do SKU (a primeira linha é a principal, como no run_slotting_strategy)
+    slot = df_alloc.groupby('sku_id', sort=False).cumcount().to_numpy()
+    return zip([scenario_id] * len(df_alloc), df_alloc['sku_id'].astype(str).tolist(), slot.tolist(), df_alloc['bin_id'].astype(str).tolist())
+
+def _kpi_rows(scenario_id, df_kpis):
+    columns = [df_kpis[c].tolist() if c in df_kpis.columns else [None] * len(df_kpis) for c in KPI_COLUMNS]
+    columns[0] = df_kpis['order_id'].astype(str).tolist()
+    return zip([scenario_id] * len(df_kpis), *columns)
+
+def save_scenario(conn, params, df_alloc=None, df_kpis=None, label=None, source=None):
+    """
+    Grava um cenário (parâmetros + alocação + KPIs por pedido) numa única transação,
+    com inserções em lote (executemany). Retorna o scenario_id.
+    """
+    params = {k: _py(v) for k, v in params.items()}
+    extra = {k: v for k, v in params.items() if k not in PARAM_COLUMNS}
+
+    summary = dict.fromkeys(SUMMARY_COLUMNS)
+    if df_kpis is not None and not df_kpis.empty:
+        # Amostra adaptativa (coluna 'weight' = N_h / n_h): médias ponderadas e total estimado da
+        # população, iguais à estimativa estratificada; sem pesos, cada pedido vale 1
+        weight = df_kpis['weight'].to_numpy(dtype=float) if 'weight' in df_kpis.columns else np.ones(len(df_kpis))
+        summary.update({
+            'orders_simulated': len(df_kpis),
+            'avg_dist_opt_m': float(np.average(df_kpis['dist_opt_m'], weights=weight)),
+            'avg_time_opt_s': float(np.average(df_kpis['time_opt_s'], weights=weight)),
+            'total_time_opt_h': float((df_kpis['time_opt_s'].to_numpy() * weight).sum() / 3600),
+        })
+
+    columns = ['created_at', 'label', 'source', *PARAM_COLUMNS, *SUMMARY_COLUMNS, 'params_json']
+    values = [datetime.datetime.now().isoformat(timespec='seconds'), label, source,
+              *(params.get(k) for k in PARAM_COLUMNS), *summary.values(), json.dumps(extra, default=str)]
+
+    with conn:
+        cursor = conn.execute(f"INSERT INTO scenarios ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+        scenario_id = cursor.lastrowid
+        if df_alloc is not None:
+            conn.executemany('INSERT INTO allocations VALUES (?, ?, ?, ?)', _allocation_rows(scenario_id, df_alloc))
+        if df_kpis is not None:
+            conn.executemany(f"INSERT INTO order_kpis VALUES ({', '.join('?' * (len(KPI_COLUMNS) + 1))})", _kpi_rows(scenario_id, df_kpis))
+    return scenario_id
+
+def _where(equals=None, min_params=None, max_params=None):
+    # Filtros só sobre colunas conhecidas (os nomes entram no SQL; os valores vão como parâmetros)
+    clauses, args = [], []
+    for op, filters in (('=', equals), ('>=', min_params), ('<=', max_params)):
+        for name, value in (filters or {}).items():
+            if name not in PARAM_COLUMNS and name not in SUMMARY_COLUMNS and name not in ('source', 'label'):
+                raise ValueError(f"Filtro desconhecido: {name}")
+            clauses.append(f'{name} {op} ?')
+            args.append(_py(value))
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), args
+
+def list_scenarios(conn, equals=None, min_params=None, max_params=None, limit=None):
+    """
+    Cenários gravados (mais recentes primeiro), com filtros de igualdade e de faixa, ex.:
+    list_scenarios(conn, min_params={'demand_multiplier': 2}, equals={'num_forklifts': 5}).
+    """
+    where, args = _where(equals, min_params, max_params)
+    sql = f'SELECT * FROM scenarios{where} ORDER BY scenario_id DESC'
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    return pd.read_sql_query(sql, conn, params=args)
+
+def best_scenario(conn, metric='avg_time_opt_s', equals=None, min_params=None, max_params=None):
+    # Cenário com o menor valor da métrica (entre os que têm alocação gravada); None se nada casar
+    if metric not in SUMMARY_COLUMNS:
+        raise ValueError(f"Métrica desconhecida: {metric} (use {list(SUMMARY_COLUMNS)})")
+    where, args = _where(equals, min_params, max_params)
+    where += (' AND ' if where else ' WHERE ') + f'{metric} IS NOT NULL AND EXISTS (SELECT 1 FROM allocations a WHERE a.scenario_id = scenarios.scenario_id)'
+    df = pd.read_sql_query(f'SELECT * FROM scenarios{where} ORDER BY {metric} ASC, scenario_id DESC LIMIT 1', conn, params=args)
+    return None if df.empty else df.iloc[0].to_dict()
+
+def load_allocation(conn, scenario_id):
+    # Alocação no formato do run_slotting_strategy (sku_id, bin_id), posição principal primeiro
+    return pd.read_sql_query('SELECT sku_id, bin_id FROM allocations WHERE scenario_id = ? ORDER BY sku_id, slot',
+                             conn, params=[int(scenario_id)])
+
+def load_kpis(conn, scenario_id):
+    return pd.read_sql_query(f"SELECT {', '.join(KPI_COLUMNS)} FROM order_kpis WHERE scenario_id = ?", conn, params=[int(scenario_id)])
+
+def best_allocation(conn, metric='avg_time_opt_s', equals=None, min_params=None, max_params=None):
+    """
+    Melhor alocação gravada para um filtro de parâmetros, ex.: demand_multiplier >= 2:
+    best_allocation(conn, min_params={'demand_multiplier': 2}).
+    Retorna (linha do cenário, alocação) ou (None, None).
+    """
+    best = best_scenario(conn, metric, equals, min_params, max_params)
+    if best is None:
+        return None, None
+    return best, load_allocation(conn, best['scenario_id'])
+
+def allocation_diff(conn, scenario_a, scenario_b):
+    """
+    Diferença entre as alocações de dois cenários, posição a posição (SKU x slot), resolvida no SQL:
+    status 'moved' (mudou de bin), 'added' (só em B) ou 'removed' (só em A). Posições iguais não aparecem.
+    """
+    sql = """
+    SELECT a.sku_id, a.slot, a.bin_id AS bin_a, b.bin_id AS bin_b
+    FROM allocations a
+    LEFT JOIN allocations b ON b.scenario_id = :b AND b.sku_id = a.sku_id AND b.slot = a.slot
+    WHERE a.scenario_id = :a AND (b.bin_id IS NULL OR b.bin_id <> a.bin_id)
+    UNION ALL
+    SELECT b.sku_id, b.slot, NULL AS bin_a, b.bin_id AS bin_b
+    FROM allocations b
+    LEFT JOIN allocations a ON a.scenario_id = :a AND a.sku_id = b.sku_id AND a.slot = b.slot
+    WHERE b.scenario_id = :b AND a.sku_id IS NULL
+    ORDER BY 1, 2
+    """
+    df_diff = pd.read_sql_query(sql, conn, params={'a': int(scenario_a), 'b': int(scenario_b)})
+    df_diff['status'] = np.select([df_diff['bin_a'].isna(), df_diff['bin_b'].isna()], ['added', 'removed'], default='moved')
+    return df_diff
+
+def compare_scenarios(conn, scenario_ids):
+    """
+    KPIs por pedido lado a lado (pedidos em comum) e resumo por cenário, ex.: baseline vs otimizado.
+    """
+    ids = [int(s) for s in scenario_ids]
+    placeholders = ', '.join('?' * len(ids))
+    df = pd.read_sql_query(f'SELECT scenario_id, order_id, time_opt_s FROM order_kpis WHERE scenario_id IN ({placeholders})', conn, params=ids)
+    df_wide = df.pivot(index='order_id', columns='scenario_id', values='time_opt_s').dropna()
+    summary = pd.read_sql_query(f"SELECT scenario_id, created_at, label, source, {', '.join(SUMMARY_COLUMNS)} FROM scenarios WHERE scenario_id IN ({placeholders})",
+                                conn, params=ids)
+    return df_wide, summary
+
+def delete_scenario(conn, scenario_id):
+    with conn:
+        conn.execute('DELETE FROM scenarios WHERE scenario_id = ?', [int(scenario_id)])
@@ -0,0 +1,130 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from src import simulation_engine
+
+# Classes de tamanho do pedido (nº de linhas): 1-2, 3-5, 6-9, 10+
+SIZE_BINS = [0, 2, 5, 9, np.inf]
+DEFAULT_STRATA = ['week', 'shipping_wave', 'size_class']
+
+def order_strata(df_orders, strata=DEFAULT_STRATA):
+    """
+    Uma linha por pedido com as variáveis de estratificação:
+    semana (dias agrupados de 7 em 7), onda e classe de tamanho (nº de linhas).
+    """
+    df_ord = df_orders.groupby('order_id', sort=False).agg(
+        day=('day', 'first'),
+        shipping_wave=('shipping_wave', 'first'),
+        n_lines=('sku_id', 'size'),
+    ).reset_index()
+    df_ord['week'] = (df_ord['day'] - 1) // 7
+    df_ord['size_class'] = pd.cut(df_ord['n_lines'], bins=SIZE_BINS, labels=False)
+    df_ord['stratum'] = df_ord.groupby(list(strata), sort=True).ngroup()
+    return df_ord
+
+def stratified_order_sample(df_orders, n, strata=DEFAULT_STRATA, seed=42):
+    """
+    Amostra n pedidos distintos com estratificação implícita: ordena os pedidos por estrato
+    (aleatório dentro do estrato) e toma um a cada N/n com início aleatório.
+    Cada estrato recebe uma fatia proporcional ao seu tamanho, para qualquer n.
+    """
+    rng = np.random.default_rng(seed)
+    df_ord = order_strata(df_orders, strata)
+    n_total = len(df_ord)
+    if n >= n_total:
+        return df_ord['order_id'].to_numpy()
+
+    df_ord['_rand'] = rng.random(n_total)
+    order_ids = df_ord.sort_values(['stratum', '_rand'])['order_id'].to_numpy()
+
+    step = n_total / n
+    idx = np.floor(rng.uniform(0, step) + step * np.arange(n)).astype(int)
+    return order_ids[idx]
+
+def _stratified_estimate(values, stratum, n_by_stratum, N_by_stratum):
+    # Estimador do total estratificado e sua variância (com correção de população finita)
+    df_v = pd.DataFrame({'v': values, 'stratum': stratum})
+    stats = df_v.groupby('stratum')['v'].agg(['mean', 'var']).reindex(N_by_stratum.index)
+    stats['var'] = stats['var'].fillna(0.0)
+    n_h = n_by_stratum.reindex(N_by_stratum.index).to_numpy(dtype=float)
+    N_h = N_by_stratum.to_numpy(dtype=float)
+
+    total = (N_h * stats['mean'].to_numpy()).sum()
+    variance = (N_h ** 2 * (1 - n_h / N_h) * stats['var'].to_numpy() / n_h).sum()
+    return total, variance
+
+def _sampled_counts(sampled, N_by_stratum):
+    # Quantos pedidos de cada estrato já foram simulados nas rodadas anteriores
+    if not sampled:
+        return pd.Series(0, index=N_by_stratum.index)
+    counts = pd.concat(sampled)['stratum'].value_counts()
+    return counts.reindex(N_by_stratum.index, fill_value=0)
+
+def run_approximate_simulation(df_orders, df_alloc, df_layout, forklift_speed=1.5, rel_error=0.02, confidence=0.95,
+                               initial_fraction=0.01, growth=1.5, strata=DEFAULT_STRATA, seed=42, travel_model='linear', df_skus=None):
+    """
+    Simulação aproximada por amostragem estratificada (semana x onda x tamanho do pedido).
+    Começa com initial_fraction dos pedidos de cada estrato (mín. 2) e aumenta a amostra
+    até que o intervalo de confiança do tempo total fique dentro de rel_error.
+    Só os pedidos novos de cada rodada são simulados.
+    travel_model e df_skus seguem para o run_simulation (modelo cinemático pelo peso do palete).
+
+    Retorna (df_kpis da amostra com coluna 'weight', estimativas com IC).
+    """
+    rng = np.random.default_rng(seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    df_ord = order_strata(df_orders, strata)
+    df_ord['_rand'] = rng.random(len(df_ord))
+    df_ord = df_ord.sort_values(['stratum', '_rand']).reset_index(drop=True)
+    df_ord['rank_in_stratum'] = df_ord.groupby('stratum').cumcount()
+    N_by_stratum = df_ord.groupby('stratum').size()
+    n_total = len(df_ord)
+
+    df_lines = df_orders.merge(df_ord[['order_id', 'stratum']], on='order_id', how='inner')
+    sampled = []
+    fraction = initial_fraction
+
+    while True:
+        # Tamanho-alvo por estrato (proporcional, mínimo 2 para estimar variância)
+        n_target = np.minimum(N_by_stratum, np.maximum(2, np.ceil(fraction * N_by_stratum))).astype(int)
+        df_new = df_ord[(df_ord['rank_in_stratum'] < df_ord['stratum'].map(n_target)) &
+                        (df_ord['rank_in_stratum'] >= df_ord['stratum'].map(_sampled_counts(sampled, N_by_stratum)))]
+        fraction *= growth
+        if df_new.empty:
+            continue # Fração ainda não rende pedidos novos em nenhum estrato
+
+        df_kpis_new = simulation_engine.run_simulation(
+            df_lines[df_lines['order_id'].isin(df_new['order_id'])], df_alloc, df_layout,
+            num_orders_to_sim=len(df_new), forklift_speed=forklift_speed, travel_model=travel_model, df_skus=df_skus
+        )
+        sampled.append(df_kpis_new.merge(df_new[['order_id', 'stratum']], on='order_id', how='left'))
+
+        df_sample = pd.concat(sampled, ignore_index=True)
+        n_by_stratum = df_sample.groupby('stratum').size()
+        total_time, var_time = _stratified_estimate(df_sample['time_opt_s'].to_numpy(), df_sample['stratum'].to_numpy(), n_by_stratum, N_by_stratum)
+        half_width = z * np.sqrt(var_time)
+
+        if len(df_sample) >= n_total or (total_time > 0 and half_width / total_time <= rel_error):
+            break
+
+    total_dist, var_dist = _stratified_estimate(df_sample['dist_opt_m'].to_numpy(), df_sample['stratum'].to_numpy(), n_by_stratum, N_by_stratum)
+    half_dist = z * np.sqrt(var_dist)
+    df_sample['weight'] = df_sample['stratum'].map(N_by_stratum / n_by_stratum)
+
+    estimates = {
+        'orders_total': n_total,
+        'orders_sampled': len(df_sample),
+        'sample_fraction': len(df_sample) / n_total,
+        'confidence': confidence,
+        'total_time_h': total_time / 3600,
+        'total_time_h_ci': ((total_time - half_width) / 3600, (total_time + half_width) / 3600),
+        'avg_time_opt_s': total_time / n_total,
+        'avg_time_opt_s_ci': ((total_time - half_width) / n_total, (total_time + half_width) / n_total),
+        'avg_dist_opt_m': total_dist / n_total,
+        'avg_dist_opt_m_ci': ((total_dist - half_dist) / n_total, (total_dist + half_dist) / n_total),
+        'rel_error': half_width / total_time if total_time > 0 else 0.0,
+    }
+    return df_sample.drop(columns='stratum'), estimates
@@ -0,0 +1,144 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from src import slotting_engine, simulation_engine, sampling_engine
+
+SWEEP_PARAMS = ['morning_weight', 'forklift_speed', 'demand_multiplier', 'num_forklifts']
+
+def prepare_sweep_base(df_orders, df_alloc, df_layout, num_orders_to_sim=None):
+    """
+    Calcula uma única vez os intermediários que não dependem dos parâmetros de operação.
+    O tempo de cada pedido se decompõe em:
+        time = (D_normal + D_bronze / 0.8) / speed + lift + 1.5 * qty * mult + 10 * n_lines
+    """
+    if num_orders_to_sim is None:
+        df_sim = df_orders
+    else:
+        sim_orders = sampling_engine.stratified_order_sample(df_orders, num_orders_to_sim)
+        df_sim = df_orders[df_orders['order_id'].isin(sim_orders)]
+
+    df_metrics = simulation_engine.compute_line_metrics(df_sim, df_alloc, df_layout)
+    dist_total = df_metrics['dist_leg_m'].to_numpy() * 4
+    is_bronze = df_metrics['is_bronze'].to_numpy(dtype=bool)
+
+    df_metrics['dist_normal'] = np.where(is_bronze, 0.0, dist_total)
+    df_metrics['dist_bronze'] = np.where(is_bronze, dist_total, 0.0)
+    per_order = df_metrics.groupby('order_id').agg(
+        dist_normal=('dist_normal', 'sum'),
+        dist_bronze=('dist_bronze', 'sum'),
+        lift_s=('time_lift_s', 'sum'),
+        qty=('quantity', 'sum'),
+        n_lines=('quantity', 'size'),
+    )
+    # Pedidos sem nenhuma linha alocada contam como tempo zero (igual ao run_simulation)
+    all_orders = df_sim['order_id'].unique()
+    per_order = per_order.reindex(all_orders, fill_value=0)
+
+    n = len(per_order)
+    # Médias por pedido: o tempo médio é linear em 1/speed e em mult
+    return {
+        'travel_coef': (per_order['dist_normal'].sum() + per_order['dist_bronze'].sum() / simulation_engine.BRONZE_SPEED_FACTOR) / n,
+        'lift_s': per_order['lift_s'].sum() / n,
+        'picking_var_s': 1.5 * per_order['qty'].sum() / n,
+        'picking_fixed_s': 10 * per_order['n_lines'].sum() / n,
+        'dist_m': (per_order['dist_normal'].sum() + per_order['dist_bronze'].sum()) / n,
+        # Mesma base de carga diária usada em calculate_fleet_sizing
+        'daily_units': df_orders.groupby('day').size().to_numpy(dtype=float),
+    }
+
+def evaluate_grid(base, forklift_speeds, demand_multipliers, num_forklifts, shift_hours=16.0):
+    """
+    Avalia a grade (speed x mult x forklifts) com broadcast NumPy sobre os intermediários.
+    O multiplicador de demanda é relativo ao backlog atual (reescala as quantidades).
+    Retorna arrays com shape (n_speed, n_mult, n_forklifts).
+    """
+    speed = np.asarray(forklift_speeds, dtype=float)[:, None, None]
+    mult = np.asarray(demand_multipliers, dtype=float)[None, :, None]
+    fleet = np.asarray(num_forklifts, dtype=float)[None, None, :]
+
+    avg_time = base['travel_coef'] / speed + base['lift_s'] + base['picking_var_s'] * mult + base['picking_fixed_s']
+    avg_time = np.broadcast_to(avg_time, (speed.shape[0], mult.shape[1], fleet.shape[2]))
+
+    # Utilização diária: (n, m, f, dias)
+    workload_h = base['daily_units'] * avg_time[..., None] / 3600
+    utilization = workload_h / (fleet[..., None] * shift_hours) * 100
+
+    return {
+        'avg_time_opt_s': avg_time,
+        'avg_utilization': utilization.mean(axis=-1),
+        'max_utilization': utilization.max(axis=-1),
+        'overload_days': (utilization > 100).sum(axis=-1),
+        'suggested_fleet': np.ceil(workload_h.max(axis=-1) / shift_hours),
+    }
+
+def run_sensitivity_sweep(df_skus, df_orders, df_layout, forklift_speeds, demand_multipliers, num_forklifts,
+                          morning_weights=(1.5,), shift_hours=16.0, num_orders_to_sim=None):
+    """
+    Varre a grade completa de parâmetros. O slotting (que depende do peso da manhã) é refeito
+    uma vez por valor distinto; velocidade, demanda e frota são apenas reescalas e
+    são avaliadas por broadcast. Retorna uma tabela longa (uma linha por ponto da grade).
+    """
+    frames = []
+    for weight in morning_weights:
+        df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout, wave_weight_morning=weight)
+        base = prepare_sweep_base(df_orders, df_alloc, df_layout, num_orders_to_sim=num_orders_to_sim)
+        kpis = evaluate_grid(base, forklift_speeds, demand_multipliers, num_forklifts, shift_hours=shift_hours)
+
+        grid = np.array(list(itertools.product(forklift_speeds, demand_multipliers, num_forklifts)), dtype=float)
+        df_w = pd.DataFrame(grid, columns=['forklift_speed', 'demand_multiplier', 'num_forklifts'])
+        df_w.insert(0, 'morning_weight', weight)
+        df_w['num_forklifts'] = df_w['num_forklifts'].astype(int)
+        for name, values in kpis.items():
+            df_w[name] = values.reshape(-1)
+        frames.append(df_w)
+
+    return pd.concat(frames, ignore_index=True)
+
+def _nearest_value(values, target):
+    values = np.unique(values)
+    return values[np.abs(values - target).argmin()]
+
+def heat_table(df_sweep, index='forklift_speed', columns='num_forklifts', kpi='max_utilization', fixed=None):
+    """
+    Tabela de calor (pivot) de um KPI sobre dois parâmetros.
+    Os demais parâmetros são fixados em `fixed` (ou no valor da grade mais próximo da mediana).
+    """
+    fixed = dict(fixed or {})
+    df_view = df_sweep
+    for param in SWEEP_PARAMS:
+        if param in (index, columns):
+            continue
+        target = fixed.get(param, df_sweep[param].median())
+        df_view = df_view[df_view[param] == _nearest_value(df_sweep[param], target)]
+    return df_view.pivot_table(index=index, columns=columns, values=kpi)
+
+def tornado_table(df_sweep, base, kpi='avg_time_opt_s'):
+    """
+    Tabela Tornado: para cada parâmetro, varia do menor ao maior valor da grade
+    mantendo os outros no cenário base. Ordenada pela amplitude (swing) do KPI.
+    """
+    base_point = {p: _nearest_value(df_sweep[p], base[p]) for p in SWEEP_PARAMS}
+
+    mask_base = np.logical_and.reduce([df_sweep[p] == base_point[p] for p in SWEEP_PARAMS])
+    base_kpi = df_sweep.loc[mask_base, kpi].iloc[0]
+
+    rows = []
+    for param in SWEEP_PARAMS:
+        others = [p for p in SWEEP_PARAMS if p != param]
+        mask = np.logical_and.reduce([df_sweep[p] == base_point[p] for p in others])
+        df_line = df_sweep[mask].sort_values(param)
+        low, high = df_line.iloc[0], df_line.iloc[-1]
+        rows.append({
+            'parameter': param,
+            'low_value': low[param],
+            'high_value': high[param],
+            'kpi_low': low[kpi],
+            'kpi_high': high[kpi],
+            'delta_low': low[kpi] - base_kpi,
+            'delta_high': high[kpi] - base_kpi,
+            'swing': abs(high[kpi] - low[kpi]),
+        })
+
+    return pd.DataFrame(rows).sort_values('swing', ascending=False).reset_index(drop=True)
@@ -1,7 +1,22 @@
+import heapq
+from collections import deque
+
 import pandas as pd
 import numpy as np
 
-def calculate_manhattan_dist(p1, p2, cross_aisles_y=[0, 10, 20]):
+from src import jit_engine
+
+# Configurações da Simulação
+STAGING_X = 28
+STAGING_Y = 10
+STAGING_CAPACITY = 10
+CROSS_AISLES_Y = [0, 10, 20]
+BRONZE_SPEED_FACTOR = 0.8
+# Modelos de tempo de deslocamento do run_simulation (kinematic: ver kinematics_engine)
+TRAVEL_MODELS = ['linear', 'kinematic']
+SHIPPING_WAVES = ['Morning', 'Afternoon'] # Ordem de liberação das ondas dentro do turno
+
+def calculate_manhattan_dist(p1, p2, cross_aisles_y=CROSS_AISLES_Y):
     # Distância Manhattan com restrição de Cross Aisle
     # Se mudar de corredor (X diferente) e Y não for Cross Aisle, tem que ir até o Cross Aisle mais próximo
     
@@ -34,7 +49,7 @@ def evaluate_layout_cost(df_orders, allocation_map, layout_dict):
     Usado pelo algoritmo de otimização (Hill Climbing).
     """
     total_cost = 0
-    hub_node = {'x': 28, 'y': 10} # Staging Area
+    hub_node = {'x': STAGING_X, 'y': STAGING_Y} # Staging Area
     
     # Pré-calcular custos de acesso para cada SKU (se possível)
     # Mas como depende do pedido, vamos iterar
@@ -71,96 +86,344 @@ def evaluate_layout_cost(df_orders, allocation_map, layout_dict):
         
     return total_cost
 
-def run_simulation(df_orders, df_alloc, df_layout, num_orders_to_sim=50, forklift_speed=1.5, num_active_docks=1):
-    # Configurações da Simulação
-    STAGING_X = 28
-    STAGING_Y = 10
-    STAGING_CAPACITY = 10
-    
-    # Preparar dados
-    layout_dict = df_layout.set_index('bin_id').to_dict('index')
-    
-    # Filtrar pedidos para simular
-    sim_orders = df_orders['order_id'].unique()[:num_orders_to_sim]
-    
-    results = []
-    
-    for order_id in sim_orders:
-        order_items = df_orders[df_orders['order_id'] == order_id]
-        
-        total_dist_m = 0
-        total_time_s = 0
-        
-        # Ponto Central (Staging / Picking Area)
-        hub_node = {'x': STAGING_X, 'y': STAGING_Y, 'z': 0}
-        
-        current_staging_load = 0
-        
-        for _, row in order_items.iterrows():
-            sku_id = row['sku_id']
-            qty = row['quantity']
-            
-            # Buscar localização
-            alloc = df_alloc[df_alloc['sku_id'] == sku_id]
-            if alloc.empty:
-                continue # SKU sem posição (erro de alocação)
-                
-            bin_id = alloc.iloc[0]['bin_id']
-            if bin_id not in layout_dict:
-                continue
-                
-            target_node = layout_dict[bin_id]
-            
-            # --- 1. Movimentação (Ida e Volta da Paleteira) ---
-            # A paleteira busca o palete e traz para o Picking (Fetch)
-            # Depois leva o palete de volta (Return)
-            # Total: 4 pernas de viagem (Hub -> Bin, Bin -> Hub, Hub -> Bin, Bin -> Hub)
-            # *Nota: O usuário pediu "deixa na area... e depois devolve".
-            
-            dist_leg = calculate_manhattan_dist(hub_node, target_node)
-            
-            # Distância Total = 4 pernas (Busca + Devolução)
-            dist_sku_total = dist_leg * 4
-            total_dist_m += dist_sku_total
-            
-            # Tempo de Deslocamento
-            # Penalidade de velocidade na Zona B (Manual) se aplicável
-            speed = forklift_speed
-            if target_node.get('zone_class') == 'Bronze': # Exemplo de penalidade
-                speed *= 0.8
-            
-            time_travel = dist_sku_total / speed
-            
-            # Tempo de Elevação (Lift/Drop) - 4 operações (Pegar, Largar, Pegar, Largar)
-            # Penalidade por altura (Z)
-            lift_penalty = (target_node['z'] - 1) * 5 # 5s por nível acima do chão
-            time_lift = (15 + lift_penalty) * 4 # 15s base por operação
-            
-            # --- 2. Tempo de Picking (Manual no Staging) ---
-            # Proporcional a Qtd, Peso e Volume
-            # Recuperar dados do SKU (peso, etc) se disponível, senão usar heurística
-            # Aqui usamos heurística simples baseada na Qtd
-            
-            # Fatores (Simulados)
-            picking_time = (qty * 1.5) + 10 # 1.5s por item + 10s setup
-            
-            total_time_s += time_travel + time_lift + picking_time
-            
-            # Simulação de Capacidade do Staging (Lógica Simplificada)
-            current_staging_load += 1
-            if current_staging_load >= STAGING_CAPACITY:
-                # Se encheu, "forçamos" a devolução (já contabilizada no tempo total acima)
-                # Na prática, libera espaço
-                current_staging_load = 0
-        
-        results.append({
-            'order_id': order_id,
-            'assigned_dock': 'STAGING', # Agora tudo passa pelo Staging
-            'dist_rnd_m': total_dist_m * 1.2, # Comparativo (sem otimização seria pior)
-            'dist_opt_m': total_dist_m,
-            'time_rnd_s': total_time_s * 1.2,
-            'time_opt_s': total_time_s,
-            'shipping_wave': order_items.iloc[0]['shipping_wave']
-        })
-        
-    return pd.DataFrame(results)
+def manhattan_dist_array(x1, y1, x2, y2, cross_aisles_y=CROSS_AISLES_Y):
+    """
+    Versão vetorizada de calculate_manhattan_dist (arrays NumPy de mesma forma).
+    """
+    x1, y1, x2, y2 = (np.asarray(v, dtype=float) for v in (x1, y1, x2, y2))
+    dx = np.abs(x1 - x2)
+    dy = np.abs(y1 - y2)
+
+    # Melhor Cross Aisle para mudar de corredor
+    cas = np.asarray(cross_aisles_y, dtype=float).reshape((-1,) + (1,) * dx.ndim)
+    via_ca = (np.abs(y1 - cas) + dx + np.abs(y2 - cas)).min(axis=0)
+
+    same_ca = np.isin(y1, cross_aisles_y) & (y1 == y2)
+    return np.where(dx == 0, dy, np.where(same_ca, dx + dy, via_ca))
+
+def build_sku_bin_index(df_alloc, df_layout, engine='numpy'):
+    """
+    Índice SKU -> bins em formato CSR: os bins de cada SKU ficam contíguos em `bin_rows`
+    (linhas de df_layout), ordenados do mais próximo ao mais distante do Staging
+    (distância de uma perna, depois nível z). Os bins do SKU sku_ids[k] são
+    bin_rows[offsets[k]:offsets[k + 1]]; o primeiro é o bin de coleta.
+    """
+    layout_rows = pd.Series(np.arange(len(df_layout)), index=df_layout['bin_id'].to_numpy())
+    alloc = df_alloc[['sku_id', 'bin_id']].copy()
+    alloc['row'] = alloc['bin_id'].map(layout_rows)
+    alloc = alloc.dropna(subset=['row'])
+    rows = alloc['row'].to_numpy(dtype=np.int64)
+
+    dist_leg = jit_engine.manhattan_dist(STAGING_X, STAGING_Y, df_layout['x'].to_numpy()[rows], df_layout['y'].to_numpy()[rows], CROSS_AISLES_Y, engine=engine)
+    z = df_layout['z'].to_numpy()[rows]
+    sku_codes, sku_ids = pd.factorize(alloc['sku_id'], sort=True)
+
+    # Ordena por SKU e, dentro do SKU, por distância e nível (lexsort: última chave é a principal)
+    order = np.lexsort((z, dist_leg, sku_codes))
+    counts = np.bincount(sku_codes, minlength=len(sku_ids))
+    return {
+        'sku_ids': np.asarray(sku_ids),
+        'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'bin_rows': rows[order],
+        'dist_leg_m': np.asarray(dist_leg)[order],
+    }
+
+def nearest_bins(sku_index, sku_ids):
+    """
+    Linha de df_layout do bin mais próximo de cada SKU pedido (-1 se o SKU não tem posição).
+    """
+    rows = np.full(len(sku_ids), -1, dtype=np.int64)
+    if len(sku_index['sku_ids']) == 0:
+        return rows
+    pos = np.minimum(np.searchsorted(sku_index['sku_ids'], sku_ids), len(sku_index['sku_ids']) - 1)
+    found = sku_index['sku_ids'][pos] == sku_ids
+    rows[found] = sku_index['bin_rows'][sku_index['offsets'][pos[found]]]
+    return rows
+
+def compute_line_metrics(df_lines, df_alloc, df_layout, engine='numpy'):
+    """
+    Calcula, de forma vetorizada, as grandezas de cada linha de pedido que não dependem
+    dos parâmetros de operação: distância de uma perna, zona Bronze, elevação e picking.
+    Se o SKU ocupa vários bins, a linha é coletada no bin mais próximo (build_sku_bin_index).
+    Linhas de SKUs sem posição (ou com bin fora do layout) são descartadas.
+    engine: 'numpy', 'numba' ou 'auto' (ver jit_engine).
+    """
+    sku_index = build_sku_bin_index(df_alloc, df_layout, engine=engine)
+    layout_cols = ['bin_id', 'x', 'y', 'z'] + (['zone_class'] if 'zone_class' in df_layout.columns else [])
+
+    rows = nearest_bins(sku_index, df_lines['sku_id'].to_numpy())
+    df = df_lines[rows >= 0].reset_index(drop=True)
+    df_bins = df_layout[layout_cols].iloc[rows[rows >= 0]].reset_index(drop=True)
+    df = pd.concat([df, df_bins], axis=1)
+
+    df['dist_leg_m'] = jit_engine.manhattan_dist(STAGING_X, STAGING_Y, df['x'].to_numpy(), df['y'].to_numpy(), CROSS_AISLES_Y, engine=engine)
+    # Penalidade de velocidade (exemplo: Bronze anda a 80%)
+    df['is_bronze'] = (df['zone_class'] == 'Bronze').to_numpy() if 'zone_class' in df.columns else False
+    # Elevação: 4 operações (Pegar, Largar, Pegar, Largar), 15s base + 5s por nível acima do chão
+    df['time_lift_s'] = (15 + (df['z'] - 1) * 5) * 4
+    # Picking manual no Staging: 1.5s por item + 10s setup
+    df['picking_time_s'] = (df['quantity'] * 1.5) + 10
+    return df
+
+def line_times(df_metrics, forklift_speed=1.5, engine='numpy'):
+    if jit_engine.resolve_engine(engine) == 'numba':
+        return jit_engine.get_kernel(jit_engine.line_times_kernel, engine)(
+            df_metrics['dist_leg_m'].to_numpy(dtype=np.float64), df_metrics['is_bronze'].to_numpy(dtype=np.bool_),
+            df_metrics['time_lift_s'].to_numpy(dtype=np.float64), df_metrics['picking_time_s'].to_numpy(dtype=np.float64),
+            float(forklift_speed), BRONZE_SPEED_FACTOR
+        )
+
+    # Distância total = 4 pernas (Busca + Devolução)
+    dist_total = df_metrics['dist_leg_m'].to_numpy() * 4
+    speed = np.where(df_metrics['is_bronze'].to_numpy(dtype=bool), forklift_speed * BRONZE_SPEED_FACTOR, forklift_speed)
+    time_total = dist_total / speed + df_metrics['time_lift_s'].to_numpy() + df_metrics['picking_time_s'].to_numpy()
+    return dist_total, time_total
+
+def run_simulation(df_orders, df_alloc, df_layout, num_orders_to_sim=50, forklift_speed=1.5, num_active_docks=1, order_ids=None, engine='numpy',
+                   event_log_path=None, num_forklifts=5, df_skus=None, travel_model='linear'):
+    # travel_model: 'linear' (distância / velocidade + elevação fixa) ou 'kinematic' (tabelas do
+    # kinematics_engine: aceleração, curvas e velocidades pelo peso do palete de df_skus).
+    # event_log_path: grava também o log de eventos por perna (.parquet/.arrow, ver event_log_engine),
+    # com os pedidos distribuídos entre num_forklifts empilhadeiras.
+    # assigned_dock: doca do caminhão de cada pedido no escalonamento das num_active_docks docas (dock_engine);
+    # df_skus (opcional) dá o nº de paletes por pedido, senão 1 palete por linha
+    # Filtrar pedidos para simular (amostra explícita, ex.: estratificada, ou os N primeiros)
+    if order_ids is not None:
+        sim_orders = pd.unique(np.asarray(order_ids))
+    else:
+        sim_orders = df_orders['order_id'].unique()[:num_orders_to_sim]
+    df_sim = df_orders[df_orders['order_id'].isin(sim_orders)]
+
+    # Modelo Hub-and-Spoke: cada linha gera 4 pernas Hub <-> Bin + elevação + picking no Staging
+    df_metrics = compute_line_metrics(df_sim, df_alloc, df_layout, engine=engine)
+    if travel_model == 'kinematic':
+        from src import kinematics_engine # Import tardio: kinematics_engine usa este módulo
+        tables = kinematics_engine.get_tables(df_layout, forklift_speed)
+        df_metrics['dist_m'], df_metrics['time_s'] = kinematics_engine.line_times(df_metrics, tables, df_skus)
+    elif travel_model == 'linear':
+        df_metrics['dist_m'], df_metrics['time_s'] = line_times(df_metrics, forklift_speed, engine=engine)
+    else:
+        raise ValueError(f"Modelo de deslocamento desconhecido: {travel_model} (use {', '.join(TRAVEL_MODELS)})")
+
+    per_order = df_metrics.groupby('order_id')[['dist_m', 'time_s']].sum()
+    per_order = per_order.reindex(sim_orders, fill_value=0.0)
+    waves = df_sim.groupby('order_id', sort=False)['shipping_wave'].first().reindex(sim_orders)
+
+    if event_log_path is not None:
+        from src import event_log_engine # Import tardio: event_log_engine usa este módulo
+        order_days = df_sim.groupby('order_id', sort=False)['day'].first().reindex(sim_orders).fillna(1).to_numpy(dtype=int)
+        event_log_engine.write_event_log(df_metrics, sim_orders, order_days, event_log_path,
+                                         forklift_speed=forklift_speed, num_forklifts=num_forklifts)
+
+    from src import dock_engine # Import tardio: dock_engine usa este módulo
+    df_docks = dock_engine.dock_table(num_active_docks, forklift_speed)
+    if len(df_docks) == 1: # Uma doca só: todos os caminhões saem por ela, sem escalonar
+        assigned_dock = pd.Series(df_docks['dock_id'].iloc[0], index=sim_orders)
+    else:
+        df_ready = dock_engine.order_ready_times(df_sim, per_order['time_s'], num_forklifts=num_forklifts)
+        df_schedule = dock_engine.schedule_docks(dock_engine.build_trucks(df_ready, dock_engine.order_pallets(df_sim, df_skus)), df_docks)
+        assigned_dock = df_schedule.drop_duplicates('order_id').set_index('order_id')['dock_id'].reindex(sim_orders)
+        assigned_dock = assigned_dock.fillna(df_docks['dock_id'].iloc[0]) # Pedidos sem linhas: doca mais próxima do Staging
+
+    total_dist_m = per_order['dist_m'].to_numpy()
+    total_time_s = per_order['time_s'].to_numpy()
+
+    return pd.DataFrame({
+        'order_id': sim_orders,
+        'assigned_dock': assigned_dock.to_numpy(), # Tudo passa pelo Staging e sai pela doca
+        'dist_rnd_m': total_dist_m * 1.2, # Comparativo (sem otimização seria pior)
+        'dist_opt_m': total_dist_m,
+        'time_rnd_s': total_time_s * 1.2,
+        'time_opt_s': total_time_s,
+        'shipping_wave': waves.to_numpy()
+    })
+
+def calculate_fleet_sizing(df_orders, avg_time_per_order, num_forklifts=5, shift_hours=16.0):
+    """
+    Dimensionamento da frota dia a dia: carga de trabalho (h) vs capacidade da frota (h).
+    Retorna a tabela diária e um resumo com os KPIs de planejamento.
+    """
+    df_daily_ops = df_orders.groupby('day').size().reset_index(name='num_orders')
+    df_daily_ops['workload_hours'] = (df_daily_ops['num_orders'] * avg_time_per_order) / 3600
+
+    df_daily_ops['capacity_hours'] = num_forklifts * shift_hours
+    df_daily_ops['utilization'] = (df_daily_ops['workload_hours'] / df_daily_ops['capacity_hours']) * 100
+    df_daily_ops['status'] = np.where(df_daily_ops['utilization'] > 100, 'Overload', 'OK')
+    df_daily_ops['balance_hours'] = df_daily_ops['capacity_hours'] - df_daily_ops['workload_hours']
+
+    summary = {
+        'avg_utilization': df_daily_ops['utilization'].mean(),
+        'max_utilization': df_daily_ops['utilization'].max(),
+        'overload_days': int((df_daily_ops['status'] == 'Overload').sum()),
+        'total_days': len(df_daily_ops),
+        'total_balance_hours': df_daily_ops['balance_hours'].sum(),
+        'suggested_fleet': int(np.ceil(df_daily_ops['workload_hours'].max() / shift_hours)),
+    }
+    return df_daily_ops, summary
+
+def iter_order_days(df_orders):
+    """
+    Fonte de dias para a simulação faseada: aceita um DataFrame completo ou um iterável
+    de (dia, df_dia) já em ordem crescente (ex.: leitura por partições de um arquivo anual).
+    """
+    if isinstance(df_orders, pd.DataFrame):
+        for day, df_day in df_orders.groupby('day', sort=True):
+            yield day, df_day
+    else:
+        yield from df_orders
+
+def _simulate_wave(queue, window_start, window_end, forklifts, staging, staging_capacity, dispatch_time_s, in_flight, close_shift=False):
+    """
+    Processa a fila FIFO de (order_id, release_s, time_s) dentro da janela da onda.
+    Cada pedido ocupa uma empilhadeira até terminar e uma posição de Staging até ser
+    despachado (término + dispatch_time_s). Itens com order_id None são tarefas de
+    reabastecimento: ocupam só a empilhadeira. Retorna o que sobrou da fila e as métricas.
+    in_flight (heap dos términos dos pedidos iniciados) atravessa as ondas do dia: cada pedido
+    conta como concluído na onda em que termina; close_shift (última onda) conta também os
+    que terminam depois do fim do turno.
+    """
+    started = completed = replenishments = 0
+    busy_s = wait_staging_s = replenishment_busy_s = 0.0
+    peak = len(staging)
+
+    while queue:
+        order_id, release_s, time_s = queue[0]
+        fork_free = forklifts[0]
+        start = max(release_s, fork_free, window_start)
+
+        if order_id is None:
+            # Reabastecimento: não passa pelo Staging
+            if start >= window_end:
+                break
+            queue.popleft()
+            heapq.heapreplace(forklifts, start + time_s)
+            replenishments += 1
+            busy_s += time_s
+            replenishment_busy_s += time_s
+            continue
+
+        if start >= window_end:
+            break # Não cabe mais nesta onda: vira backlog
+
+        # Liberar posições de Staging já despachadas até o início
+        while staging and staging[0] <= start:
+            heapq.heappop(staging)
+        # Staging cheio: esperar o próximo despacho (se ele ainda cair dentro da onda)
+        if len(staging) >= staging_capacity:
+            lane_free = staging[0]
+            if lane_free >= window_end:
+                break # A posição só libera na próxima onda: o pedido continua na fila
+            heapq.heappop(staging)
+            wait_staging_s += lane_free - start
+            start = lane_free
+            while staging and staging[0] <= start:
+                heapq.heappop(staging)
+
+        queue.popleft()
+        end = start + time_s
+        heapq.heapreplace(forklifts, end)
+        heapq.heappush(staging, end + dispatch_time_s)
+        heapq.heappush(in_flight, end)
+        peak = max(peak, len(staging))
+
+        started += 1
+        busy_s += time_s
+
+    # Concluídos nesta onda: pedidos (desta onda ou de anteriores) que terminam até o fim da janela
+    while in_flight and (close_shift or in_flight[0] <= window_end):
+        heapq.heappop(in_flight)
+        completed += 1
+
+    return {
+        'started': started,
+        'completed_in_window': completed,
+        'busy_s': busy_s,
+        'staging_wait_s': wait_staging_s,
+        'peak_staging': peak,
+        'replenishments': replenishments,
+        'replenishment_busy_s': replenishment_busy_s,
+    }
+
+def run_time_phased_simulation(df_orders, df_alloc, df_layout, forklift_speed=1.5, num_forklifts=5, shift_hours=16.0,
+                               staging_capacity=STAGING_CAPACITY, dispatch_time_s=1800.0, waves=SHIPPING_WAVES, inventory=None):
+    """
+    Simulação faseada no tempo: libera os pedidos por dia e por onda (shipping_wave),
+    com frota e Staging finitos. O turno é dividido igualmente entre as ondas; o que não
+    começa dentro da janela da onda é carregado para a onda seguinte (e para o dia seguinte).
+
+    inventory (estado de inventory_engine.init_inventory): a demanda de cada onda é baixada
+    do estoque na liberação; reabastecimentos de emergência entram na frente da fila e os
+    disparados pelo limite mínimo entram depois dos pedidos da onda, na mesma frota.
+
+    Laço em streaming sobre os dias: só o dia ativo e o backlog ficam em memória.
+    Retorna (tabela por dia/onda, resumo).
+    """
+    if inventory is not None:
+        from src import inventory_engine # Import tardio: inventory_engine usa este módulo
+
+    wave_len_s = shift_hours * 3600 / len(waves)
+    backlog = deque()
+    rows = []
+
+    for day, df_day in iter_order_days(df_orders):
+        # Tempo de cada pedido do dia (vetorizado)
+        df_metrics = compute_line_metrics(df_day, df_alloc, df_layout)
+        _, df_metrics['time_s'] = line_times(df_metrics, forklift_speed)
+        order_time = df_metrics.groupby('order_id')['time_s'].sum()
+        order_wave = df_day.groupby('order_id', sort=False)['shipping_wave'].first()
+        order_time = order_time.reindex(order_wave.index, fill_value=0.0)
+
+        # Estado do dia: empilhadeiras e Staging começam livres (turno anterior foi fechado)
+        forklifts = [0.0] * num_forklifts
+        staging = []
+        in_flight = []
+
+        for w, wave in enumerate(waves):
+            window_start = w * wave_len_s
+            window_end = window_start + wave_len_s
+
+            carried_in = len(backlog)
+            wave_ids = order_wave.index[order_wave.to_numpy() == wave]
+            if inventory is not None:
+                df_wave = df_day[df_day['shipping_wave'].to_numpy() == wave]
+                codes = inventory_engine.sku_codes(inventory, df_wave['sku_id'].to_numpy())
+                _, emergency_s = inventory_engine.apply_demand(inventory, codes, df_wave['quantity'].to_numpy(dtype=float))
+                backlog.extendleft((None, window_start, t) for t in emergency_s)
+            backlog.extend(zip(wave_ids, [window_start] * len(wave_ids), order_time.loc[wave_ids].to_numpy()))
+            if inventory is not None:
+                backlog.extend((None, window_start, t) for t in inventory_engine.trigger_replenishment(inventory))
+
+            metrics = _simulate_wave(backlog, window_start, window_end, forklifts, staging, staging_capacity, dispatch_time_s,
+                                     in_flight, close_shift=w == len(waves) - 1)
+
+            rows.append({
+                'day': day,
+                'shipping_wave': wave,
+                'released': len(wave_ids),
+                'carried_in': carried_in,
+                **metrics,
+                'carry_over': sum(1 for item in backlog if item[0] is not None),
+                'throughput_orders_h': metrics['completed_in_window'] / (wave_len_s / 3600),
+                'forklift_utilization': metrics['busy_s'] / (num_forklifts * wave_len_s) * 100,
+                'replenishment_utilization': metrics['replenishment_busy_s'] / (num_forklifts * wave_len_s) * 100,
+                'peak_staging_pct': metrics['peak_staging'] / staging_capacity * 100,
+            })
+
+        # Backlog passa para o dia seguinte, liberado no início do turno
+        backlog = deque((order_id, 0.0, time_s) for order_id, _, time_s in backlog)
+
+    df_waves = pd.DataFrame(rows)
+    summary = {
+        'days': int(df_waves['day'].nunique()) if not df_waves.empty else 0,
+        'orders_released': int(df_waves['released'].sum()) if not df_waves.empty else 0,
+        'orders_started': int(df_waves['started'].sum()) if not df_waves.empty else 0,
+        'orders_completed': int(df_waves['completed_in_window'].sum()) if not df_waves.empty else 0,
+        'final_backlog': sum(1 for item in backlog if item[0] is not None),
+        'max_carry_over': int(df_waves['carry_over'].max()) if not df_waves.empty else 0,
+        'peak_staging': int(df_waves['peak_staging'].max()) if not df_waves.empty else 0,
+        'staging_capacity': staging_capacity,
+        'total_staging_wait_h': df_waves['staging_wait_s'].sum() / 3600 if not df_waves.empty else 0.0,
+        'replenishments': int(df_waves['replenishments'].sum()) if not df_waves.empty else 0,
+        'replenishment_hours': df_waves['replenishment_busy_s'].sum() / 3600 if not df_waves.empty else 0.0,
+    }
+    return df_waves, summary
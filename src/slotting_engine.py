@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
-import random
-from src import simulation_engine
+from src import simulation_engine, sampling_engine, jit_engine, forecast_engine
+
+# Memória da matriz de deltas por bloco da Busca Tabu (float64 block_size x n; as máscaras somam ~5 bytes/elemento)
+TABU_BLOCK_BYTES = 64 * 2 ** 20
 
 def calculate_sku_scores(df_orders, df_skus, wave_weight_morning=1.5, wave_weight_afternoon=1.0):
     # Filtrar apenas SKUs que têm demanda (pedidos)
@@ -35,98 +37,164 @@ def calculate_sku_scores(df_orders, df_skus, wave_weight_morning=1.5, wave_weigh
     return sku_scores
 
 def calculate_bin_costs(df_layout, forklift_speed=1.5):
-    def calculate_vertical_penalty(z):
-        if z == 1: return 0
-        if z == 2: return 10
-        if z == 3: return 20
-        if z == 4: return 35
-        return 999
-
-    def calculate_weight_capacity(z):
-        if z == 1: return 2000
-        return 1000
-
-    df_layout['vertical_penalty_sec'] = df_layout['z'].apply(calculate_vertical_penalty)
+    # Penalidade vertical por nível (s): 1 -> 0, 2 -> 10, 3 -> 20, 4 -> 35, 5+ -> 999
+    z = df_layout['z'].to_numpy()
+    vertical_penalty = np.select([z == 1, z == 2, z == 3, z == 4], [0, 10, 20, 35], default=999)
+
+    df_layout['vertical_penalty_sec'] = vertical_penalty
     df_layout['travel_time_sec'] = df_layout['distance_to_dock_meters'] / forklift_speed
     df_layout['total_cost_score'] = df_layout['travel_time_sec'] + df_layout['vertical_penalty_sec']
-    df_layout['max_weight_kg'] = df_layout['z'].apply(calculate_weight_capacity)
+    # Capacidade de peso: chão suporta 2000 kg, níveis elevados 1000 kg
+    df_layout['max_weight_kg'] = np.where(z == 1, 2000, 1000)
 
     # Ordenar Bins por Custo (Crescente)
     df_layout = df_layout.sort_values(by='total_cost_score', ascending=True).reset_index(drop=True)
     
     return df_layout
 
-def run_greedy_allocation(sku_scores, df_layout_sorted):
+def calculate_sku_slots(df_orders, df_skus, coverage_days=1.0, max_slots_per_sku=10):
+    """
+    Nº de posições-palete por SKU a partir da demanda e do units_per_pallet:
+    paletes movimentados por dia (média do backlog) x dias de cobertura, no mínimo 1.
+    Um SKU Classe A que gira 40 paletes/mês recebe mais posições que um Classe C.
+    """
+    df_process = df_orders.merge(df_skus[['sku_id', 'units_per_pallet']], on='sku_id', how='inner')
+    df_process['pallets'] = df_process['quantity'] / df_process['units_per_pallet']
+
+    n_days = max(df_orders['day'].nunique(), 1)
+    daily_pallets = df_process.groupby('sku_id')['pallets'].sum() / n_days
+    slots = np.clip(np.ceil(daily_pallets * coverage_days), 1, max_slots_per_sku).astype(int)
+    return slots.rename('slots')
+
+def run_greedy_allocation(sku_scores, df_layout_sorted, slots_per_sku=None):
+    """
+    Alocação gulosa: SKUs em ordem de esforço recebem os bins livres mais baratos que
+    suportam o peso do palete. slots_per_sku (Series sku_id -> nº de posições) permite
+    alocar vários bins por SKU; sem ela, cada SKU recebe um único bin.
+
+    Os bins são agrupados por classe de capacidade (max_weight_kg), cada uma com um ponteiro
+    para o próximo bin livre na ordem de custo: o melhor bin viável é o menor dos ponteiros
+    das classes que suportam o peso, sem varrer a lista de bins (escala para 100k posições).
+    """
+    bin_ids = df_layout_sorted['bin_id'].to_numpy()
+    bin_costs = df_layout_sorted['total_cost_score'].to_numpy()
+    capacities = df_layout_sorted['max_weight_kg'].to_numpy()
+
+    # Classe de capacidade -> posições (na ordem de custo) dos seus bins
+    class_caps = np.unique(capacities)
+    class_bins = [np.flatnonzero(capacities == cap) for cap in class_caps]
+    pointers = [0] * len(class_caps)
+
     allocation_map = []
-    available_bins = df_layout_sorted.to_dict('records')
-    assigned_bins = set()
+    for sku_id, sku_weight, effort in zip(sku_scores['sku_id'], sku_scores['pallet_weight_kg'], sku_scores['total_effort_score']):
+        n_slots = 1 if slots_per_sku is None else int(slots_per_sku.get(sku_id, 1))
+        feasible = [k for k, cap in enumerate(class_caps) if cap >= sku_weight]
 
-    for index, sku in sku_scores.iterrows():
-        sku_id = sku['sku_id']
-        sku_weight = sku['pallet_weight_kg']
-        
-        assigned = False
-        
-        # Tentar encontrar o melhor bin disponível que suporte o peso
-        # Note: available_bins já está ordenado por custo
-        for i, bin_data in enumerate(available_bins):
-            bin_id = bin_data['bin_id']
-            
-            if bin_id in assigned_bins:
-                continue
-                
-            # Restrição de Peso
-            if bin_data['max_weight_kg'] >= sku_weight:
-                allocation_map.append({
-                    'sku_id': sku_id,
-                    'bin_id': bin_id,
-                    'sku_effort': sku['total_effort_score'],
-                    'bin_cost': bin_data['total_cost_score']
-                })
-                assigned_bins.add(bin_id)
-                # Remover da lista para otimizar próximas iterações
-                available_bins.pop(i)
-                assigned = True
-                break
-        
-        if not assigned:
-            # Pode retornar um log ou warning se necessário
-            pass
+        for _ in range(n_slots):
+            # Bin livre mais barato entre as classes viáveis (empate: ordem original)
+            best_k = -1
+            for k in feasible:
+                if pointers[k] < len(class_bins[k]) and (best_k < 0 or class_bins[k][pointers[k]] < class_bins[best_k][pointers[best_k]]):
+                    best_k = k
+            if best_k < 0:
+                break # Sem bin viável: SKU fica (parcialmente) sem posição
+
+            pos = class_bins[best_k][pointers[best_k]]
+            pointers[best_k] += 1
+            allocation_map.append({
+                'sku_id': sku_id,
+                'bin_id': bin_ids[pos],
+                'sku_effort': effort,
+                'bin_cost': bin_costs[pos]
+            })
 
-    return pd.DataFrame(allocation_map)
+    return pd.DataFrame(allocation_map, columns=['sku_id', 'bin_id', 'sku_effort', 'bin_cost'])
 
-def run_slotting_strategy(df_skus, df_orders, df_layout):
+def run_slotting_strategy(df_skus, df_orders, df_layout, wave_weight_morning=1.5, multi_slot=False, coverage_days=1.0, max_slots_per_sku=10,
+                          score_source='history', forecast_horizon_days=7, forecast_method='auto'):
     """
     Executa a estratégia completa de slotting:
     1. Calcula Score de Popularidade dos SKUs
     2. Calcula Custo dos Bins
     3. Realiza Alocação Gulosa (Greedy)
+    Com multi_slot=True, cada SKU recebe várias posições dimensionadas pela demanda (calculate_sku_slots).
+    Com score_source='forecast', o score é o esforço previsto para os próximos forecast_horizon_days
+    dias (forecast_engine, SES/Croston) em vez da soma do histórico.
     """
     # 1. Calcular Scores
-    sku_scores = calculate_sku_scores(df_orders, df_skus)
+    if score_source == 'forecast':
+        sku_scores = forecast_engine.forecast_sku_scores(df_orders, df_skus, horizon_days=forecast_horizon_days, method=forecast_method,
+                                                         wave_weight_morning=wave_weight_morning)
+    elif score_source == 'history':
+        sku_scores = calculate_sku_scores(df_orders, df_skus, wave_weight_morning=wave_weight_morning)
+    else:
+        raise ValueError(f"score_source desconhecido: {score_source} (use 'history' ou 'forecast')")
     
     # 2. Calcular Custos dos Bins
     df_layout_sorted = calculate_bin_costs(df_layout)
     
     # 3. Alocar
-    df_alloc = run_greedy_allocation(sku_scores, df_layout_sorted)
+    slots_per_sku = calculate_sku_slots(df_orders, df_skus, coverage_days, max_slots_per_sku) if multi_slot else None
+    df_alloc = run_greedy_allocation(sku_scores, df_layout_sorted, slots_per_sku=slots_per_sku)
     
     return df_alloc
 
-def optimize_slotting_hill_climbing(current_alloc, df_orders, df_layout, iterations=50, sample_size=20):
+def _hill_climbing_arrays(current_map, df_orders_sample, df_layout, iterations, engine, seed=42):
+    """
+    Hill Climbing sobre arrays codificados como inteiros (SKU -> índice do bin), com o
+    mesmo custo do evaluate_layout_cost. Cada troca é avaliada em O(1) pelo kernel do jit_engine.
+    """
+    layout_idx = df_layout.reset_index(drop=True)
+    bin_pos = pd.Series(np.arange(len(layout_idx)), index=layout_idx['bin_id'])
+    dist = simulation_engine.manhattan_dist_array(simulation_engine.STAGING_X, simulation_engine.STAGING_Y, layout_idx['x'].to_numpy(), layout_idx['y'].to_numpy())
+    c = np.ascontiguousarray(dist * 2 + (layout_idx['z'].to_numpy() - 1) * 10, dtype=np.float64)
+
+    # SKUs com bin válido entram no laço; os demais pagam a penalidade fixa do evaluate_layout_cost
+    skus = [k for k, v in current_map.items() if v in bin_pos.index]
+    sku_qty = df_orders_sample.groupby('sku_id')['quantity'].sum()
+    q = np.ascontiguousarray(sku_qty.reindex(skus, fill_value=0).to_numpy(), dtype=np.float64)
+    bin_of_sku = np.array(bin_pos.loc[[current_map[k] for k in skus]].to_numpy(), dtype=np.int64)
+    penalty = 9999 * sum(1 for sku in sku_qty.index if sku not in current_map or current_map[sku] not in bin_pos.index)
+
+    rng = np.random.default_rng(seed)
+    n = len(skus)
+    pairs_a = rng.integers(0, n, size=iterations)
+    pairs_b = (pairs_a + rng.integers(1, n, size=iterations)) % n # b != a
+
+    kernel = jit_engine.get_kernel(jit_engine.hill_climb_kernel, engine)
+    history = kernel(bin_of_sku, q, c, pairs_a, pairs_b) + penalty
+
+    best_map = dict(current_map)
+    best_map.update(zip(skus, layout_idx['bin_id'].to_numpy()[bin_of_sku]))
+    return best_map, history.tolist()
+
+def optimize_slotting_hill_climbing(current_alloc, df_orders, df_layout, iterations=50, sample_size=20, engine=None, seed=42):
     """
     Otimiza o slotting usando simulação (Hill Climbing).
+    engine=None mantém a avaliação completa por DataFrame a cada troca; 'numpy', 'numba'
+    ou 'auto' usam o laço sobre arrays inteiros do jit_engine (Numba quando disponível).
+    seed (int ou np.random.Generator) controla a amostra de pedidos e o sorteio das trocas.
     """
+    rng = np.random.default_rng(seed)
     # 1. Preparar Dados
     layout_dict = df_layout.set_index('bin_id').to_dict('index')
     
-    # Sample de pedidos para ser rápido
-    sample_order_ids = df_orders['order_id'].sample(n=sample_size, random_state=42).unique()
+    # Amostra estratificada de pedidos (dia/onda/tamanho) para ser rápido sem viés
+    sample_order_ids = sampling_engine.stratified_order_sample(df_orders, sample_size, seed=rng)
     df_orders_sample = df_orders[df_orders['order_id'].isin(sample_order_ids)]
     
-    # Mapa atual (SKU -> Bin)
-    current_map = current_alloc.set_index('sku_id')['bin_id'].to_dict()
+    # Mapa atual (SKU -> Bin). SKUs com várias posições: otimiza a posição principal
+    # (primeira linha) e as posições extras voltam inalteradas no final.
+    is_primary = ~current_alloc['sku_id'].duplicated(keep='first')
+    extra_slots = current_alloc.loc[~is_primary, ['sku_id', 'bin_id', 'sku_effort']]
+    current_map = current_alloc[is_primary].set_index('sku_id')['bin_id'].to_dict()
     
+    if engine is not None:
+        best_map, history = _hill_climbing_arrays(current_map, df_orders_sample, df_layout, iterations, engine, seed=rng)
+        df_optimized = pd.DataFrame([{'sku_id': k, 'bin_id': v} for k, v in best_map.items()])
+        df_optimized = df_optimized.merge(current_alloc.loc[is_primary, ['sku_id', 'sku_effort']], on='sku_id', how='left')
+        return pd.concat([df_optimized, extra_slots], ignore_index=True), history
+
     # Custo Inicial
     current_cost = simulation_engine.evaluate_layout_cost(df_orders_sample, current_map, layout_dict)
     
@@ -138,7 +206,8 @@ def optimize_slotting_hill_climbing(current_alloc, df_orders, df_layout, iterati
     
     for i in range(iterations):
         # 2. Perturbação: Trocar 2 SKUs de lugar
-        sku_a, sku_b = random.sample(skus, 2)
+        idx_a, idx_b = rng.choice(len(skus), size=2, replace=False)
+        sku_a, sku_b = skus[idx_a], skus[idx_b]
         
         bin_a = current_map[sku_a]
         bin_b = current_map[sku_b]
@@ -167,6 +236,129 @@ def optimize_slotting_hill_climbing(current_alloc, df_orders, df_layout, iterati
     df_optimized = pd.DataFrame(optimized_alloc_list)
     
     # Recuperar metadados perdidos (scores, etc) fazendo merge com o original
-    df_optimized = df_optimized.merge(current_alloc[['sku_id', 'sku_effort']], on='sku_id', how='left')
+    df_optimized = df_optimized.merge(current_alloc.loc[is_primary, ['sku_id', 'sku_effort']], on='sku_id', how='left')
     
+    return pd.concat([df_optimized, extra_slots], ignore_index=True), history
+
+def _swap_problem_arrays(current_alloc, df_orders, df_layout, df_skus):
+    """
+    Codifica o problema de trocas em arrays por posição (bins ocupados + bins livres):
+    q = demanda do SKU na posição, c = custo de acesso do bin, w = peso do palete, cap = capacidade do bin.
+    Bins livres entram como SKUs "vazios" (q=0, w=0): mover para um bin livre é uma troca com ele.
+    """
+    df_bins = calculate_bin_costs(df_layout.copy())
+    dist = simulation_engine.manhattan_dist_array(simulation_engine.STAGING_X, simulation_engine.STAGING_Y, df_bins['x'].to_numpy(), df_bins['y'].to_numpy())
+    # Mesmo custo do evaluate_layout_cost: ida e volta + penalidade vertical
+    df_bins['access_cost'] = dist * 2 + (df_bins['z'].to_numpy() - 1) * 10
+
+    df_pos = df_bins[['bin_id', 'access_cost', 'max_weight_kg']].merge(current_alloc[['bin_id', 'sku_id']], on='bin_id', how='left')
+
+    sku_qty = df_orders.groupby('sku_id')['quantity'].sum()
+    slots_per_sku = df_pos['sku_id'].value_counts()
+    # SKU em várias posições: demanda dividida igualmente entre elas
+    q = np.array(df_pos['sku_id'].map(sku_qty).fillna(0) / df_pos['sku_id'].map(slots_per_sku).fillna(1), dtype=float)
+    w = np.array(df_pos['sku_id'].map(df_skus.set_index('sku_id')['pallet_weight_kg']).fillna(0), dtype=float)
+
+    return df_pos, q, np.array(df_pos['access_cost'], dtype=float), w, np.array(df_pos['max_weight_kg'], dtype=float)
+
+def swap_deltas_block(rows, q, c, w, cap):
+    """
+    Variação de custo de todas as trocas (i, j) para i em rows, em uma operação:
+        delta[i, j] = q_i c_j + q_j c_i - q_i c_i - q_j c_j = (q_i - q_j)(c_j - c_i)
+    Trocas que violam a capacidade de peso de algum dos bins recebem +inf.
+    """
+    delta = (q[rows, None] - q[None, :]) * (c[None, :] - c[rows, None])
+    feasible = (w[rows, None] <= cap[None, :]) & (w[None, :] <= cap[rows, None])
+    delta[~feasible] = np.inf
+    delta[np.arange(len(rows)), rows] = np.inf # Trocar consigo mesmo
+    return delta
+
+def optimize_slotting_tabu(current_alloc, df_orders, df_layout, df_skus, max_passes=20, block_size=None, tabu_tenure=7, patience=3,
+                           block_bytes=TABU_BLOCK_BYTES):
+    """
+    Busca Tabu com melhor melhoria: cada bloco de linhas da vizinhança (todas as trocas
+    entre posições, inclusive com bins livres) é avaliado de uma vez com NumPy.
+    As trocas melhoradoras e disjuntas do bloco são aplicadas da melhor para a pior;
+    posições recém-movidas ficam tabu por tabu_tenure passadas (exceto se gerarem novo melhor custo).
+    Sem melhoria, aplica a troca menos ruim não-tabu para escapar do ótimo local.
+    block_size (linhas por bloco): por padrão, o que cabe em block_bytes de deltas float64,
+    para que a memória por bloco não cresça com n x n.
+    """
+    df_pos, q, c, w, cap = _swap_problem_arrays(current_alloc, df_orders, df_layout, df_skus)
+    sku_at = np.array(df_pos['sku_id'], dtype=object)
+    n = len(q)
+    if block_size is None:
+        block_size = max(1, block_bytes // (max(n, 1) * 8))
+
+    current_cost = float((q * c).sum())
+    best_cost = current_cost
+    best_sku_at = sku_at.copy()
+    history = [current_cost]
+
+    tabu_until = np.zeros(n, dtype=int)
+    passes_without_gain = 0
+
+    for p in range(1, max_passes + 1):
+        improved = False
+        best_escape = (np.inf, -1, -1)
+        moved = set() # Posições trocadas nesta passada (invalidam deltas guardados de blocos anteriores)
+
+        for start in range(0, n, block_size):
+            rows = np.arange(start, min(start + block_size, n))
+            delta = swap_deltas_block(rows, q, c, w, cap)
+
+            # Tabu: bloqueia linhas/colunas de posições recém-movidas (aspiração: novo melhor global)
+            tabu = tabu_until > p
+            aspiration = current_cost + delta < best_cost - 1e-9
+            blocked = (tabu[rows, None] | tabu[None, :]) & ~aspiration
+            delta[blocked] = np.inf
+
+            neg = np.flatnonzero(delta < -1e-9)
+            if neg.size == 0:
+                flat = np.argmin(delta)
+                if delta.flat[flat] < best_escape[0]:
+                    best_escape = (delta.flat[flat], rows[flat // n], flat % n)
+                continue
+
+            # Aplicar trocas disjuntas da melhor para a pior (deltas seguem válidos se i, j não foram tocados)
+            used = set()
+            for flat in neg[np.argsort(delta.flat[neg])]:
+                i, j = rows[flat // n], flat % n
+                if i in used or j in used:
+                    continue
+                used.update((i, j))
+                moved.update((i, j))
+                current_cost += delta.flat[flat]
+                q[i], q[j] = q[j], q[i]
+                w[i], w[j] = w[j], w[i]
+                sku_at[i], sku_at[j] = sku_at[j], sku_at[i]
+                tabu_until[[i, j]] = p + tabu_tenure
+                improved = True
+
+        if improved and current_cost < best_cost - 1e-9:
+            best_cost = current_cost
+            best_sku_at = sku_at.copy()
+            passes_without_gain = 0
+        else:
+            passes_without_gain += 1
+            if passes_without_gain >= patience:
+                history.append(best_cost)
+                break
+            # Ótimo local: aplica a melhor troca não-tabu (mesmo que piore). O delta foi guardado
+            # num bloco anterior: só vale se nenhuma das duas posições foi trocada depois
+            d, i, j = best_escape
+            if i >= 0 and np.isfinite(d) and i not in moved and j not in moved:
+                current_cost += d
+                q[i], q[j] = q[j], q[i]
+                w[i], w[j] = w[j], w[i]
+                sku_at[i], sku_at[j] = sku_at[j], sku_at[i]
+                tabu_until[[i, j]] = p + tabu_tenure
+
+        history.append(best_cost)
+
+    # Converter melhor solução de volta para DataFrame (apenas posições ocupadas)
+    occupied = ~pd.isna(best_sku_at)
+    df_optimized = pd.DataFrame({'sku_id': best_sku_at[occupied], 'bin_id': df_pos['bin_id'].to_numpy()[occupied]})
+    df_optimized = df_optimized.merge(current_alloc[['sku_id', 'sku_effort']].drop_duplicates('sku_id'), on='sku_id', how='left')
+
     return df_optimized, history
@@ -0,0 +1,112 @@
+"""
+Relatório de inicialização: tempo de import de cada engine e latência até o primeiro
+resultado (dados -> slotting -> simulação). Cada medida roda num interpretador novo,
+como um worker do pipeline ou uma execução da CLI, para não contar módulos já em cache.
+
+Uso:
+    python -m src.startup_engine
+    python -m src.startup_engine --modules src.simulation_engine src.slotting_engine --repeat 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    'src',
+    'src.jit_engine',
+    'src.data_engine',
+    'src.simulation_engine',
+    'src.slotting_engine',
+    'src.pipeline_engine',
+    'src.event_log_engine',
+    'src.render_engine',
+]
+
+_IMPORT_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import {module}
+print(json.dumps({{'import_s': time.perf_counter() - t0}}))
+"""
+
+_FIRST_RESULT_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+from src import data_engine, slotting_engine, simulation_engine
+t1 = time.perf_counter()
+df_layout = data_engine.generate_layout()
+df_skus = data_engine.generate_skus(num_skus={num_skus}, seed={seed})
+df_orders = data_engine.generate_orders(df_skus, num_orders={num_orders}, seed={seed})
+t2 = time.perf_counter()
+df_alloc = slotting_engine.run_slotting_strategy(df_skus, df_orders, df_layout)
+t3 = time.perf_counter()
+df_kpis = simulation_engine.run_simulation(df_orders, df_alloc, df_layout, num_orders_to_sim={sim_orders})
+t4 = time.perf_counter()
+print(json.dumps({{'import_s': t1 - t0, 'data_s': t2 - t1, 'slotting_s': t3 - t2, 'simulation_s': t4 - t3, 'first_result_s': t4 - t0}}))
+"""
+
+def _run_snippet(code):
+    # Interpretador novo na raiz do projeto; devolve as medidas internas + o tempo total do processo
+    env = {**os.environ, 'PYTHONPATH': ROOT_DIR + os.pathsep + os.environ.get('PYTHONPATH', '')}
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    wall_s = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha na medição:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['process_s'] = wall_s
+    return result
+
+def _median(runs):
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+def measure_imports(modules=DEFAULT_MODULES, repeat=3):
+    """
+    Mediana (em repeat processos) do tempo de import de cada módulo e do processo inteiro,
+    com o tempo de um interpretador vazio como referência.
+    """
+    rows = [{'module': '(python vazio)', **_median([_run_snippet(_IMPORT_SNIPPET.format(module='sys')) for _ in range(repeat)])}]
+    for module in modules:
+        rows.append({'module': module, **_median([_run_snippet(_IMPORT_SNIPPET.format(module=module)) for _ in range(repeat)])})
+    return rows
+
+def measure_first_result(num_orders=500, num_skus=200, sim_orders=50, seed=42, repeat=3):
+    # Latência até o primeiro KPI num processo novo, por etapa (mediana de repeat execuções)
+    code = _FIRST_RESULT_SNIPPET.format(num_orders=int(num_orders), num_skus=int(num_skus), sim_orders=int(sim_orders), seed=int(seed))
+    return _median([_run_snippet(code) for _ in range(repeat)])
+
+def format_report(import_rows, first_result):
+    lines = ['Import (processo novo, mediana):', f"  {'módulo':<26}{'import (ms)':>14}{'processo (ms)':>16}"]
+    for row in import_rows:
+        lines.append(f"  {row['module']:<26}{row['import_s'] * 1000:>14.0f}{row['process_s'] * 1000:>16.0f}")
+    lines.append('Primeiro resultado (dados -> slotting -> simulação):')
+    for key in ['import_s', 'data_s', 'slotting_s', 'simulation_s', 'first_result_s', 'process_s']:
+        lines.append(f"  {key:<26}{first_result[key] * 1000:>14.0f} ms")
+    return '\n'.join(lines)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Relatório de tempo de import e de latência até o primeiro resultado.")
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES, help="Módulos a medir (ex.: src.simulation_engine).")
+    parser.add_argument('--repeat', type=int, default=3, help="Processos por medida (usa a mediana).")
+    parser.add_argument('--orders', type=int, default=500, help="Pedidos gerados para a medida do primeiro resultado.")
+    parser.add_argument('--out', help="Grava também o relatório em JSON.")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    import_rows = measure_imports(args.modules, repeat=args.repeat)
+    first_result = measure_first_result(num_orders=args.orders, repeat=args.repeat)
+    print(format_report(import_rows, first_result))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'imports': import_rows, 'first_result': first_result}, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import simulation_engine, sampling_engine
+
+# Atributos de cada bin usados pelo modelo: distância de uma perna fora/dentro da zona Bronze e nível acima do chão
+BIN_FEATURES = ['dist_leg_normal', 'dist_leg_bronze', 'level']
+
+def bin_feature_matrix(df_layout):
+    """
+    Matriz (n_bins, 3) com os atributos de cada bin, na ordem de df_layout.
+    """
+    dist = simulation_engine.manhattan_dist_array(simulation_engine.STAGING_X, simulation_engine.STAGING_Y, df_layout['x'].to_numpy(), df_layout['y'].to_numpy())
+    if 'zone_class' in df_layout.columns:
+        is_bronze = (df_layout['zone_class'] == 'Bronze').to_numpy()
+    else:
+        is_bronze = np.zeros(len(df_layout), dtype=bool)
+    return np.column_stack([np.where(is_bronze, 0.0, dist), np.where(is_bronze, dist, 0.0), df_layout['z'].to_numpy() - 1.0])
+
+def allocation_features(bin_idx, sku_lines, bin_feats, n_orders, extra_best=None, bin_key=None):
+    """
+    Atributos de uma ou várias alocações candidatas de uma vez.
+    bin_idx: (n_candidatos, n_skus) com a linha de df_layout do bin principal de cada SKU.
+    Cada atributo é a média por pedido da soma, sobre as linhas, do atributo do bin do SKU.
+    SKUs com posições extras (extra_best: melhor posição extra, -1 se não houver) usam a mais
+    próxima entre a principal e a extra, pela mesma ordem do build_sku_bin_index (bin_key).
+    """
+    bin_idx = np.atleast_2d(bin_idx)
+    if extra_best is not None:
+        use_extra = (extra_best >= 0) & (bin_key[extra_best] < bin_key[bin_idx])
+        bin_idx = np.where(use_extra, extra_best, bin_idx)
+    return np.einsum('s,csf->cf', sku_lines, bin_feats[bin_idx]) / n_orders
+
+def _primary_bins(current_alloc, df_layout):
+    """
+    Posição principal (primeira linha) de cada SKU como índice de df_layout, e os bins das
+    posições extras (fixas durante a otimização).
+    """
+    layout_rows = pd.Series(np.arange(len(df_layout)), index=df_layout['bin_id'].to_numpy())
+    alloc = current_alloc[current_alloc['bin_id'].isin(layout_rows.index)]
+    is_primary = ~alloc['sku_id'].duplicated(keep='first')
+    extra = alloc[~is_primary]
+    return alloc.loc[is_primary, 'sku_id'].to_numpy(), layout_rows.loc[alloc.loc[is_primary, 'bin_id']].to_numpy(), extra['sku_id'].to_numpy(), layout_rows.loc[extra['bin_id']].to_numpy()
+
+def bin_access_key(df_layout):
+    # Ordem de coleta do build_sku_bin_index (distância de uma perna, depois nível) como uma chave escalar
+    dist = simulation_engine.manhattan_dist_array(simulation_engine.STAGING_X, simulation_engine.STAGING_Y, df_layout['x'].to_numpy(), df_layout['y'].to_numpy())
+    return dist * 1000 + df_layout['z'].to_numpy()
+
+def random_swap_candidates(base_bins, free_bins, n_candidates, swaps, sku_weight, bin_capacity, rng):
+    """
+    Candidatos a partir de base_bins com `swaps` trocas aleatórias cada: entre dois SKUs ou
+    de um SKU para um bin livre. Trocas que violam o limite de peso dos bins são descartadas.
+    Retorna (n_candidatos, n_skus).
+    """
+    n_sku = len(base_bins)
+    positions = np.concatenate([base_bins, free_bins]) # SKUs nas n_sku primeiras posições
+    cand = np.tile(positions, (n_candidates, 1))
+    rows = np.arange(n_candidates)
+    weights = np.concatenate([sku_weight, np.zeros(len(free_bins))])
+    cand_w = np.tile(weights, (n_candidates, 1))
+
+    for _ in range(swaps):
+        a = rng.integers(0, n_sku, size=n_candidates)
+        b = rng.integers(0, len(positions), size=n_candidates)
+        bin_a, bin_b = cand[rows, a], cand[rows, b]
+        ok = (cand_w[rows, a] <= bin_capacity[bin_b]) & (cand_w[rows, b] <= bin_capacity[bin_a])
+        cand[rows[ok], a[ok]], cand[rows[ok], b[ok]] = bin_b[ok], bin_a[ok]
+        cand_w[rows[ok], a[ok]], cand_w[rows[ok], b[ok]] = cand_w[rows[ok], b[ok]], cand_w[rows[ok], a[ok]]
+    return cand[:, :n_sku]
+
+def _swap_context(current_alloc, df_orders_sample, df_layout, df_skus):
+    # Arrays compartilhados por treino e otimização
+    sku_ids, base_bins, extra_skus, extra_bins = _primary_bins(current_alloc, df_layout)
+    sku_lines = df_orders_sample['sku_id'].value_counts().reindex(sku_ids, fill_value=0).to_numpy(dtype=float)
+    occupied = np.zeros(len(df_layout), dtype=bool)
+    occupied[base_bins] = True
+    occupied[extra_bins] = True
+    free_bins = np.flatnonzero(~occupied)
+
+    # Melhor posição extra de cada SKU (-1 se só tem a principal)
+    bin_key = bin_access_key(df_layout)
+    extra_best = np.full(len(sku_ids), -1, dtype=np.int64)
+    if len(extra_bins):
+        df_extra = pd.DataFrame({'sku_id': extra_skus, 'row': extra_bins, 'key': bin_key[extra_bins]}).sort_values('key', kind='stable')
+        best = df_extra.drop_duplicates('sku_id').set_index('sku_id')['row']
+        extra_best = best.reindex(sku_ids).fillna(-1).to_numpy(dtype=np.int64)
+    sku_weight = df_skus.set_index('sku_id')['pallet_weight_kg'].reindex(sku_ids).fillna(0).to_numpy()
+    # Mesma capacidade do calculate_bin_costs: chão 2000 kg, níveis elevados 1000 kg
+    bin_capacity = np.where(df_layout['z'].to_numpy() == 1, 2000.0, 1000.0)
+    return {
+        'sku_ids': sku_ids, 'base_bins': base_bins, 'sku_lines': sku_lines, 'free_bins': free_bins,
+        'extra_bins': extra_bins, 'extra_best': extra_best, 'bin_key': bin_key,
+        'sku_weight': sku_weight, 'bin_capacity': bin_capacity,
+    }
+
+def _simulate_candidate(sku_ids, bins, current_alloc, df_orders, df_layout, sample_ids, forklift_speed):
+    # Tempo médio por pedido da alocação candidata no simulador completo (posições extras mantidas)
+    extra = current_alloc[current_alloc['sku_id'].duplicated(keep='first')][['sku_id', 'bin_id']]
+    df_cand = pd.concat([pd.DataFrame({'sku_id': sku_ids, 'bin_id': df_layout['bin_id'].to_numpy()[bins]}), extra], ignore_index=True)
+    df_kpis = simulation_engine.run_simulation(df_orders, df_cand, df_layout, forklift_speed=forklift_speed, order_ids=sample_ids)
+    return df_kpis['time_opt_s'].mean(), df_cand
+
+def fit_surrogate(current_alloc, df_orders, df_layout, df_skus, n_train=200, max_swaps=50, sample_size=200,
+                  forklift_speed=1.5, holdout=0.2, seed=42):
+    """
+    Treina (offline) um modelo linear que prevê o time_opt_s médio do run_simulation a partir
+    dos atributos da alocação. Os layouts de treino são perturbações aleatórias (1 a max_swaps
+    trocas) da alocação atual, simulados na mesma amostra estratificada de pedidos.
+    Retorna o modelo com as métricas de acurácia no conjunto de validação e o tempo de treino (fit_s).
+    """
+    t_fit = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    sample_ids = sampling_engine.stratified_order_sample(df_orders, sample_size, seed=seed)
+    df_sample = df_orders[df_orders['order_id'].isin(sample_ids)]
+    ctx = _swap_context(current_alloc, df_sample, df_layout, df_skus)
+    bin_feats = bin_feature_matrix(df_layout)
+
+    # Layouts de treino: cada um com um nº diferente de trocas para cobrir perto e longe da base
+    layouts = [ctx['base_bins']]
+    for n_swaps in rng.integers(1, max_swaps + 1, size=n_train - 1):
+        layouts.append(random_swap_candidates(ctx['base_bins'], ctx['free_bins'], 1, int(n_swaps), ctx['sku_weight'], ctx['bin_capacity'], rng)[0])
+    layouts = np.array(layouts)
+
+    t0 = time.perf_counter()
+    y = np.array([_simulate_candidate(ctx['sku_ids'], bins, current_alloc, df_orders, df_layout, sample_ids, forklift_speed)[0] for bins in layouts])
+    sim_time_s = (time.perf_counter() - t0) / len(layouts)
+
+    model = {
+        'features': BIN_FEATURES + ['intercept'],
+        'sku_ids': ctx['sku_ids'],
+        'sku_lines': ctx['sku_lines'],
+        'extra_best': ctx['extra_best'],
+        'bin_key': ctx['bin_key'],
+        'bin_feats': bin_feats,
+        'sample_ids': sample_ids,
+        'forklift_speed': forklift_speed,
+    }
+    X = np.column_stack([_features(model, layouts), np.ones(len(layouts))])
+    order = rng.permutation(len(layouts))
+    n_val = max(1, int(len(layouts) * holdout))
+    val, train = order[:n_val], order[n_val:]
+    coef, *_ = np.linalg.lstsq(X[train], y[train], rcond=None)
+
+    y_pred = X[val] @ coef
+    ss_res = ((y[val] - y_pred) ** 2).sum()
+    ss_tot = ((y[val] - y[val].mean()) ** 2).sum()
+    model.update({
+        'coef': coef,
+        'n_train': len(train),
+        'r2': 1 - ss_res / ss_tot if ss_tot > 0 else 1.0,
+        'mae_s': float(np.abs(y[val] - y_pred).mean()),
+        'mape_pct': float((np.abs(y[val] - y_pred) / y[val]).mean() * 100),
+        'sim_time_s': sim_time_s,
+        'fit_s': time.perf_counter() - t_fit,
+    })
+    return model
+
+def _features(model, bin_idx):
+    return allocation_features(bin_idx, model['sku_lines'], model['bin_feats'], len(model['sample_ids']), model['extra_best'], model['bin_key'])
+
+def predict(model, bin_idx):
+    # Tempo médio por pedido previsto para uma ou várias alocações (n_candidatos, n_skus)
+    return _features(model, bin_idx) @ model['coef'][:-1] + model['coef'][-1]
+
+def optimize_slotting_surrogate(current_alloc, df_orders, df_layout, df_skus, model=None, rounds=10, n_candidates=5000,
+                                swaps_per_candidate=2, top_k=5, seed=42):
+    """
+    Otimização com triagem pelo surrogate: a cada rodada gera n_candidates perturbações da
+    melhor alocação, prevê o tempo de todas de uma vez e confirma só as top_k no simulador completo.
+    A melhor confirmada é aceita se reduzir o tempo real.
+
+    model: surrogate já treinado (fit_surrogate) para o mesmo conjunto de SKUs; sem ele, treina aqui.
+
+    Retorna (df_otimizado, histórico do tempo médio real, relatório de acurácia e speedup).
+    """
+    fitted_now = model is None
+    if fitted_now:
+        model = fit_surrogate(current_alloc, df_orders, df_layout, df_skus, seed=seed)
+    rng = np.random.default_rng(seed)
+    df_sample = df_orders[df_orders['order_id'].isin(model['sample_ids'])]
+    ctx = _swap_context(current_alloc, df_sample, df_layout, df_skus)
+    sku_ids, best_bins = ctx['sku_ids'], ctx['base_bins']
+    if not np.array_equal(sku_ids, model['sku_ids']):
+        raise ValueError("O modelo foi treinado para outro conjunto de SKUs; treine novamente com fit_surrogate.")
+
+    simulate = lambda bins: _simulate_candidate(sku_ids, bins, current_alloc, df_orders, df_layout, model['sample_ids'], model['forklift_speed'])
+    best_time, df_best = simulate(best_bins)
+    history = [best_time]
+    screen_s = confirm_s = 0.0
+    predicted, confirmed = [], []
+
+    for _ in range(rounds):
+        occupied = np.zeros(len(df_layout), dtype=bool)
+        occupied[best_bins] = True
+        occupied[ctx['extra_bins']] = True
+        candidates = random_swap_candidates(best_bins, np.flatnonzero(~occupied), n_candidates, swaps_per_candidate, ctx['sku_weight'], ctx['bin_capacity'], rng)
+
+        t0 = time.perf_counter()
+        pred = predict(model, candidates)
+        top = np.argsort(pred)[:top_k]
+        screen_s += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        results = [simulate(candidates[i]) for i in top]
+        confirm_s += time.perf_counter() - t0
+        predicted.extend(pred[top])
+        confirmed.extend(r[0] for r in results)
+
+        k = int(np.argmin([r[0] for r in results]))
+        if results[k][0] < best_time:
+            best_time, df_best = results[k]
+            best_bins = candidates[top[k]]
+        history.append(best_time)
+
+    n_screened = rounds * n_candidates
+    predicted, confirmed = np.array(predicted), np.array(confirmed)
+    report = {
+        'r2_holdout': model['r2'],
+        'mape_holdout_pct': model['mape_pct'],
+        'mape_confirmed_pct': float((np.abs(predicted - confirmed) / confirmed).mean() * 100) if len(confirmed) else 0.0,
+        'candidates_screened': n_screened,
+        'candidates_simulated': len(confirmed),
+        'surrogate_us_per_candidate': screen_s / n_screened * 1e6,
+        'simulation_ms_per_candidate': model['sim_time_s'] * 1000,
+        # Speedup da triagem: simular todos os candidatos vs. prever todos + confirmar os top_k
+        'speedup': n_screened * model['sim_time_s'] / (screen_s + confirm_s) if screen_s + confirm_s > 0 else 0.0,
+        # Treino do modelo: custo único (fitted_now=False quando o modelo veio pronto, ex.: do cache)
+        'fit_s': model['fit_s'],
+        'fitted_now': fitted_now,
+        'speedup_with_fit': n_screened * model['sim_time_s'] / (screen_s + confirm_s + model['fit_s']),
+    }
+
+    df_best = df_best.merge(current_alloc[['sku_id', 'sku_effort']].drop_duplicates('sku_id'), on='sku_id', how='left')
+    return df_best, history, report